@@ -0,0 +1,126 @@
+# calificaciones/acciones_masivas.py
+# Acciones del admin sobre conjuntos completos de calificaciones (las seleccionadas o todas las
+# filtradas): SQL por conjuntos en bloques de ids, sin instanciar cada fila ni llamar a save()
+from collections import Counter
+from functools import reduce
+from operator import add
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .auditoria import registrar
+from .cache_corredor import invalidar_corredor
+from .historial import CAMPOS_HISTORIAL, entrada_historial, guardar_historial, registrar_eliminacion
+from .models import CalificacionTributaria, Corredor, HistorialCalificacion
+from .resumenes import CAMPOS_APORTE, FACTORES_RESUMEN, ajustar_resumen
+
+# Ids por bloque (Oracle limita las listas IN a 1000 elementos); cada bloque es una transacción corta
+TAMANO_BLOQUE = 1000
+# Campos que se pueden reasignar en masa (ninguno forma parte del hash de contenido)
+CAMPOS_REASIGNABLES = ('origen', 'tipo_mercado')
+
+
+def bloques_ids(calificaciones):
+    # Recorrido por rangos de id: no depende de un cursor abierto y las filas ya tratadas
+    # (eliminadas o que dejaron de cumplir el filtro) no se vuelven a leer
+    ids = calificaciones.order_by('id').values_list('id', flat=True)
+    ultimo = 0
+    while True:
+        bloque = list(ids.filter(id__gt=ultimo)[:TAMANO_BLOQUE])
+        if not bloque:
+            return
+        yield bloque
+        ultimo = bloque[-1]
+
+
+def _invalidar(corredor_ids):
+    for corredor in Corredor.objects.filter(pk__in=corredor_ids):
+        invalidar_corredor(corredor)
+
+
+def _auditar(usuario, accion, por_corredor, objeto, detalle):
+    # Una entrada por corredor afectado, con la cantidad de calificaciones
+    for corredor in Corredor.objects.filter(pk__in=por_corredor):
+        registrar(corredor, usuario, accion, objeto=objeto, detalle=detalle, cantidad=por_corredor[corredor.pk])
+
+
+def eliminar_calificaciones(calificaciones, usuario, objeto='Eliminación múltiple', detalle='Admin.'):
+    """
+    Elimina el queryset con un DELETE ... WHERE id IN por bloque, guardando antes los valores
+    para el historial y el resumen por periodo. Devuelve la cantidad eliminada.
+    """
+    por_corredor = Counter()
+    for ids in bloques_ids(calificaciones):
+        with transaction.atomic():
+            eliminadas = [
+                (fila[0], dict(zip(CAMPOS_HISTORIAL, fila[1:])))
+                for fila in CalificacionTributaria.objects.filter(pk__in=ids).values_list('id', *CAMPOS_HISTORIAL)
+            ]
+            CalificacionTributaria.objects.filter(pk__in=ids).delete()
+            registrar_eliminacion(eliminadas, 'ADM')
+            ajustar_resumen(anteriores=[valores for _, valores in eliminadas])
+            corredores = Counter(valores['corredor_id'] for _, valores in eliminadas)
+            _invalidar(corredores)
+        por_corredor.update(corredores)
+    _auditar(usuario, 'ELI', por_corredor, objeto, detalle)
+    return sum(por_corredor.values())
+
+
+def reasignar_campo(calificaciones, usuario, campo, valor):
+    """
+    Deja `campo` (origen o tipo_mercado) en `valor` con un UPDATE por bloque, solo en las filas
+    que tienen otro valor. Guarda el valor anterior en el historial y ajusta el resumen.
+    Devuelve la cantidad modificada.
+    """
+    if campo not in CAMPOS_REASIGNABLES:
+        raise ValueError(f'{campo} no se puede reasignar en masa.')
+    if valor is None:
+        pendientes = calificaciones.exclude(**{f'{campo}__isnull': True})
+    else:
+        pendientes = calificaciones.exclude(**{campo: valor})
+    campos = list(dict.fromkeys(['id', *CAMPOS_APORTE, campo]))
+    por_corredor = Counter()
+    for ids in bloques_ids(pendientes):
+        ahora = timezone.now()
+        with transaction.atomic():
+            anteriores = [dict(zip(campos, fila)) for fila in
+                          CalificacionTributaria.objects.filter(pk__in=ids).values_list(*campos)]
+            CalificacionTributaria.objects.filter(pk__in=ids).update(**{campo: valor, 'fecha_modificacion': ahora})
+            guardar_historial([
+                entrada_historial(anterior['id'], 'MOD', 'ADM', {campo: anterior[campo]}, ahora) for anterior in anteriores
+            ])
+            ajustar_resumen(anteriores, [{**anterior, campo: valor} for anterior in anteriores])
+            corredores = Counter(anterior['corredor_id'] for anterior in anteriores)
+            _invalidar(corredores)
+        por_corredor.update(corredores)
+    etiqueta = dict(CalificacionTributaria._meta.get_field(campo).flatchoices).get(valor, 'vacío')
+    _auditar(usuario, 'MOD', por_corredor, 'Modificación múltiple', f'Admin. {campo} = {etiqueta}.')
+    return sum(por_corredor.values())
+
+
+def suma_factores_excedida(calificaciones):
+    """
+    Las calificaciones cuya suma de factor_8..factor_19 supera 1 (la regla de clean()),
+    evaluada por la base en un solo WHERE.
+    """
+    return calificaciones.alias(suma_factores=reduce(add, (F(columna) for columna in FACTORES_RESUMEN))).filter(
+        suma_factores__gt=1
+    )
+
+
+def creadas_por_carga(trabajo):
+    """
+    Calificaciones que creó el trabajo de carga y siguen existiendo, según las entradas de
+    creación que la carga dejó en el historial. Lanza ValueError si el trabajo no terminó, si fue
+    revertido (la reversión ya eliminó lo que creó) o si no tiene esas entradas: sin ellas no hay
+    forma segura de separar sus filas de las creadas por otras cargas o a mano.
+    """
+    if trabajo.estado == 'REV':
+        raise ValueError(f'La carga #{trabajo.pk} fue revertida: sus calificaciones creadas ya se eliminaron.')
+    if trabajo.estado not in ('OK', 'ERR') or trabajo.fecha_inicio is None or trabajo.fecha_fin is None:
+        raise ValueError(f'La carga #{trabajo.pk} no ha terminado.')
+    creadas = HistorialCalificacion.objects.filter(carga=trabajo, accion='CRE', origen='CAR')
+    if not creadas.exists():
+        raise ValueError(f'La carga #{trabajo.pk} no tiene calificaciones creadas registradas en el historial.')
+    return CalificacionTributaria.objects.filter(corredor_id=trabajo.corredor_id, pk__in=creadas.values('calificacion_id'))
@@ -1,5 +1,19 @@
 from django.contrib import admin
-from .models import CalificacionTributaria, Corredor
+from django.contrib.admin import helpers
+from django.contrib.admin.options import ShowFacets
+from django.db.models import Count, Q
+from django.http import HttpResponseRedirect
+from django.template.response import TemplateResponse
+from .acciones_masivas import creadas_por_carga, eliminar_calificaciones, reasignar_campo, suma_factores_excedida
+from .auditoria import registrar_calificacion
+from .cache_corredor import invalidar_corredor
+from .historial import (
+    CAMPOS_HISTORIAL, registrar_creacion, registrar_eliminacion, registrar_modificacion, valores_calificacion,
+)
+from .listado_admin import CURSOR_VAR, ChangeListKeyset, PaginadorEstimado
+from .models import CalificacionTributaria, Corredor, RegistroAuditoria, TrabajoCarga
+from .reversion import revertir_carga
+from .resumenes import ajustar_resumen
 
 # --- CONFIGURACIÓN PARA EL MODELO CORREDOR ---
 @admin.register(Corredor)
@@ -17,6 +31,49 @@ class CorredorAdmin(admin.ModelAdmin):
         ('Vínculo de Seguridad', {'fields': ('usuario',)}),
     )
 
+# --- ACCIONES MASIVAS (SQL por conjuntos en bloques, ver acciones_masivas.py) ---
+class SumaFactoresFilter(admin.SimpleListFilter):
+    title = 'suma de factores 8 a 19'
+    parameter_name = 'suma_factores'
+
+    def lookups(self, request, model_admin):
+        return [('excede', 'Mayor que 1')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'excede':
+            return suma_factores_excedida(queryset)
+        return queryset
+
+
+def confirmar_accion(modeladmin, request, calificaciones, titulo, mensaje):
+    """
+    Página intermedia con los totales por corredor; al confirmar vuelve a enviar la misma acción
+    (con la misma selección o con select_across) y `confirmar`.
+    """
+    select_across = request.POST.get('select_across') == '1'
+    context = {
+        **modeladmin.admin_site.each_context(request),
+        'opts': modeladmin.model._meta,
+        'titulo': titulo,
+        'mensaje': mensaje,
+        'resumen': calificaciones.order_by('corredor__nombre').values('corredor__nombre').annotate(cantidad=Count('id')),
+        'accion': request.POST['action'],
+        'select_across': select_across,
+        'seleccionados': [] if select_across else request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+        'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+    }
+    return TemplateResponse(request, 'admin/calificaciones/confirmar_accion_masiva.html', context)
+
+
+def accion_reasignar(campo, valor, descripcion):
+    @admin.action(description=descripcion, permissions=['change'])
+    def reasignar(modeladmin, request, queryset):
+        cantidad = reasignar_campo(queryset, request.user, campo, valor)
+        modeladmin.message_user(request, f'{cantidad} calificaciones modificadas.')
+    reasignar.__name__ = f'reasignar_{campo}_{valor or "vacio"}'
+    return reasignar
+
+
 # --- CONFIGURACIÓN PARA EL MODELO CALIFICACIÓN TRIBUTARIA ---
 @admin.register(CalificacionTributaria)
 class CalificacionTributariaAdmin(admin.ModelAdmin):
@@ -35,10 +92,32 @@ class CalificacionTributariaAdmin(admin.ModelAdmin):
         'tipo_mercado', 
         'fuente_ingreso',
         'origen',
-        'fecha_modificacion',
+        'fecha', # fecha y no fecha_modificacion: el rango usa los índices por fecha
+        SumaFactoresFilter,
     )
+
+    # Sobre lo seleccionado o, con "seleccionar todas", sobre todo lo filtrado
+    actions = [
+        'eliminar_en_bloques',
+        'revalidar_suma_factores',
+        *(accion_reasignar('origen', valor, f'Cambiar origen a {nombre}') for valor, nombre in CalificacionTributaria.ORIGEN_CHOICES),
+        *(accion_reasignar('tipo_mercado', valor, f'Cambiar tipo de mercado a {nombre}')
+          for valor, nombre in CalificacionTributaria.TIPO_MERCADO_CHOICES),
+        accion_reasignar('tipo_mercado', None, 'Quitar el tipo de mercado'),
+    ]
+
+    # --- Listado para tablas grandes (ver listado_admin.py) ---
+    # El corredor de cada fila viene en el mismo SELECT (sin una consulta por fila)
+    list_select_related = ('corredor',)
+    # Sin el COUNT(*) de la tabla completa ni los conteos por opción de filtro
+    show_full_result_count = False
+    show_facets = ShowFacets.NEVER
+    paginator = PaginadorEstimado
+    autocomplete_fields = ['corredor']
     
-    search_fields = ('instrumento', 'secuencia', 'corredor__nombre', 'descripcion_dividendo')
+    # Por prefijo y no icontains: el instrumento usa el índice sobre UPPER(instrumento) y no se recorre la tabla
+    search_fields = ('^instrumento', '^corredor__nombre')
+    search_help_text = 'Prefijo del instrumento o del corredor, o número de secuencia exacto.'
     
     # campo 'corredor' de solo lectura
     readonly_fields = ('fecha_modificacion',)
@@ -83,3 +162,142 @@ class CalificacionTributariaAdmin(admin.ModelAdmin):
             )
         }),
     )
+
+    def get_changelist(self, request, **kwargs):
+        return ChangeListKeyset
+
+    def get_actions(self, request):
+        # delete_selected arma la lista de cada objeto a eliminar: se reemplaza por eliminar_en_bloques
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    @admin.action(description='Eliminar las calificaciones seleccionadas', permissions=['delete'])
+    def eliminar_en_bloques(self, request, queryset):
+        if request.POST.get('confirmar') != 'si':
+            return confirmar_accion(self, request, queryset, 'Eliminar calificaciones',
+                                    '¿Eliminar estas calificaciones? Quedan en el historial y en la auditoría.')
+        cantidad = eliminar_calificaciones(queryset, request.user)
+        self.message_user(request, f'{cantidad} calificaciones eliminadas.')
+
+    @admin.action(description='Revalidar la suma de factores 8 a 19')
+    def revalidar_suma_factores(self, request, queryset):
+        invalidas = suma_factores_excedida(queryset).count()
+        if not invalidas:
+            self.message_user(request, 'Todas las calificaciones cumplen la suma de factores 8 a 19 (hasta 1).')
+            return None
+        self.message_user(request, f'{invalidas} calificaciones tienen la suma de factores 8 a 19 mayor que 1.', level='warning')
+        # El listado queda filtrado en las que no cumplen (con los filtros que ya tenía)
+        parametros = request.GET.copy()
+        parametros.pop(CURSOR_VAR, None)
+        parametros[SumaFactoresFilter.parameter_name] = 'excede'
+        return HttpResponseRedirect(f'{request.path}?{parametros.urlencode()}')
+
+    def get_search_results(self, request, queryset, search_term):
+        termino = search_term.strip()
+        if termino.isdigit():
+            # Un número se busca como secuencia exacta o como prefijo del instrumento
+            return queryset.filter(Q(secuencia=int(termino)) | Q(instrumento__istartswith=termino)), False
+        return super().get_search_results(request, queryset, search_term)
+
+    # Las ediciones desde el admin también invalidan la grilla cacheada del corredor y quedan auditadas
+    def save_model(self, request, obj, form, change):
+        # obj ya trae los valores del formulario: los anteriores se leen de la base
+        antes = CalificacionTributaria.objects.filter(pk=obj.pk).values(*CAMPOS_HISTORIAL).first() if change else None
+        super().save_model(request, obj, form, change)
+        invalidar_corredor(obj.corredor)
+        if change and 'corredor' in form.changed_data:
+            invalidar_corredor(Corredor(pk=form.initial['corredor']))
+        ajustar_resumen([antes] if antes else [], [valores_calificacion(obj)])
+        if antes:
+            registrar_modificacion(obj, antes, 'ADM')
+        else:
+            registrar_creacion(obj, 'ADM')
+        registrar_calificacion(
+            request.user, 'MOD' if change else 'CRE', obj,
+            f'Admin. Campos: {", ".join(form.changed_data) or "sin cambios"}.' if change else 'Admin.',
+        )
+
+    def delete_model(self, request, obj):
+        calificacion_id = obj.pk
+        super().delete_model(request, obj)
+        obj.pk = calificacion_id
+        invalidar_corredor(obj.corredor)
+        valores = valores_calificacion(obj)
+        ajustar_resumen(anteriores=[valores])
+        registrar_eliminacion([(obj.pk, valores)], 'ADM')
+        registrar_calificacion(request.user, 'ELI', obj, 'Admin.')
+
+    def delete_queryset(self, request, queryset):
+        # Una entrada de auditoría por corredor afectado, con la cantidad eliminada
+        eliminar_calificaciones(queryset, request.user)
+
+
+# --- CONFIGURACIÓN PARA LA COLA DE CARGAS MASIVAS ---
+@admin.register(TrabajoCarga)
+class TrabajoCargaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'corredor', 'tipo', 'nombre_archivo', 'estado', 'filas_procesadas', 'creados', 'actualizados', 'sin_cambios', 'revertidos', 'duracion', 'fecha_creacion')
+    list_filter = ('estado', 'tipo')
+    list_select_related = ('corredor',)
+    readonly_fields = ('bloques_confirmados', 'filas_procesadas', 'creados', 'actualizados', 'sin_cambios', 'revertidos', 'errores', 'fecha_creacion', 'fecha_inicio', 'fecha_fin', 'latido', 'fecha_reversion')
+    actions = ['revertir_cargas', 'eliminar_calificaciones_creadas']
+
+    @admin.display(description='Duración')
+    def duracion(self, obj):
+        if obj.fecha_inicio is None or obj.fecha_fin is None:
+            return '-'
+        return f'{(obj.fecha_fin - obj.fecha_inicio).total_seconds():.1f} s'
+
+    def has_revertir_permission(self, request):
+        return request.user.has_perm('calificaciones.change_calificaciontributaria')
+
+    @admin.action(description='Revertir las cargas seleccionadas', permissions=['revertir'])
+    def revertir_cargas(self, request, queryset):
+        # De la más reciente a la más antigua: cada fila vuelve al valor previo a la carga más antigua
+        for trabajo in queryset.order_by('-fecha_creacion', '-id'):
+            try:
+                resultado = revertir_carga(trabajo, request.user)
+            except ValueError as e:
+                self.message_user(request, str(e), level='error')
+                continue
+            self.message_user(
+                request,
+                f"Carga #{trabajo.pk}: {resultado['restauradas']} restauradas, {resultado['eliminadas']} eliminadas, "
+                f"{resultado['conflictos']} con cambios posteriores.",
+                level='warning' if resultado['conflictos'] else 'success',
+            )
+
+    def has_eliminar_calificaciones_permission(self, request):
+        return request.user.has_perm('calificaciones.delete_calificaciontributaria')
+
+    @admin.action(description='Eliminar las calificaciones creadas por estas cargas', permissions=['eliminar_calificaciones'])
+    def eliminar_calificaciones_creadas(self, request, queryset):
+        for trabajo in queryset.select_related('corredor'):
+            try:
+                creadas = creadas_por_carga(trabajo)
+            except ValueError as e:
+                self.message_user(request, str(e), level='error')
+                continue
+            cantidad = eliminar_calificaciones(creadas, request.user, objeto=f'Carga #{trabajo.pk} {trabajo.nombre_archivo}',
+                                               detalle='Admin. Calificaciones creadas por la carga.')
+            # Las creadas que ya se habían eliminado antes no se cuentan como eliminadas aquí
+            self.message_user(request, f'Carga #{trabajo.pk}: {cantidad} de {trabajo.creados} calificaciones creadas eliminadas.')
+
+
+# --- REGISTRO DE AUDITORÍA (solo lectura: la tabla es de solo inserción) ---
+@admin.register(RegistroAuditoria)
+class RegistroAuditoriaAdmin(admin.ModelAdmin):
+    # El código copiado sigue visible aunque el corredor se haya eliminado
+    list_display = ('fecha_accion', 'corredor_codigo', 'usuario_nombre', 'accion', 'objeto', 'cantidad')
+    list_filter = ('accion', 'corredor')
+    search_fields = ('objeto', 'usuario_nombre', 'corredor_codigo')
+    date_hierarchy = 'fecha_accion'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
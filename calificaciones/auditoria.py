@@ -0,0 +1,88 @@
+# calificaciones/auditoria.py
+# Registro de auditoría de las acciones de los corredores y su consulta paginada
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import RegistroAuditoria
+
+TAMANO_PAGINA_AUDITORIA = 100
+ORDEN_AUDITORIA = ('-fecha_accion', '-id')
+
+# Columnas de la exportación CSV, en orden
+CAMPOS_AUDITORIA = ['fecha_accion', 'usuario_nombre', 'accion', 'calificacion_id', 'objeto', 'cantidad', 'detalle']
+
+
+def registrar(corredor, usuario, accion, objeto='', detalle='', calificacion_id=None, cantidad=1):
+    return RegistroAuditoria.objects.create(
+        corredor=corredor,
+        corredor_codigo=corredor.codigo_corredor,
+        usuario=usuario if usuario is not None and usuario.is_authenticated else None,
+        usuario_nombre=usuario.get_username() if usuario is not None else '',
+        accion=accion,
+        objeto=objeto[:200],
+        detalle=detalle,
+        calificacion_id=calificacion_id,
+        cantidad=cantidad,
+    )
+
+
+def registrar_calificacion(usuario, accion, calificacion, detalle=''):
+    return registrar(
+        calificacion.corredor, usuario, accion,
+        objeto=f'{calificacion.instrumento} ({calificacion.fecha})',
+        detalle=detalle,
+        calificacion_id=calificacion.pk,
+    )
+
+
+def filtrar_registros(registros, filtro_form):
+    """
+    Aplica el FiltroAuditoriaForm (si es válido): rango de fechas [desde, hasta] y acción.
+    """
+    if filtro_form.is_valid():
+        desde = filtro_form.cleaned_data.get('desde')
+        hasta = filtro_form.cleaned_data.get('hasta')
+        accion = filtro_form.cleaned_data.get('accion')
+        # Rangos sobre la columna indexada (no __date, que aplica una función a la columna)
+        if desde:
+            registros = registros.filter(fecha_accion__gte=timezone.make_aware(datetime.combine(desde, datetime.min.time())))
+        if hasta:
+            hasta = datetime.combine(hasta + timedelta(days=1), datetime.min.time())
+            registros = registros.filter(fecha_accion__lt=timezone.make_aware(hasta))
+        if accion:
+            registros = registros.filter(accion=accion)
+    return registros
+
+
+def codificar_cursor_auditoria(registro):
+    valor = json.dumps([registro.fecha_accion.isoformat(), registro.id])
+    return base64.urlsafe_b64encode(valor.encode()).decode()
+
+
+def decodificar_cursor_auditoria(cursor):
+    """
+    Devuelve (fecha_accion, id) o lanza ValueError si el cursor no es válido.
+    """
+    try:
+        fecha, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(fecha), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Cursor de paginación inválido.') from e
+
+
+def pagina_auditoria(registros, cursor=None, tamano=TAMANO_PAGINA_AUDITORIA):
+    """
+    Una página del registro por keyset sobre (-fecha_accion, -id), que recorre el índice
+    (corredor, -fecha_accion, -id) sin OFFSET. Devuelve (filas, siguiente_cursor).
+    """
+    registros = registros.order_by(*ORDEN_AUDITORIA)
+    if cursor:
+        fecha, pk = decodificar_cursor_auditoria(cursor)
+        registros = registros.filter(Q(fecha_accion__lt=fecha) | Q(fecha_accion=fecha, id__lt=pk))
+    filas = list(registros[:tamano + 1])
+    siguiente = codificar_cursor_auditoria(filas[tamano - 1]) if len(filas) > tamano else None
+    return filas[:tamano], siguiente
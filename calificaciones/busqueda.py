@@ -0,0 +1,68 @@
+# calificaciones/busqueda.py
+# Búsqueda de instrumentos por prefijo (typeahead del mantenedor): índice en memoria por
+# corredor con sus instrumentos distintos ordenados, reconstruido cuando cambia version_datos
+from bisect import bisect_left
+from collections import OrderedDict
+from threading import Lock
+
+from .models import CalificacionTributaria
+
+# Corredores con índice en memoria por proceso (se descarta el usado hace más tiempo)
+MAX_INDICES = 64
+LIMITE_SUGERENCIAS = 20
+MAX_SUGERENCIAS = 100
+
+_indices = OrderedDict()
+_candado = Lock()
+
+
+def normalizar_instrumento(texto):
+    return (texto or '').strip().upper()
+
+
+class IndiceInstrumentos:
+    """
+    Instrumentos ordenados por su forma normalizada: un prefijo es un rango contiguo que se
+    ubica con búsqueda binaria (lo mismo que recorrer un trie, con dos listas planas).
+    """
+    def __init__(self, instrumentos):
+        pares = sorted({(normalizar_instrumento(instrumento), instrumento) for instrumento in instrumentos})
+        self.claves = [clave for clave, _ in pares]
+        self.instrumentos = [instrumento for _, instrumento in pares]
+
+    def __len__(self):
+        return len(self.claves)
+
+    def buscar(self, prefijo, limite=LIMITE_SUGERENCIAS):
+        prefijo = normalizar_instrumento(prefijo)
+        inicio = bisect_left(self.claves, prefijo)
+        fin = inicio
+        while fin < len(self.claves) and fin - inicio < limite and self.claves[fin].startswith(prefijo):
+            fin += 1
+        return self.instrumentos[inicio:fin]
+
+
+def indice_corredor(corredor):
+    """
+    Índice de los instrumentos del corredor. Se reutiliza mientras corredor.version_datos no
+    cambie (toda escritura de calificaciones la sube); si cambió se reconstruye con un SELECT DISTINCT.
+    """
+    with _candado:
+        vigente = _indices.get(corredor.pk)
+        if vigente is not None and vigente[0] == corredor.version_datos:
+            _indices.move_to_end(corredor.pk)
+            return vigente[1]
+    indice = IndiceInstrumentos(
+        CalificacionTributaria.objects.filter(corredor=corredor).order_by()
+        .values_list('instrumento', flat=True).distinct()
+    )
+    with _candado:
+        _indices[corredor.pk] = (corredor.version_datos, indice)
+        _indices.move_to_end(corredor.pk)
+        while len(_indices) > MAX_INDICES:
+            _indices.popitem(last=False)
+    return indice
+
+
+def buscar_instrumentos(corredor, prefijo, limite=LIMITE_SUGERENCIAS):
+    return indice_corredor(corredor).buscar(prefijo, max(1, min(limite, MAX_SUGERENCIAS)))
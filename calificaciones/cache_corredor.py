@@ -0,0 +1,47 @@
+# calificaciones/cache_corredor.py
+# Caché de resultados por corredor, invalidada con un contador de versión en Corredor
+import hashlib
+import json
+
+from django.core.cache import InvalidCacheBackendError, caches
+from django.db.models import F
+
+from .models import Corredor
+
+# Alias de CACHES para estos resultados (si no está configurado se usa 'default')
+ALIAS_CACHE = 'calificaciones'
+
+
+def _cache():
+    try:
+        return caches[ALIAS_CACHE]
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def invalidar_corredor(corredor):
+    """
+    Marca como obsoleto todo lo cacheado del corredor. Se llama después de escribir sus
+    calificaciones: las entradas antiguas quedan huérfanas y expiran solas.
+    El contador vive en la base, así también lo ve el worker de cargas (otro proceso).
+    """
+    Corredor.objects.filter(pk=corredor.pk).update(version_datos=F('version_datos') + 1)
+
+
+def clave_corredor(corredor, espacio, partes):
+    resumen = hashlib.sha256(json.dumps(partes, sort_keys=True, default=str).encode()).hexdigest()[:32]
+    return f'calif:{espacio}:{corredor.pk}:{corredor.version_datos}:{resumen}'
+
+
+def obtener_o_calcular(corredor, espacio, partes, calcular):
+    """
+    Devuelve el valor cacheado para (corredor, versión, espacio, partes) o lo calcula y guarda.
+    `partes` debe identificar la consulta (filtros, cursor, tamaño...) y ser serializable a JSON.
+    """
+    cache = _cache()
+    clave = clave_corredor(corredor, espacio, partes)
+    valor = cache.get(clave)
+    if valor is None:
+        valor = calcular()
+        cache.set(clave, valor)
+    return valor
@@ -0,0 +1,154 @@
+# calificaciones/calculos.py
+# Cálculo vectorizado de factores a partir de montos (DJ1948) con aritmética entera exacta
+from decimal import ROUND_HALF_EVEN, Decimal
+
+import numpy as np
+import pandas as pd
+
+ESCALA_FACTOR = 8  # Los factores se guardan con 8 decimales
+COLUMNAS_MONTO = [f'monto_{i}' for i in range(8, 38)]
+COLUMNAS_FACTOR = [f'factor_{i}' for i in range(8, 38)]
+COLUMNAS_BASE = 12  # monto_8 .. monto_19 forman la suma base
+
+# Por debajo de 2**51 un float64 distingue sin ambigüedad todos los decimales de la escala elegida
+_LIMITE_FLOAT_EXACTO = 2 ** 51
+# Límites para que la división larga en int64 no se desborde (si no, se usan enteros de Python)
+_LIMITE_MONTO_INT64 = 2 ** 55
+_LIMITE_COCIENTE_INT64 = 9 * 10 ** 9
+# Distancia a x,5 bajo la que un float escalado puede ser un empate que el producto en float desplazó
+_CERCA_DE_EMPATE = 1e-6
+
+
+def _columna_a_float(serie):
+    if serie.dtype == object:
+        serie = pd.to_numeric(serie.astype(str).str.replace(',', '.', regex=False))
+    return serie.to_numpy(dtype=np.float64)
+
+
+def _montos_a_enteros_exacto(df):
+    # Camino lento pero exacto: la misma conversión Decimal(str(valor)) de la versión fila a fila
+    decimales = [
+        [Decimal(str(v).replace(',', '.')) for v in df[col]] if col in df.columns else [Decimal(0)] * len(df)
+        for col in COLUMNAS_MONTO
+    ]
+    escala = max((-d.as_tuple().exponent for columna in decimales for d in columna), default=0)
+    escala = max(escala, 0)
+    matriz = np.empty((len(df), len(COLUMNAS_MONTO)), dtype=object)
+    for j, columna in enumerate(decimales):
+        matriz[:, j] = [int(d.scaleb(escala)) for d in columna]
+    return matriz
+
+
+def montos_a_enteros(df):
+    """
+    Convierte las columnas monto_8..monto_37 de un DataFrame en una matriz (N, 30) de
+    enteros escalados por una misma potencia de 10. Las columnas ausentes valen 0 y se
+    acepta coma decimal. Si los valores no caben en int64 la matriz es de enteros de Python.
+    """
+    matriz = np.zeros((len(df), len(COLUMNAS_MONTO)), dtype=np.float64)
+    for j, col in enumerate(COLUMNAS_MONTO):
+        if col in df.columns:
+            matriz[:, j] = _columna_a_float(df[col])
+    if not np.isfinite(matriz).all():
+        fila = int(np.argwhere(~np.isfinite(matriz))[0][0])
+        raise ValueError(f'Monto vacío o no numérico en la fila {fila + 1}.')
+    if len(df) == 0:
+        return matriz.astype(np.int64)
+
+    maximo = np.abs(matriz).max()
+    for escala in range(0, ESCALA_FACTOR + 1):
+        potencia = 10.0 ** escala
+        if maximo * potencia >= _LIMITE_FLOAT_EXACTO:
+            break
+        enteros = np.rint(matriz * potencia)
+        # Si el redondeo vuelve al mismo float, el decimal original tiene a lo más `escala` decimales
+        if np.array_equal(enteros / potencia, matriz):
+            return enteros.astype(np.int64)
+    return _montos_a_enteros_exacto(df)
+
+
+def calcular_factores(montos):
+    """
+    Kernel vectorizado montos -> factores.
+
+    `montos` es una matriz entera (N, 30) con los montos 8..37 en una escala común.
+    Devuelve los factores como enteros escalados por 10**8: monto / suma_base con
+    suma_base = montos 8..19, redondeado ROUND_HALF_EVEN (igual que cuantizar el
+    cociente Decimal a 8 decimales). Las filas con suma_base <= 0 quedan en cero.
+    El redondeo puede dejar la suma de los factores 8..19 hasta 6 * 10**-8 sobre 1: el kernel no
+    la corrige (los valores son los del Decimal); la validación de cargas rechaza esas filas.
+    """
+    montos = np.asarray(montos)
+    if montos.dtype != object and montos.size and np.abs(montos).max() >= _LIMITE_MONTO_INT64:
+        montos = montos.astype(object)
+
+    suma_base = montos[:, :COLUMNAS_BASE].sum(axis=1)
+    validas = suma_base > 0
+    divisor = np.where(validas, suma_base, 1)[:, None]
+
+    # División larga en base 10: parte entera y luego los decimales por tramos.
+    # Se opera in situ para no duplicar la matriz en cada paso.
+    resto = np.abs(montos)
+    resto[~validas] = 0
+    cociente = resto // divisor
+    if cociente.dtype != object and cociente.size and cociente.max() >= _LIMITE_COCIENTE_INT64:
+        return calcular_factores(montos.astype(object))
+    resto -= cociente * divisor
+    divisor_max = int(divisor.max()) if divisor.size else 1
+    pendientes = ESCALA_FACTOR
+    while pendientes:
+        # Tantos dígitos por vuelta como permita int64 (todos de una vez con enteros de Python)
+        paso = pendientes
+        while montos.dtype != object and paso > 1 and divisor_max * 10 ** paso >= 2 ** 63:
+            paso -= 1
+        resto *= 10 ** paso
+        digito = resto // divisor
+        resto -= digito * divisor
+        cociente *= 10 ** paso
+        cociente += digito
+        pendientes -= paso
+
+    resto *= 2
+    cociente += (resto > divisor) | ((resto == divisor) & (cociente % 2 == 1))
+    cociente[montos < 0] *= -1
+    return cociente
+
+
+def escalar_decimal(valor, escala=ESCALA_FACTOR):
+    """
+    Entero valor * 10**escala redondeado ROUND_HALF_EVEN, como cuantiza el DecimalField al guardar.
+    Acepta Decimal, número o texto con coma o punto decimal. Todo lo que compara valores escalados
+    (hash de contenido, factores empaquetados, validación) redondea con esta regla.
+    """
+    return int(Decimal(str(valor).replace(',', '.')).scaleb(escala).to_integral_value(ROUND_HALF_EVEN))
+
+
+def escalar_matriz(matriz, escala=ESCALA_FACTOR):
+    """
+    escalar_decimal vectorizado para una matriz de floats: np.rint ya redondea al par, pero un
+    empate decimal (p. ej. 0,125000005) puede quedar a cualquier lado del ,5 al multiplicar en
+    float; esas celdas se recalculan desde su texto con escalar_decimal.
+    """
+    matriz = np.asarray(matriz, dtype=np.float64)
+    escalados = matriz * 10.0 ** escala
+    enteros = np.rint(escalados)
+    dudosos = np.abs(np.abs(escalados - np.floor(escalados)) - 0.5) < _CERCA_DE_EMPATE
+    for posicion in zip(*np.nonzero(dudosos)):
+        enteros[posicion] = escalar_decimal(repr(float(matriz[posicion])), escala)
+    return enteros.astype(np.int64)
+
+
+def factores_desde_dataframe(df):
+    return calcular_factores(montos_a_enteros(df))
+
+
+def a_decimal_factor(valor):
+    # Entero escalado por 10**8 -> Decimal con 8 decimales (sin pasar por float)
+    return Decimal(int(valor)).scaleb(-ESCALA_FACTOR)
+
+
+def fila_a_factores(fila):
+    """
+    Una fila de la matriz de factores como diccionario {'factor_8': Decimal, ...}.
+    """
+    return {col: a_decimal_factor(valor) for col, valor in zip(COLUMNAS_FACTOR, fila)}
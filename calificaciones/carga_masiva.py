@@ -0,0 +1,359 @@
+# calificaciones/carga_masiva.py
+# Motor de carga masiva: upsert por bloques sobre la clave (corredor, instrumento, fecha)
+import csv
+import io
+import logging
+import time
+from contextlib import nullcontext
+from decimal import Decimal
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache_corredor import invalidar_corredor
+from .calculos import COLUMNAS_MONTO, escalar_matriz, factores_desde_dataframe, fila_a_factores
+from .contenido import hash_carga
+from .empaquetado import empaquetar_valores
+from .historial import CAMPOS_HISTORIAL, diferencias, entrada_historial, guardar_historial, valores_calificacion
+from .models import CalificacionTributaria
+from .resumenes import ajustar_resumen
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de bloque por defecto (Oracle limita las listas IN a 1000 elementos)
+TAMANO_BLOQUE = 500
+# Filas del CSV que se leen por vez; la memoria usada depende de este valor y no del tamaño del archivo
+TAMANO_BLOQUE_CSV = 5000
+
+FACTORES = [f'factor_{i}' for i in range(8, 38)]
+
+# Campos que se reescriben cuando la clave ya existe (mismos que los 'defaults' de update_or_create)
+CAMPOS_ACTUALIZABLES = [
+    'secuencia',
+    'numero_dividendo',
+    'tipo_sociedad',
+    'valor_historico',
+    'instrumento_no_inscrito',
+    'fuente_ingreso',
+    'ultima_carga',
+    *FACTORES,
+    'factores_empaquetados',
+    'hash_contenido',
+    'fecha_modificacion',
+]
+
+
+def a_decimal(valor, defecto='0.0'):
+    # Acepta coma o punto como separador decimal (formato de los archivos de corredores)
+    if valor is None:
+        valor = defecto
+    return Decimal(str(valor).replace(',', '.'))
+
+
+def datos_basicos(row, fuente):
+    """
+    Campos comunes a ambas cargas (factores y montos) a partir de una fila del CSV.
+    """
+    return {
+        'secuencia': row.get('secuencia', 0),
+        'numero_dividendo': row.get('numero_dividendo', 0),
+        'tipo_sociedad': row.get('tipo_sociedad', 'A'),
+        'valor_historico': a_decimal(row.get('valor_historico', '0.0')),
+        'instrumento_no_inscrito': bool(row.get('instrumento_no_inscrito', False)),
+        'fuente_ingreso': fuente,
+    }
+
+
+def _en_bloques(iterable, tamano):
+    iterador = iter(iterable)
+    while True:
+        bloque = list(islice(iterador, tamano))
+        if not bloque:
+            return
+        yield bloque
+
+
+def _normalizar_clave(instrumento, fecha):
+    campo_fecha = CalificacionTributaria._meta.get_field('fecha')
+    return str(instrumento), campo_fecha.to_python(fecha)
+
+
+def actualizar_en_lote(objs, campos=CAMPOS_ACTUALIZABLES):
+    """
+    UPDATE ... WHERE id = %s de los `campos` de cada objeto, ejecutado con executemany (array
+    DML en Oracle). bulk_update genera un CASE por campo y fila, que con 37 columnas es mucho más lento.
+    """
+    opts = CalificacionTributaria._meta
+    campos = [opts.get_field(nombre) for nombre in campos]
+    qn = connection.ops.quote_name
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        qn(opts.db_table),
+        ', '.join(f'{qn(campo.column)} = %s' for campo in campos),
+        qn(opts.pk.column),
+    )
+    parametros = [
+        [campo.get_db_prep_save(getattr(obj, campo.attname), connection) for campo in campos] + [obj.pk]
+        for obj in objs
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, parametros)
+
+
+def _upsert_bloque(corredor, bloque, carga_id=None):
+    """
+    Aplica un bloque de registros con una consulta de claves existentes (con su hash de
+    contenido), un bulk_create y un UPDATE en lote solo de las filas cuyo hash cambió. El
+    resumen por periodo se ajusta con el aporte de las filas escritas. Las filas escritas
+    quedan marcadas con `carga_id` (el TrabajoCarga) y su historial también.
+    Devuelve (creados, actualizados, sin_cambios).
+    """
+    ahora = timezone.now()
+    pendientes = {}
+    for instrumento, fecha, defaults in bloque:
+        clave = _normalizar_clave(instrumento, fecha)
+        pendientes.setdefault(clave, []).append(defaults)
+
+    instrumentos = {clave[0] for clave in pendientes}
+    fechas = {clave[1] for clave in pendientes}
+    existentes = {
+        (instrumento, fecha): (pk, hash_actual)
+        for pk, instrumento, fecha, hash_actual in CalificacionTributaria.objects.filter(
+            corredor=corredor, instrumento__in=instrumentos, fecha__in=fechas
+        ).values_list('id', 'instrumento', 'fecha', 'hash_contenido')
+    }
+
+    a_crear, a_actualizar = [], []
+    creados = actualizados = sin_cambios = 0
+    for (instrumento, fecha), filas in pendientes.items():
+        # Si la clave se repite en el archivo gana la última fila, igual que con update_or_create
+        defaults = filas[-1]
+        if (instrumento, fecha) in existentes:
+            pk, hash_actual = existentes[(instrumento, fecha)]
+            # Mismo contenido: no se reescribe (ni cambia fecha_modificacion ni genera redo)
+            if hash_actual is not None and hash_actual == defaults.get('hash_contenido'):
+                sin_cambios += 1
+                actualizados += len(filas) - 1
+                continue
+        obj = CalificacionTributaria(
+            corredor=corredor, instrumento=instrumento, fecha=fecha,
+            fecha_modificacion=ahora, factores_empaquetados=empaquetar_valores(defaults),
+            ultima_carga_id=carga_id, **defaults
+        )
+        if (instrumento, fecha) in existentes:
+            obj.pk = existentes[(instrumento, fecha)][0]
+            a_actualizar.append((obj, defaults))
+            actualizados += len(filas)
+        else:
+            a_crear.append(obj)
+            creados += 1
+            actualizados += len(filas) - 1
+
+    historial, anteriores, nuevos = [], {}, []
+    if a_crear:
+        CalificacionTributaria.objects.bulk_create(a_crear)
+        historial.extend(entrada_historial(obj.pk, 'CRE', 'CAR', fecha=ahora, carga_id=carga_id) for obj in a_crear)
+        nuevos.extend(valores_calificacion(obj) for obj in a_crear)
+    if a_actualizar:
+        # Valores actuales solo de las filas que cambian, para guardar en el historial los campos modificados
+        anteriores = {
+            pk: dict(zip(CAMPOS_HISTORIAL, valores))
+            for pk, *valores in CalificacionTributaria.objects.filter(
+                pk__in=[obj.pk for obj, _ in a_actualizar]
+            ).values_list('id', *CAMPOS_HISTORIAL)
+        }
+        for obj, defaults in a_actualizar:
+            # La carga anterior de la fila también se guarda: al revertir esta carga vuelve a quedar marcada
+            cambios = diferencias(anteriores[obj.pk], {**defaults, 'ultima_carga_id': carga_id})
+            if cambios:
+                historial.append(entrada_historial(obj.pk, 'MOD', 'CAR', cambios, ahora, carga_id))
+            # La carga no reescribe tipo_mercado ni los demás campos fuera de defaults
+            nuevos.append({**anteriores[obj.pk], **defaults})
+        actualizar_en_lote([obj for obj, _ in a_actualizar])
+    guardar_historial(historial)
+    ajustar_resumen(anteriores.values(), nuevos)
+    return creados, actualizados, sin_cambios
+
+
+def upsert_calificaciones(corredor, registros, tamano_bloque=TAMANO_BLOQUE, carga_id=None):
+    """
+    Inserta o actualiza calificaciones del corredor de forma masiva.
+
+    `registros` es un iterable de tuplas (instrumento, fecha, defaults). Todo el
+    archivo se aplica en una sola transacción y se devuelven los contadores
+    (creados, actualizados, sin_cambios): los dos primeros con la misma semántica que
+    update_or_create fila a fila, salvo que las filas idénticas a las guardadas (según
+    defaults['hash_contenido']) no se reescriben y se cuentan aparte. `carga_id` es el
+    TrabajoCarga al que se asocian las filas escritas (ver reversion.revertir_carga).
+    """
+    creados = actualizados = sin_cambios = 0
+    with transaction.atomic():
+        for bloque in _en_bloques(registros, tamano_bloque):
+            c, a, s = _upsert_bloque(corredor, bloque, carga_id)
+            creados += c
+            actualizados += a
+            sin_cambios += s
+        # En la misma transacción: la grilla cacheada del corredor se invalida al confirmar
+        if creados or actualizados:
+            invalidar_corredor(corredor)
+    return creados, actualizados, sin_cambios
+
+
+# --- Construcción de registros desde el DataFrame ---
+def registros_factores(df):
+    # Hash de contenido de todo el bloque en una pasada (factores escalados como los guarda la columna)
+    factores = np.zeros((len(df), len(FACTORES)), dtype=np.float64)
+    for j, campo in enumerate(FACTORES):
+        if campo in df.columns:
+            columna = df[campo]
+            if columna.dtype == object:
+                columna = pd.to_numeric(columna.astype(str).str.replace(',', '.', regex=False))
+            factores[:, j] = columna
+    hashes = hash_carga(df, escalar_matriz(factores), 'FAC')
+    for row, hash_fila in zip(df.to_dict('records'), hashes):
+        defaults = datos_basicos(row, 'FAC')
+        for campo in FACTORES:
+            defaults[campo] = a_decimal(row.get(campo, '0.0'))
+        defaults['hash_contenido'] = int(hash_fila)
+        yield row['instrumento'], row['fecha'], defaults
+
+
+def registros_montos(df):
+    # Factores y hash de contenido de todo el DataFrame en una sola pasada vectorizada
+    factores = factores_desde_dataframe(df)
+    hashes = hash_carga(df, factores, 'MON')
+    for row, fila_factores, hash_fila in zip(df.to_dict('records'), factores, hashes):
+        yield row['instrumento'], row['fecha'], {
+            **datos_basicos(row, 'MON'), **fila_a_factores(fila_factores), 'hash_contenido': int(hash_fila),
+        }
+
+
+# --- Lectura del CSV por bloques (memoria acotada) ---
+COLUMNAS_COMUNES = [
+    'instrumento', 'fecha', 'secuencia', 'numero_dividendo',
+    'tipo_sociedad', 'valor_historico', 'instrumento_no_inscrito',
+]
+
+# Tipos explícitos: evita la inferencia por bloque y que los montos/factores lleguen como texto.
+# valor_historico se lee como texto porque admite 18 dígitos (más de lo exacto en float64).
+DTYPES_COMUNES = {
+    'instrumento': str,
+    'fecha': str,
+    'secuencia': 'int64',
+    'numero_dividendo': 'int64',
+    'tipo_sociedad': str,
+    'valor_historico': str,
+}
+
+TIPOS_CARGA = {
+    'FAC': (FACTORES, registros_factores),
+    'MON': (COLUMNAS_MONTO, registros_montos),
+}
+
+
+# Columnas numéricas con decimales: solo en ellas se busca la coma (los textos pueden traer comas)
+COLUMNAS_DECIMALES = {'valor_historico', *FACTORES, *COLUMNAS_MONTO}
+
+
+def detectar_decimal(archivo, muestra=65536):
+    """
+    Separador decimal del archivo (',' o '.'), según los valores de las columnas numéricas de las
+    primeras filas. Los archivos de corredores usan coma decimal, pero se siguen aceptando los que
+    usan punto. Deja el archivo al inicio.
+    """
+    inicio = archivo.read(muestra)
+    archivo.seek(0)
+    if isinstance(inicio, bytes):
+        inicio = inicio.decode('utf-8-sig', errors='ignore')
+    lineas = inicio.splitlines()
+    if len(inicio) == muestra:
+        # La última línea de la muestra puede venir cortada
+        lineas = lineas[:-1]
+    filas = csv.reader(io.StringIO('\n'.join(lineas)), delimiter=';')
+    encabezado = next(filas, [])
+    posiciones = [i for i, columna in enumerate(encabezado) if columna.strip() in COLUMNAS_DECIMALES]
+    for fila in filas:
+        if any(',' in fila[i] for i in posiciones if i < len(fila)):
+            return ','
+    return '.'
+
+
+def leer_csv_por_bloques(archivo, tipo, tamano_bloque=TAMANO_BLOQUE_CSV, decimal=None):
+    """
+    Itera el CSV (separado por ';') en DataFrames de `tamano_bloque` filas,
+    leyendo solo las columnas que usa la carga `tipo` ('FAC' o 'MON'). Sin `decimal`
+    se detecta el separador decimal del archivo.
+    """
+    columnas_valor = TIPOS_CARGA[tipo][0]
+    permitidas = set(COLUMNAS_COMUNES) | set(columnas_valor)
+    dtypes = {**DTYPES_COMUNES, **{col: 'float64' for col in columnas_valor}}
+    return pd.read_csv(
+        archivo,
+        sep=';',
+        decimal=decimal or detectar_decimal(archivo),
+        usecols=lambda col: col in permitidas,
+        dtype=dtypes,
+        chunksize=tamano_bloque,
+    )
+
+
+def aplicar_bloques(corredor, tipo, bloques, al_procesar_bloque=None, confirmar_por_bloque=False, carga_id=None):
+    """
+    Escritor único: aplica en orden los bloques (numero, filas, registros) ya preparados.
+    Devuelve (creados, actualizados, sin_cambios, detalle_por_bloque).
+
+    Por defecto todo va en una sola transacción. Con `confirmar_por_bloque` cada bloque
+    se confirma por separado junto con `al_procesar_bloque` (que recibe su detalle).
+    """
+    creados = actualizados = sin_cambios = 0
+    detalles = []
+    with nullcontext() if confirmar_por_bloque else transaction.atomic():
+        for numero, filas, registros in bloques:
+            inicio = time.perf_counter()
+            with transaction.atomic():
+                c, a, s = upsert_calificaciones(corredor, registros, carga_id=carga_id)
+                detalle = {
+                    'bloque': numero,
+                    'filas': filas,
+                    'creados': c,
+                    'actualizados': a,
+                    'sin_cambios': s,
+                    'segundos': round(time.perf_counter() - inicio, 3),
+                }
+                if al_procesar_bloque:
+                    al_procesar_bloque(detalle)
+            creados += c
+            actualizados += a
+            sin_cambios += s
+            detalles.append(detalle)
+            logger.info('Carga %s corredor=%s bloque=%s filas=%s creados=%s actualizados=%s sin_cambios=%s (%.3fs)',
+                        tipo, corredor.codigo_corredor, numero, filas, c, a, s, detalle['segundos'])
+    return creados, actualizados, sin_cambios, detalles
+
+
+def cargar_archivo(corredor, archivo, tipo, tamano_bloque=TAMANO_BLOQUE_CSV, al_procesar_bloque=None,
+                   desde_bloque=1, confirmar_por_bloque=False, carga_id=None):
+    """
+    Carga masiva en streaming: lee, valida, calcula y aplica el archivo bloque a bloque.
+    Devuelve (creados, actualizados, sin_cambios, bloques), donde `bloques` es el detalle por bloque.
+    `desde_bloque` permite retomar una carga interrumpida (ver aplicar_bloques). Un bloque que no
+    pasa la validación (las reglas de validacion.validar_bloque) lanza ValueError antes de escribirse.
+    """
+    # validacion importa este módulo: se importa aquí para no formar un ciclo
+    from .validacion import verificar_bloque
+
+    construir_registros = TIPOS_CARGA[tipo][1]
+    decimal = detectar_decimal(archivo)
+
+    def preparar(numero, df):
+        verificar_bloque(df, tipo, decimal, numero, (numero - 1) * tamano_bloque + 2)
+        return numero, len(df), construir_registros(df)
+
+    bloques = (
+        preparar(numero, df)
+        for numero, df in enumerate(leer_csv_por_bloques(archivo, tipo, tamano_bloque, decimal), start=1)
+        if numero >= desde_bloque
+    )
+    return aplicar_bloques(corredor, tipo, bloques, al_procesar_bloque, confirmar_por_bloque, carga_id)
@@ -0,0 +1,104 @@
+# calificaciones/carga_paralela.py
+# Carga masiva con preparación en paralelo: un pool de procesos lee, valida y calcula cada bloque
+# (factores y hash de contenido) y un único escritor aplica los upserts en el orden del archivo
+import io
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count, islice
+
+import django
+import pandas as pd
+from django.conf import settings
+
+from .carga_masiva import (
+    COLUMNAS_COMUNES, DTYPES_COMUNES, TAMANO_BLOQUE_CSV, TIPOS_CARGA, aplicar_bloques, detectar_decimal,
+)
+from .validacion import verificar_bloque
+
+
+def procesos_carga():
+    return max(1, getattr(settings, 'CARGA_PROCESOS', 1))
+
+
+def _bloques_crudos(archivo, tamano_bloque):
+    """
+    Corta el archivo en bloques de `tamano_bloque` líneas sin interpretarlas (barato: el parseo
+    lo hace cada proceso). Genera (numero, primera_linea, encabezado, datos); asume que los
+    campos no contienen saltos de línea, como en los archivos de carga.
+    """
+    # Con readline y no iterando el archivo: File de Django vuelve al inicio al iterarlo
+    lineas_archivo = iter(archivo.readline, b'')
+    encabezado = next(lineas_archivo, b'')
+    linea = 2
+    for numero in count(1):
+        lineas = list(islice(lineas_archivo, tamano_bloque))
+        if not lineas:
+            return
+        yield numero, linea, encabezado, b''.join(lineas)
+        linea += len(lineas)
+
+
+def preparar_bloque(tarea):
+    """
+    Trabajo de cada proceso: parsea el bloque, lo valida (las mismas reglas que validar_archivo)
+    y construye los registros del upsert con sus factores y hash. Devuelve (numero, filas, registros)
+    o lanza ValueError con los primeros errores del bloque.
+    """
+    numero, primera_linea, encabezado, datos, tipo, decimal = tarea
+    columnas_valor, construir_registros = TIPOS_CARGA[tipo]
+    permitidas = set(COLUMNAS_COMUNES) | set(columnas_valor)
+    try:
+        df = pd.read_csv(
+            io.BytesIO(encabezado + datos),
+            sep=';',
+            decimal=decimal,
+            usecols=lambda col: col in permitidas,
+            dtype={**DTYPES_COMUNES, **{col: 'float64' for col in columnas_valor}},
+        )
+    except ValueError as e:
+        raise ValueError(f'Bloque {numero} (desde la fila {primera_linea}): {e}') from e
+
+    verificar_bloque(df, tipo, decimal, numero, primera_linea)
+    # Los registros se materializan aquí: el escritor solo recibe datos listos para el upsert
+    return numero, len(df), list(construir_registros(df))
+
+
+def _preparados_en_orden(tareas, procesos):
+    """
+    Resultados de preparar_bloque en el orden de las tareas. Como mucho 2 bloques por proceso
+    quedan en vuelo, así la memoria no depende del tamaño del archivo.
+    """
+    if procesos == 1:
+        yield from map(preparar_bloque, tareas)
+        return
+    # spawn: los procesos no heredan las conexiones a la base (ni el pool de Oracle) del escritor.
+    # El inicializador es django.setup y no una función de este módulo: importarlo en el proceso
+    # nuevo carga los modelos, que necesitan las apps ya inicializadas.
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(procesos, mp_context=contexto, initializer=django.setup) as pool:
+        en_vuelo = deque()
+        for tarea in tareas:
+            en_vuelo.append(pool.submit(preparar_bloque, tarea))
+            if len(en_vuelo) >= 2 * procesos:
+                yield en_vuelo.popleft().result()
+        while en_vuelo:
+            yield en_vuelo.popleft().result()
+
+
+def cargar_archivo_paralelo(corredor, archivo, tipo, procesos=None, tamano_bloque=TAMANO_BLOQUE_CSV,
+                            al_procesar_bloque=None, desde_bloque=1, confirmar_por_bloque=False, carga_id=None):
+    """
+    Igual que cargar_archivo (mismos parámetros y resultado), con `procesos` procesos preparando
+    bloques (por defecto settings.CARGA_PROCESOS). El resultado no depende de la cantidad de
+    procesos: los bloques se aplican en el orden del archivo y la última fila de una clave gana.
+    """
+    procesos = procesos or procesos_carga()
+    decimal = detectar_decimal(archivo)
+    tareas = (
+        (numero, primera_linea, encabezado, datos, tipo, decimal)
+        for numero, primera_linea, encabezado, datos in _bloques_crudos(archivo, tamano_bloque)
+        if numero >= desde_bloque
+    )
+    return aplicar_bloques(corredor, tipo, _preparados_en_orden(tareas, procesos), al_procesar_bloque,
+                           confirmar_por_bloque, carga_id)
@@ -0,0 +1,73 @@
+# calificaciones/consultas.py
+# Consultas compartidas por el mantenedor y los reportes
+import base64
+import json
+from datetime import date
+
+from django.db.models import Q
+
+
+def rango_periodo(periodo_comercial):
+    """
+    Año comercial como rango [1 de enero, 1 de enero del año siguiente). A diferencia de
+    fecha__year (EXTRACT(YEAR ...) en Oracle) este predicado puede usar los índices por fecha.
+    """
+    return date(periodo_comercial, 1, 1), date(periodo_comercial + 1, 1, 1)
+
+
+def aplicar_filtros(calificaciones, filtro_form):
+    """
+    Aplica los filtros del FiltroCalificacionesForm (si es válido) al queryset.
+    """
+    if filtro_form.is_valid():
+        tipo_mercado = filtro_form.cleaned_data.get('tipo_mercado')
+        origen = filtro_form.cleaned_data.get('origen')
+        periodo_comercial = filtro_form.cleaned_data.get('periodo_comercial')
+        instrumento = filtro_form.cleaned_data.get('instrumento')
+        if tipo_mercado: calificaciones = calificaciones.filter(tipo_mercado=tipo_mercado)
+        if origen: calificaciones = calificaciones.filter(origen=origen)
+        if periodo_comercial:
+            desde, hasta = rango_periodo(periodo_comercial)
+            calificaciones = calificaciones.filter(fecha__gte=desde, fecha__lt=hasta)
+        if instrumento: calificaciones = calificaciones.filter(instrumento=instrumento)
+    return calificaciones
+
+
+# --- Paginación por keyset (seek) sobre (-fecha, instrumento, id) ---
+ORDEN_GRILLA = ('-fecha', 'instrumento', 'id')
+TAMANOS_PAGINA = (25, 50, 100, 200)
+TAMANO_PAGINA = 50
+
+
+def codificar_cursor(calificacion):
+    valor = json.dumps([calificacion.fecha.isoformat(), calificacion.instrumento, calificacion.id])
+    return base64.urlsafe_b64encode(valor.encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    """
+    Devuelve (fecha, instrumento, id) o lanza ValueError si el cursor no es válido.
+    """
+    try:
+        fecha, instrumento, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return date.fromisoformat(fecha), str(instrumento), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Cursor de paginación inválido.') from e
+
+
+def pagina_keyset(calificaciones, cursor=None, tamano=TAMANO_PAGINA):
+    """
+    Una página de la grilla a partir del cursor (sin OFFSET: cada página cuesta lo mismo
+    y usa el índice (corredor, -fecha, instrumento)). Devuelve (filas, siguiente_cursor).
+    """
+    calificaciones = calificaciones.order_by(*ORDEN_GRILLA)
+    if cursor:
+        fecha, instrumento, pk = decodificar_cursor(cursor)
+        calificaciones = calificaciones.filter(
+            Q(fecha__lt=fecha)
+            | Q(fecha=fecha, instrumento__gt=instrumento)
+            | Q(fecha=fecha, instrumento=instrumento, id__gt=pk)
+        )
+    filas = list(calificaciones[:tamano + 1])
+    siguiente = codificar_cursor(filas[tamano - 1]) if len(filas) > tamano else None
+    return filas[:tamano], siguiente
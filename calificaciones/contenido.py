@@ -0,0 +1,92 @@
+# calificaciones/contenido.py
+# Hash del contenido de negocio de cada calificación: las cargas masivas solo escriben las filas que cambian
+from hashlib import blake2b
+
+import numpy as np
+
+from .calculos import COLUMNAS_FACTOR, escalar_decimal
+
+# Lo que reescribe el upsert (sin la marca de modificación): si el hash no cambia, la fila tampoco
+CAMPOS_CONTENIDO = [
+    'secuencia', 'numero_dividendo', 'tipo_sociedad', 'valor_historico',
+    'instrumento_no_inscrito', 'fuente_ingreso', *COLUMNAS_FACTOR,
+]
+ESCALA_VALOR_HISTORICO = 2
+
+# Serialización canónica de una fila: enteros de 64 bits little-endian y textos UTF-8 de ancho fijo
+# (tipo_sociedad y fuente_ingreso tienen a lo más 3 caracteres). El hash depende solo de estos bytes.
+_REGISTRO = np.dtype([
+    ('secuencia', '<i8'),
+    ('numero_dividendo', '<i8'),
+    ('tipo_sociedad', 'S8'),
+    ('valor_historico', '<i8'),
+    ('instrumento_no_inscrito', '<i8'),
+    ('fuente_ingreso', 'S8'),
+    ('factores', '<i8', (len(COLUMNAS_FACTOR),)),
+])
+
+
+def _escalar(valores, escala):
+    # Decimales exactos (valor_historico admite 18 dígitos, más de lo exacto en float64)
+    return np.array([escalar_decimal(valor, escala) for valor in valores], dtype=np.int64)
+
+
+def _texto(valores):
+    return np.array([str(valor).encode('utf-8') for valor in valores], dtype='S8')
+
+
+def hash_contenido(secuencia, numero_dividendo, tipo_sociedad, valor_historico, instrumento_no_inscrito,
+                   fuente_ingreso, factores):
+    """
+    Hash de 64 bits por fila a partir de columnas ya normalizadas (arrays de largo N) y la matriz
+    (N, 30) de factores escalados por 10**8: BLAKE2b de la serialización canónica de la fila
+    (_REGISTRO). No depende de la versión de pandas ni de NumPy ni del proceso. Si cambia la
+    serialización, `manage.py recalcular_hashes` actualiza los hashes guardados.
+    """
+    registros = np.zeros(len(secuencia), dtype=_REGISTRO)
+    registros['secuencia'] = np.asarray(secuencia, dtype=np.int64)
+    registros['numero_dividendo'] = np.asarray(numero_dividendo, dtype=np.int64)
+    registros['tipo_sociedad'] = _texto(tipo_sociedad)
+    registros['valor_historico'] = _escalar(valor_historico, ESCALA_VALOR_HISTORICO)
+    registros['instrumento_no_inscrito'] = np.asarray(instrumento_no_inscrito, dtype=bool)
+    registros['fuente_ingreso'] = _texto(fuente_ingreso)
+    registros['factores'] = np.asarray(factores, dtype=np.int64).reshape(len(registros), len(COLUMNAS_FACTOR))
+    tamano = _REGISTRO.itemsize
+    datos = registros.tobytes()
+    digestos = b''.join(
+        blake2b(datos[inicio:inicio + tamano], digest_size=8).digest() for inicio in range(0, len(datos), tamano)
+    )
+    # Entero con signo de 64 bits para guardarlo en un BigIntegerField
+    return np.frombuffer(digestos, dtype='<i8').astype(np.int64)
+
+
+def hash_carga(df, factores, fuente):
+    """
+    Hash de cada fila de un bloque de carga masiva, con los mismos valores por defecto que datos_basicos.
+    """
+    n = len(df)
+
+    def columna(nombre, defecto):
+        return df[nombre].to_numpy() if nombre in df.columns else np.full(n, defecto, dtype=object)
+
+    return hash_contenido(
+        columna('secuencia', 0),
+        columna('numero_dividendo', 0),
+        columna('tipo_sociedad', 'A'),
+        columna('valor_historico', '0.0'),
+        [bool(valor) for valor in columna('instrumento_no_inscrito', False)],
+        np.full(n, fuente, dtype=object),
+        factores,
+    )
+
+
+def hash_valores(valores):
+    """
+    Hash de una sola calificación a partir de sus valores ({campo: valor}), p. ej. al guardar una instancia.
+    """
+    factores = [[escalar_decimal(valores[columna]) for columna in COLUMNAS_FACTOR]]
+    return int(hash_contenido(
+        [valores['secuencia']], [valores['numero_dividendo']], [valores['tipo_sociedad']],
+        [valores['valor_historico']], [bool(valores['instrumento_no_inscrito'])], [valores['fuente_ingreso']],
+        factores,
+    )[0])
@@ -0,0 +1,105 @@
+# calificaciones/empaquetado.py
+# Factores empaquetados: los 30 factores como enteros escalados por 10**8 en una sola columna binaria
+import numpy as np
+from django.conf import settings
+
+from .calculos import COLUMNAS_FACTOR, ESCALA_FACTOR, escalar_decimal, escalar_matriz
+
+# int32 little-endian: un factor (9 dígitos, 8 decimales) escalado por 10**8 cabe en 31 bits
+DTYPE_EMPAQUETADO = np.dtype('<i4')
+BYTES_EMPAQUETADO = DTYPE_EMPAQUETADO.itemsize * len(COLUMNAS_FACTOR)
+TAMANO_LECTURA_FACTORES = 5000
+_UNO = 10 ** ESCALA_FACTOR
+
+
+def empaquetado_activo():
+    return getattr(settings, 'FACTORES_EMPAQUETADOS', False)
+
+
+def a_entero(valor):
+    # Decimal (o número) -> entero escalado por 10**8, con el mismo redondeo que la columna
+    return escalar_decimal(valor)
+
+
+def empaquetar(enteros):
+    return np.asarray(enteros, dtype=np.int64).astype(DTYPE_EMPAQUETADO).tobytes()
+
+
+def vector_desde_valores(valores):
+    # {'factor_8': Decimal, ...} -> array int64 de 30 factores escalados
+    return np.array([a_entero(valores[columna]) for columna in COLUMNAS_FACTOR], dtype=np.int64)
+
+
+def empaquetar_valores(valores):
+    """
+    Bytes empaquetados desde un dict {'factor_8': Decimal, ...} (o None si el modo está apagado:
+    la columna queda en NULL y los lectores usan las 30 columnas).
+    """
+    if not empaquetado_activo():
+        return None
+    return empaquetar(vector_desde_valores(valores))
+
+
+def desempaquetar(datos):
+    return np.frombuffer(bytes(datos), dtype=DTYPE_EMPAQUETADO).astype(np.int64)
+
+
+def texto_factor(entero):
+    # Mismo texto que str(Decimal) con 8 decimales, sin pasar por Decimal
+    signo = '-' if entero < 0 else ''
+    entero = abs(int(entero))
+    return f'{signo}{entero // _UNO}.{entero % _UNO:0{ESCALA_FACTOR}d}'
+
+
+def matriz_desde_columnas(filas):
+    return escalar_matriz(np.array(filas, dtype=np.float64).reshape(-1, len(COLUMNAS_FACTOR)))
+
+
+def vectores_factores(calificaciones):
+    """
+    {id: vector int64 de 30 factores} para instancias cargadas con `factores_empaquetados`.
+    Las que aún no están empaquetadas se completan con una sola consulta a las 30 columnas.
+    """
+    vectores, faltantes = {}, []
+    modelo = None
+    for calificacion in calificaciones:
+        modelo = type(calificacion)
+        if calificacion.factores_empaquetados is not None:
+            vectores[calificacion.pk] = desempaquetar(calificacion.factores_empaquetados)
+        else:
+            faltantes.append(calificacion.pk)
+    if faltantes:
+        for pk, *factores in modelo._default_manager.filter(pk__in=faltantes).values_list('id', *COLUMNAS_FACTOR):
+            vectores[pk] = matriz_desde_columnas([factores])[0]
+    return vectores
+
+
+def matriz_factores(calificaciones, chunk_size=TAMANO_LECTURA_FACTORES):
+    """
+    Lee los factores de un queryset directo a NumPy: devuelve (ids, matriz int64 (N, 30)
+    escalada por 10**8) sin crear objetos Decimal. Con el modo empaquetado se lee una sola
+    columna binaria; las filas sin empaquetar (o con el modo apagado) se leen de las 30 columnas.
+    """
+    calificaciones = calificaciones.order_by('id')
+    ids, trozos = [], []
+    if empaquetado_activo():
+        datos = bytearray()
+        empaquetadas = calificaciones.filter(factores_empaquetados__isnull=False)
+        for pk, empaquetado in empaquetadas.values_list('id', 'factores_empaquetados').iterator(chunk_size=chunk_size):
+            ids.append(pk)
+            datos += empaquetado
+        if datos:
+            trozos.append(np.frombuffer(datos, dtype=DTYPE_EMPAQUETADO).reshape(-1, len(COLUMNAS_FACTOR)).astype(np.int64))
+        calificaciones = calificaciones.filter(factores_empaquetados__isnull=True)
+    filas = []
+    for pk, *factores in calificaciones.values_list('id', *COLUMNAS_FACTOR).iterator(chunk_size=chunk_size):
+        ids.append(pk)
+        filas.append(factores)
+    if filas:
+        trozos.append(matriz_desde_columnas(filas))
+    if not trozos:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(COLUMNAS_FACTOR)), dtype=np.int64)
+    ids = np.asarray(ids, dtype=np.int64)
+    matriz = np.concatenate(trozos)
+    orden = np.argsort(ids, kind='stable')
+    return ids[orden], matriz[orden]
@@ -0,0 +1,363 @@
+# calificaciones/exportacion.py
+# Exportaciones en streaming (XLSX para reportes; CSV, JSON Lines, Parquet y Arrow para sistemas):
+# el archivo se escribe por partes mientras se recorre el queryset
+import csv
+import io
+import json
+import re
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .calculos import COLUMNAS_FACTOR
+from .models import TrabajoCarga
+from .serializacion import Serializador, campo_de_ruta
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet/Arrow son opcionales: sin pyarrow solo se ofrece CSV
+    pa = pq = None
+
+# Filas por cada lectura a la base (iterator) y por cada trozo enviado al cliente
+TAMANO_LECTURA = 2000
+
+_EPOCA_EXCEL = datetime(1899, 12, 30)
+_CONTROL_INVALIDO = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Estilo 1: fecha (formato 14), estilo 2: fecha y hora (formato 22)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '</cellXfs>'
+    # Estilo "Normal" por defecto: sin él algunos lectores (openpyxl, LibreOffice) lo reemplazan con el suyo
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def _workbook(nombre_hoja):
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(nombre_hoja[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+class _SalidaStreaming(io.RawIOBase):
+    """
+    Destino no posicionable para ZipFile y pyarrow: acumula lo escrito hasta que se vacía.
+    Al no poder hacer seek, zipfile usa descriptores de datos y no necesita reescribir cabeceras.
+    """
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._posicion
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+_NUMERICOS = (int, float, Decimal)
+
+
+def _celda(valor, zona):
+    # Los factores numéricos son la gran mayoría de las celdas: se evalúan primero
+    tipo = type(valor)
+    if tipo in _NUMERICOS:
+        return f'<c><v>{valor}</v></c>'
+    if valor is None or valor == '':
+        return '<c/>'
+    if tipo is bool:
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, datetime):
+        if timezone.is_aware(valor):
+            valor = timezone.make_naive(valor, zona)
+        dias = (valor - _EPOCA_EXCEL).total_seconds() / 86400
+        return f'<c s="2"><v>{dias:.6f}</v></c>'
+    if isinstance(valor, date):
+        return f'<c s="1"><v>{(valor - _EPOCA_EXCEL.date()).days}</v></c>'
+    if isinstance(valor, _NUMERICOS):
+        return f'<c><v>{valor}</v></c>'
+    texto = escape(_CONTROL_INVALIDO.sub('', str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila(valores, zona):
+    return '<row>' + ''.join([_celda(v, zona) for v in valores]) + '</row>'
+
+
+def generar_xlsx(encabezados, filas, nombre_hoja='Reporte', filas_por_trozo=TAMANO_LECTURA):
+    """
+    Generador de bytes de un XLSX con una hoja. `filas` es cualquier iterable de tuplas
+    (por ejemplo un values_list().iterator()); la memoria usada no depende de su largo.
+    """
+    zona = timezone.get_current_timezone()
+    salida = _SalidaStreaming()
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as libro:
+        libro.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        libro.writestr('_rels/.rels', _RELS)
+        libro.writestr('xl/workbook.xml', _workbook(nombre_hoja))
+        libro.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        libro.writestr('xl/styles.xml', _STYLES)
+        yield salida.vaciar()
+
+        with libro.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as hoja:
+            hoja.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + _fila(encabezados, zona)
+            ).encode())
+            pendientes = []
+            for valores in filas:
+                pendientes.append(_fila(valores, zona))
+                if len(pendientes) >= filas_por_trozo:
+                    hoja.write(''.join(pendientes).encode())
+                    pendientes.clear()
+                    yield salida.vaciar()
+            hoja.write((''.join(pendientes) + '</sheetData></worksheet>').encode())
+    yield salida.vaciar()
+
+
+# --- Exportación masiva para sistemas externos ---
+# Mismas columnas que aceptan las cargas masivas (un CSV exportado se puede volver a cargar
+# como carga de factores); las columnas extra al final son ignoradas por el cargador.
+COLUMNAS_EXPORTACION = [
+    ('corredor', 'corredor__codigo_corredor'),
+    ('instrumento', 'instrumento'),
+    ('fecha', 'fecha'),
+    ('secuencia', 'secuencia'),
+    ('numero_dividendo', 'numero_dividendo'),
+    ('tipo_sociedad', 'tipo_sociedad'),
+    ('valor_historico', 'valor_historico'),
+    ('instrumento_no_inscrito', 'instrumento_no_inscrito'),
+    *[(campo, campo) for campo in COLUMNAS_FACTOR],
+    ('tipo_mercado', 'tipo_mercado'),
+    ('origen', 'origen'),
+    ('fuente_ingreso', 'fuente_ingreso'),
+    ('fecha_modificacion', 'fecha_modificacion'),
+]
+
+FORMATOS_EXPORTACION = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+
+def formatos_disponibles():
+    return [formato for formato in FORMATOS_EXPORTACION if formato in ('csv', 'jsonl') or pa is not None]
+
+
+def leer_marca(texto):
+    """
+    Fecha ISO 8601 de una sincronización incremental (sin zona horaria se asume la del proyecto).
+    Lanza ValueError si no es válida.
+    """
+    marca = parse_datetime(texto.strip())
+    if marca is None:
+        raise ValueError(f'Fecha de sincronización inválida: {texto!r} (use ISO 8601).')
+    if timezone.is_naive(marca):
+        marca = timezone.make_aware(marca)
+    return marca
+
+
+def marca_exportacion(corredores=None):
+    """
+    Hasta dónde llega una exportación incremental (la marca que usará la siguiente como `desde`).
+    Las cargas y ediciones fechan fecha_modificacion antes de confirmar: una fila fechada antes de
+    la marca pero confirmada después de exportar quedaría fuera de esta exportación y de la
+    siguiente. Por eso la marca se atrasa EXPORTACION_MARGEN_SEGUNDOS y nunca pasa del inicio de
+    una carga en proceso (con latido vigente) de los `corredores` exportados (todos si es None),
+    cuyas filas pueden seguir sin confirmar.
+    """
+    ahora = timezone.now()
+    marca = ahora - timedelta(seconds=settings.EXPORTACION_MARGEN_SEGUNDOS)
+    en_proceso = TrabajoCarga.objects.filter(
+        estado='PRO', latido__gte=ahora - timedelta(seconds=settings.CARGA_LEASE_SEGUNDOS),
+    )
+    if corredores is not None:
+        en_proceso = en_proceso.filter(corredor__in=corredores)
+    inicio = en_proceso.order_by('fecha_inicio').values_list('fecha_inicio', flat=True).first()
+    if inicio is not None and inicio <= marca:
+        # Filtro `lte`: se corre un microsegundo para dejar fuera lo fechado al mismo instante
+        marca = inicio - timedelta(microseconds=1)
+    return marca
+
+
+def consulta_exportacion(calificaciones, desde=None, hasta=None):
+    """
+    Filas a exportar como tuplas en el orden de COLUMNAS_EXPORTACION. Con `desde` solo se
+    incluyen las modificadas después de esa fecha y hasta `hasta` (sincronización incremental,
+    ver marca_exportacion); sin `desde` la exportación es completa y `hasta` no se aplica. El
+    orden por fecha_modificacion permite retomar una sincronización interrumpida.
+    Las calificaciones eliminadas no aparecen en una exportación incremental: para reflejar
+    eliminaciones el sistema que sincroniza debe pedir una exportación completa.
+    """
+    if desde is not None:
+        calificaciones = calificaciones.filter(fecha_modificacion__gt=desde)
+        if hasta is not None:
+            calificaciones = calificaciones.filter(fecha_modificacion__lte=hasta)
+    return (
+        calificaciones.order_by('fecha_modificacion', 'id')
+        .values_list(*[campo for _, campo in COLUMNAS_EXPORTACION])
+        .iterator(chunk_size=TAMANO_LECTURA)
+    )
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+
+def generar_csv(filas, encabezados=None, filas_por_trozo=TAMANO_LECTURA):
+    """
+    Generador de bytes CSV separado por ';' (el formato de las cargas masivas), con punto decimal.
+    Sin `encabezados` se usan los de COLUMNAS_EXPORTACION.
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=';', lineterminator='\n')
+    escritor.writerow(encabezados or [columna for columna, _ in COLUMNAS_EXPORTACION])
+    pendientes = 0
+    for valores in filas:
+        escritor.writerow([_valor_csv(v) for v in valores])
+        pendientes += 1
+        if pendientes >= filas_por_trozo:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pendientes = 0
+    yield buffer.getvalue().encode()
+
+
+def generar_jsonl(filas, filas_por_trozo=TAMANO_LECTURA):
+    """
+    Generador de bytes JSON Lines: un objeto por calificación con las claves de COLUMNAS_EXPORTACION.
+    """
+    serializador = Serializador(COLUMNAS_EXPORTACION)
+    codificar = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    trozo = []
+    for data in serializador.filas(filas):
+        trozo.append(codificar(data))
+        if len(trozo) >= filas_por_trozo:
+            yield ('\n'.join(trozo) + '\n').encode()
+            trozo.clear()
+    if trozo:
+        yield ('\n'.join(trozo) + '\n').encode()
+
+
+def _tipo_arrow(campo):
+    tipo = campo.get_internal_type()
+    if tipo == 'DecimalField':
+        return pa.decimal128(campo.max_digits, campo.decimal_places)
+    if tipo in ('IntegerField', 'BigIntegerField', 'PositiveIntegerField'):
+        return pa.int64()
+    if tipo == 'BooleanField':
+        return pa.bool_()
+    if tipo == 'DateField':
+        return pa.date32()
+    if tipo == 'DateTimeField':
+        return pa.timestamp('us', tz='UTC')
+    return pa.string()
+
+
+def esquema_arrow():
+    campos = []
+    for columna, ruta in COLUMNAS_EXPORTACION:
+        campo = campo_de_ruta(ruta)
+        campos.append(pa.field(columna, _tipo_arrow(campo), nullable=campo.null or columna == 'corredor'))
+    return pa.schema(campos)
+
+
+def _lotes_arrow(filas, esquema, filas_por_lote):
+    iterador = iter(filas)
+    while True:
+        lote = [fila for _, fila in zip(range(filas_por_lote), iterador)]
+        if not lote:
+            return
+        columnas = zip(*lote)
+        yield pa.record_batch([pa.array(col, type=campo.type) for col, campo in zip(columnas, esquema)], schema=esquema)
+
+
+def generar_columnar(filas, formato, filas_por_lote=TAMANO_LECTURA * 10):
+    """
+    Generador de bytes Parquet (un row group por lote) o Arrow IPC en formato stream.
+    Requiere pyarrow.
+    """
+    if pa is None:
+        raise RuntimeError('La exportación Parquet/Arrow requiere el paquete pyarrow.')
+    esquema = esquema_arrow()
+    salida = _SalidaStreaming()
+    if formato == 'parquet':
+        escritor = pq.ParquetWriter(salida, esquema, compression='zstd')
+        escribir = escritor.write_batch
+    else:
+        escritor = pa.ipc.new_stream(salida, esquema)
+        escribir = escritor.write_batch
+    with escritor:
+        for lote in _lotes_arrow(filas, esquema, filas_por_lote):
+            escribir(lote)
+            yield salida.vaciar()
+    yield salida.vaciar()
+
+
+def generar_exportacion(filas, formato):
+    if formato == 'csv':
+        return generar_csv(filas)
+    if formato == 'jsonl':
+        return generar_jsonl(filas)
+    return generar_columnar(filas, formato)
@@ -1,6 +1,6 @@
 # calificaciones/forms.py
 from django import forms
-from .models import Corredor, CalificacionTributaria
+from .models import Corredor, CalificacionTributaria, RegistroAuditoria
 
 # --- FORMULARIO DE CARGA (ACTUALIZADO) ---
 # ¡Eliminamos el campo 'corredor'!
@@ -34,6 +34,34 @@ class FiltroCalificacionesForm(forms.Form):
         label="Periodo Comercial (Año)",
         widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Ej: 2025'})
     )
+    # Las sugerencias vienen de la búsqueda por prefijo (busqueda.py); el filtro es por código exacto
+    instrumento = forms.CharField(
+        required=False,
+        max_length=50,
+        label="Instrumento",
+        widget=forms.TextInput(attrs={'class': 'form-control', 'id': 'filtro_instrumento', 'placeholder': 'Ej: ACN', 'list': 'instrumentos-sugeridos', 'autocomplete': 'off'})
+    )
+
+# --- FORMULARIO PARA LOS FILTROS DEL REGISTRO DE AUDITORÍA ---
+class FiltroAuditoriaForm(forms.Form):
+    ACCION_CHOICES = [('', 'Todas')] + RegistroAuditoria.ACCION_CHOICES
+
+    desde = forms.DateField(
+        required=False,
+        label="Desde",
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    hasta = forms.DateField(
+        required=False,
+        label="Hasta",
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    accion = forms.ChoiceField(
+        choices=ACCION_CHOICES,
+        required=False,
+        label="Acción",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
 
 # --- FORMULARIO PARA LA VENTANA MODAL "INGRESAR" ---
 class IngresoBasicoForm(forms.ModelForm):
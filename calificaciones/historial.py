@@ -0,0 +1,142 @@
+# calificaciones/historial.py
+# Historial de cambios por campo de las calificaciones y reconstrucción a una fecha
+import json
+from datetime import date
+from decimal import ROUND_HALF_EVEN, Decimal
+
+from django.db import models
+from django.utils import timezone
+
+from .models import CalificacionTributaria, HistorialCalificacion
+
+TAMANO_LOTE_HISTORIAL = 1000
+
+# Campos versionados: todos menos la clave primaria, la marca de modificación (cambia en cada
+# escritura) y los campos derivados (copia empaquetada de los factores y hash del contenido)
+CAMPOS_HISTORIAL = [
+    campo.attname for campo in CalificacionTributaria._meta.concrete_fields
+    if campo.name not in ('id', 'fecha_modificacion', 'factores_empaquetados', 'hash_contenido')
+]
+_CAMPOS = {campo.attname: campo for campo in CalificacionTributaria._meta.concrete_fields}
+
+
+def _normalizar(nombre, valor):
+    # El valor que queda guardado: los decimales se redondean a la escala de la columna, mitad al
+    # par como en el resto de la aplicación (calculos.escalar_decimal)
+    campo = _CAMPOS[nombre]
+    valor = campo.to_python(valor)
+    if isinstance(campo, models.DecimalField) and valor is not None:
+        valor = valor.quantize(Decimal(1).scaleb(-campo.decimal_places), rounding=ROUND_HALF_EVEN)
+    return valor
+
+
+def _texto(valor):
+    if isinstance(valor, Decimal):
+        # Sin ceros a la derecha: '0.25' y no '0.25000000'
+        return format(valor.normalize(), 'f')
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return valor
+
+
+def _a_json(valores):
+    return json.dumps({nombre: _texto(valor) for nombre, valor in valores.items()}, separators=(',', ':'))
+
+
+def desde_json(texto):
+    # Se ignoran campos que ya no existen en el modelo
+    return {nombre: _CAMPOS[nombre].to_python(valor) for nombre, valor in json.loads(texto or '{}').items()
+            if nombre in _CAMPOS}
+
+
+def valores_calificacion(calificacion):
+    return {nombre: getattr(calificacion, nombre) for nombre in CAMPOS_HISTORIAL}
+
+
+def diferencias(antes, nuevos):
+    """
+    Valores anteriores de los campos de `nuevos` que cambian respecto de `antes`. Solo se
+    normaliza (redondeo a la escala de la columna) cuando la comparación directa difiere.
+    """
+    cambios = {}
+    for nombre, valor in nuevos.items():
+        if nombre not in antes:
+            continue
+        anterior = antes[nombre]
+        if valor != anterior and _normalizar(nombre, valor) != anterior:
+            cambios[nombre] = anterior
+    return cambios
+
+
+def entrada_historial(calificacion_id, accion, origen, anteriores=None, fecha=None, carga_id=None):
+    return HistorialCalificacion(
+        calificacion_id=calificacion_id,
+        fecha_cambio=fecha or timezone.now(),
+        accion=accion,
+        origen=origen,
+        anteriores=_a_json(anteriores) if anteriores else '',
+        carga_id=carga_id,
+    )
+
+
+def guardar_historial(entradas):
+    if entradas:
+        HistorialCalificacion.objects.bulk_create(entradas, batch_size=TAMANO_LOTE_HISTORIAL)
+
+
+def registrar_creacion(calificacion, origen):
+    guardar_historial([entrada_historial(calificacion.pk, 'CRE', origen)])
+
+
+def registrar_modificacion(calificacion, antes, origen):
+    """
+    Guarda los campos que cambiaron respecto de `antes` (valores_calificacion tomado antes de editar).
+    Si nada cambió no se escribe nada.
+    """
+    cambios = diferencias(antes, valores_calificacion(calificacion))
+    if cambios:
+        guardar_historial([entrada_historial(calificacion.pk, 'MOD', origen, cambios)])
+
+
+def registrar_eliminacion(calificaciones, origen):
+    """
+    `calificaciones`: pares (id, valores_calificacion). En una eliminación se guardan todos los
+    campos, para poder reconstruir el registro a una fecha anterior.
+    """
+    ahora = timezone.now()
+    guardar_historial([entrada_historial(pk, 'ELI', origen, valores, ahora) for pk, valores in calificaciones])
+
+
+def calificacion_en_fecha(calificacion_id, momento):
+    """
+    Valores de la calificación vigentes en `momento`, o None si en ese momento no existía.
+    Parte del estado actual y deshace, del más reciente al más antiguo, los cambios posteriores.
+    """
+    actual = CalificacionTributaria.objects.filter(pk=calificacion_id).first()
+    estado = valores_calificacion(actual) if actual else None
+    posteriores = HistorialCalificacion.objects.filter(
+        calificacion_id=calificacion_id, fecha_cambio__gt=momento
+    ).order_by('-fecha_cambio', '-id')
+    for cambio in posteriores.iterator():
+        if cambio.accion == 'CRE':
+            estado = None
+        elif cambio.accion == 'ELI':
+            estado = desde_json(cambio.anteriores)
+        else:
+            estado = {**(estado or {}), **desde_json(cambio.anteriores)}
+    if estado is not None:
+        estado['id'] = calificacion_id
+    return estado
+
+
+def cambios_calificacion(calificacion_id, limite=200):
+    return [
+        {
+            'fecha': cambio.fecha_cambio.isoformat(),
+            'accion': cambio.accion,
+            'origen': cambio.origen,
+            'anteriores': json.loads(cambio.anteriores or '{}'),
+        }
+        for cambio in HistorialCalificacion.objects.filter(calificacion_id=calificacion_id)
+        .order_by('-fecha_cambio', '-id')[:limite]
+    ]
@@ -0,0 +1,93 @@
+# calificaciones/listado_admin.py
+# Listado del admin para tablas grandes: conteo estimado o acotado en vez de COUNT(*) completo
+# y paginación por keyset (?despues=<cursor>) con el mismo orden que la grilla del mantenedor
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
+
+from .consultas import pagina_keyset
+
+CURSOR_VAR = 'despues'
+# Con filtros se cuenta a lo más esta cantidad de filas (COUNT sobre un subquery con FETCH FIRST)
+LIMITE_CONTEO = 10000
+
+
+def filas_estimadas(modelo):
+    """
+    Filas de la tabla según las estadísticas del optimizador, o None si el motor no las expone.
+    """
+    tabla = connection.ops.quote_name(modelo._meta.db_table).strip('"')
+    with connection.cursor() as cursor:
+        if connection.vendor == 'oracle':
+            cursor.execute('SELECT NUM_ROWS FROM USER_TABLES WHERE TABLE_NAME = %s', [tabla])
+        elif connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [tabla])
+        else:
+            return None
+        fila = cursor.fetchone()
+    # Sin estadísticas reunidas Oracle devuelve NULL y PostgreSQL -1
+    return fila[0] if fila and fila[0] is not None and fila[0] >= 0 else None
+
+
+class PaginadorEstimado(Paginator):
+    """
+    Paginator cuyo count no recorre la tabla: sin filtros usa las estadísticas de la tabla
+    (`estimado`) y con filtros cuenta hasta LIMITE_CONTEO + 1 filas (`acotado` si hay más).
+    """
+    estimado = acotado = False
+
+    @cached_property
+    def count(self):
+        consulta = self.object_list
+        if not consulta.query.where:
+            estimadas = filas_estimadas(consulta.model)
+            if estimadas is not None:
+                self.estimado = True
+                return estimadas
+        cantidad = consulta.order_by()[:LIMITE_CONTEO + 1].count()
+        if cantidad > LIMITE_CONTEO:
+            self.acotado = True
+            return LIMITE_CONTEO
+        return cantidad
+
+
+class ChangeListKeyset(ChangeList):
+    """
+    Con el orden por defecto (-fecha, instrumento, id) las páginas se piden por cursor: cada
+    página cuesta lo mismo que la primera. Si se ordena por otra columna se vuelve a la
+    paginación por número, con el conteo acotado de PaginadorEstimado.
+    """
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_results(self, request):
+        self.cursor = self.params.pop(CURSOR_VAR, None)
+        self.filter_params.pop(CURSOR_VAR, None)
+        self.keyset = ORDER_VAR not in self.params and not self.show_all
+        self.siguiente = None
+        if not self.keyset:
+            return super().get_results(request)
+
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        try:
+            filas, self.siguiente = pagina_keyset(self.queryset, self.cursor, self.list_per_page)
+        except ValueError:
+            filas, self.siguiente = pagina_keyset(self.queryset, None, self.list_per_page)
+            self.cursor = None
+        self.result_count = paginator.count
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.result_list = filas
+        self.can_show_all = False
+        self.multi_page = bool(self.cursor or self.siguiente)
+        self.paginator = paginator
+
+    def url_siguiente(self):
+        return self.get_query_string({CURSOR_VAR: self.siguiente}) if self.siguiente else ''
+
+    def url_primera(self):
+        return self.get_query_string(remove=[CURSOR_VAR]) if self.cursor else ''
@@ -0,0 +1,214 @@
+# calificaciones/lotes.py
+# Operaciones del mantenedor sobre varias calificaciones por request: una consulta por lote,
+# escrituras en lote en una sola transacción y un resultado por cada id recibido
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .auditoria import registrar
+from .cache_corredor import invalidar_corredor
+from .calculos import COLUMNAS_FACTOR
+from .carga_masiva import actualizar_en_lote
+from .forms import IngresoBasicoForm, IngresoFactoresForm
+from .historial import CAMPOS_HISTORIAL, diferencias, entrada_historial, guardar_historial, registrar_eliminacion, valores_calificacion
+from .models import CalificacionTributaria
+from .resumenes import ajustar_resumen
+from .serializacion import SERIALIZADOR_CALIFICACION
+
+# Máximo de calificaciones por request (Oracle limita las listas IN a 1000 elementos)
+MAX_LOTE = 1000
+
+MENSAJE_NO_ENCONTRADA = 'No existe o no pertenece al corredor.'
+MENSAJE_DUPLICADO = 'Ya existe una calificación para ese instrumento y fecha.'
+MENSAJE_SUMA = 'La suma de los factores del 8 al 19 no puede ser mayor que 1.'
+
+# Campos del modelo que edita IngresoBasicoForm (el formulario declara además 'periodo', que no se guarda)
+CAMPOS_BASICOS = [
+    campo.name for campo in CalificacionTributaria._meta.concrete_fields if campo.name in IngresoBasicoForm._meta.fields
+]
+# Campos que reescribe cada operación (más los derivados y la marca de modificación)
+CAMPOS_MODIFICACION = [*CAMPOS_BASICOS, 'hash_contenido', 'fecha_modificacion']
+CAMPOS_FACTORES = [*COLUMNAS_FACTOR, 'factores_empaquetados', 'hash_contenido', 'fecha_modificacion']
+
+
+def ids_lote(valores):
+    """
+    Ids recibidos (sin repetir, en el orden recibido). Lanza ValueError si alguno no es un
+    entero o si el lote supera MAX_LOTE.
+    """
+    try:
+        ids = list(dict.fromkeys(int(valor) for valor in valores))
+    except (TypeError, ValueError):
+        raise ValueError('Los ids deben ser números enteros.')
+    if len(ids) > MAX_LOTE:
+        raise ValueError(f'El lote supera el máximo de {MAX_LOTE} calificaciones.')
+    return ids
+
+
+def _ids_items(items):
+    ids = ids_lote(item.get('id') for item in items)
+    if len(ids) != len(items):
+        raise ValueError('Cada calificación puede aparecer una sola vez en el lote.')
+    return ids
+
+
+def _propias(corredor, ids):
+    # Pertenencia al corredor resuelta en la misma consulta: los ids ajenos simplemente no vuelven
+    return {calificacion.pk: calificacion for calificacion in CalificacionTributaria.objects.filter(corredor=corredor, pk__in=ids)}
+
+
+def _error(pk, mensaje):
+    return {'id': pk, 'success': False, 'errors': mensaje}
+
+
+def obtener_lote(corredor, ids):
+    datos = {
+        data['id']: data
+        for data in SERIALIZADOR_CALIFICACION.filas(
+            CalificacionTributaria.objects.filter(corredor=corredor, pk__in=ids)
+            .values_list(*SERIALIZADOR_CALIFICACION.columnas)
+        )
+    }
+    return [
+        {'id': pk, 'success': True, 'data': datos[pk]} if pk in datos else _error(pk, MENSAJE_NO_ENCONTRADA)
+        for pk in ids
+    ]
+
+
+def _aplicar(corredor, usuario, validas, campos, accion, detalle):
+    """
+    Escribe las calificaciones `validas` (pares (calificacion, valores antes de editar)) con un
+    UPDATE en lote, su historial, el resumen por periodo y una sola entrada de auditoría, todo en
+    una transacción.
+    """
+    ahora = timezone.now()
+    historial, nuevos = [], []
+    for calificacion, antes in validas:
+        calificacion.calcular_derivados()
+        calificacion.fecha_modificacion = ahora
+        nuevos.append(valores_calificacion(calificacion))
+        cambios = diferencias(antes, nuevos[-1])
+        if cambios:
+            historial.append(entrada_historial(calificacion.pk, 'MOD', 'MAN', cambios, ahora))
+    with transaction.atomic():
+        actualizar_en_lote([calificacion for calificacion, _ in validas], campos)
+        guardar_historial(historial)
+        ajustar_resumen([antes for _, antes in validas], nuevos)
+        invalidar_corredor(corredor)
+        registrar(corredor, usuario, accion, objeto='Modificación por lote', detalle=detalle, cantidad=len(validas))
+
+
+def modificar_lote(corredor, usuario, items):
+    """
+    `items`: diccionarios con 'id' y los campos de IngresoBasicoForm. Cada uno se valida por
+    separado; los válidos se guardan juntos. La clave (instrumento, fecha) se revisa para todo
+    el lote con una consulta.
+    """
+    ids = _ids_items(items)
+    calificaciones = _propias(corredor, ids)
+    resultados, validas = {}, []
+    campos_cambiados = set()
+    for item in items:
+        pk = int(item['id'])
+        calificacion = calificaciones.get(pk)
+        if calificacion is None:
+            resultados[pk] = _error(pk, MENSAJE_NO_ENCONTRADA)
+            continue
+        # Valores previos para el historial (el formulario modifica la instancia al validar)
+        antes = valores_calificacion(calificacion)
+        form = IngresoBasicoForm(item, instance=calificacion)
+        if not form.is_valid():
+            resultados[pk] = _error(pk, form.errors.get_json_data())
+            continue
+        validas.append((form.save(commit=False), antes))
+        campos_cambiados.update(form.changed_data)
+
+    # Claves finales repetidas dentro del lote o ya usadas por otra calificación del corredor.
+    # Si dos filas del lote quedan con la misma clave, la conserva la que ya la tenía.
+    claves = {}
+    for calificacion, antes in validas:
+        clave = (calificacion.instrumento, calificacion.fecha)
+        pks = claves.setdefault(clave, [])
+        if clave == (antes['instrumento'], antes['fecha']):
+            pks.insert(0, calificacion.pk)
+        else:
+            pks.append(calificacion.pk)
+    ocupadas = set(
+        CalificacionTributaria.objects.filter(
+            corredor=corredor,
+            instrumento__in={instrumento for instrumento, _ in claves},
+            fecha__in={fecha for _, fecha in claves},
+        ).exclude(pk__in=[calificacion.pk for calificacion, _ in validas]).values_list('instrumento', 'fecha')
+    )
+    duplicadas = {pk for clave, pks in claves.items() for pk in (pks if clave in ocupadas else pks[1:])}
+    for pk in duplicadas:
+        resultados[pk] = _error(pk, MENSAJE_DUPLICADO)
+    validas = [(calificacion, antes) for calificacion, antes in validas if calificacion.pk not in duplicadas]
+
+    if validas:
+        try:
+            _aplicar(corredor, usuario, validas, CAMPOS_MODIFICACION, 'MOD',
+                     f'Campos: {", ".join(sorted(campos_cambiados)) or "sin cambios"}.')
+        except IntegrityError:
+            # Intercambio de claves entre filas del lote: se rechaza el lote completo
+            for calificacion, _ in validas:
+                resultados[calificacion.pk] = _error(calificacion.pk, MENSAJE_DUPLICADO)
+            validas = []
+    for calificacion, _ in validas:
+        resultados[calificacion.pk] = {'id': calificacion.pk, 'success': True}
+    return [resultados[pk] for pk in ids]
+
+
+def factores_lote(corredor, usuario, items):
+    """
+    `items`: diccionarios con 'id' y factor_8..factor_37 (los ausentes quedan en 0), con las
+    mismas validaciones que guardar_factores.
+    """
+    ids = _ids_items(items)
+    calificaciones = _propias(corredor, ids)
+    resultados, validas = {}, []
+    for item in items:
+        pk = int(item['id'])
+        calificacion = calificaciones.get(pk)
+        if calificacion is None:
+            resultados[pk] = _error(pk, MENSAJE_NO_ENCONTRADA)
+            continue
+        form = IngresoFactoresForm(item)
+        if not form.is_valid():
+            resultados[pk] = _error(pk, form.errors.get_json_data())
+            continue
+        factores = {columna: form.cleaned_data[columna] or Decimal('0') for columna in COLUMNAS_FACTOR}
+        if sum(factores[columna] for columna in COLUMNAS_FACTOR[:12]) > 1:
+            resultados[pk] = _error(pk, MENSAJE_SUMA)
+            continue
+        antes = valores_calificacion(calificacion)
+        for columna, valor in factores.items():
+            setattr(calificacion, columna, valor)
+        validas.append((calificacion, antes))
+        resultados[pk] = {'id': pk, 'success': True}
+
+    if validas:
+        _aplicar(corredor, usuario, validas, CAMPOS_FACTORES, 'FAC', 'Factores por lote.')
+    return [resultados[pk] for pk in ids]
+
+
+def eliminar_lote(corredor, usuario, ids):
+    """
+    Elimina con un solo DELETE ... WHERE id IN las calificaciones del corredor entre `ids`.
+    """
+    with transaction.atomic():
+        # Valores completos para el historial (una eliminación guarda todos los campos)
+        eliminadas = [
+            (fila[0], dict(zip(CAMPOS_HISTORIAL, fila[1:])))
+            for fila in CalificacionTributaria.objects.filter(corredor=corredor, pk__in=ids)
+            .values_list('id', *CAMPOS_HISTORIAL)
+        ]
+        propias = {pk for pk, _ in eliminadas}
+        if propias:
+            CalificacionTributaria.objects.filter(pk__in=propias).delete()
+            registrar_eliminacion(eliminadas, 'MAN')
+            ajustar_resumen(anteriores=[valores for _, valores in eliminadas])
+            invalidar_corredor(corredor)
+            registrar(corredor, usuario, 'ELI', objeto='Eliminación por lote', cantidad=len(propias))
+    return [{'id': pk, 'success': True} if pk in propias else _error(pk, MENSAJE_NO_ENCONTRADA) for pk in ids]
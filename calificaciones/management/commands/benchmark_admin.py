@@ -0,0 +1,85 @@
+# calificaciones/management/commands/benchmark_admin.py
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from calificaciones.admin import CalificacionTributariaAdmin
+from calificaciones.consultas import codificar_cursor
+from calificaciones.listado_admin import CURSOR_VAR
+from calificaciones.management.commands.benchmark_indices import NOMBRE_CORREDOR, poblar
+from calificaciones.models import CalificacionTributaria, Corredor
+
+
+class AdminAnterior(CalificacionTributariaAdmin):
+    # Configuración previa: sin select_related, COUNT(*) completo y paginación por OFFSET
+    list_filter = ('corredor', 'tipo_mercado', 'fuente_ingreso', 'origen', 'fecha_modificacion')
+    list_select_related = False
+    show_full_result_count = True
+    show_facets = admin.ShowFacets.ALLOW
+    paginator = Paginator
+
+    def get_changelist(self, request, **kwargs):
+        return ChangeList
+
+
+class Command(BaseCommand):
+    help = ('Tiempo de render y consultas del listado del admin de calificaciones (primera página, '
+            'página profunda y filtrada por corredor) con la configuración anterior y la actual.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=200_000)
+        parser.add_argument('--pagina', type=int, default=500, help='Página profunda a medir.')
+        parser.add_argument('--repeticiones', type=int, default=3)
+
+    def render(self, modelo_admin, usuario, parametros, repeticiones):
+        tiempos, consultas = [], 0
+        for _ in range(repeticiones):
+            request = RequestFactory().get('/admin/calificaciones/calificaciontributaria/', parametros)
+            request.user = usuario
+            request.session = SessionBase()
+            request._messages = FallbackStorage(request)
+            with CaptureQueriesContext(connection) as capturadas:
+                t0 = time.perf_counter()
+                modelo_admin.changelist_view(request).render()
+                tiempos.append((time.perf_counter() - t0) * 1000)
+            consultas = len(capturadas)
+        return statistics.median(tiempos), consultas
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING('DEBUG=True: las consultas registradas alteran los tiempos.'))
+        repeticiones = options['repeticiones']
+        with transaction.atomic():
+            corredor = Corredor.objects.create(nombre=NOMBRE_CORREDOR, codigo_corredor='__BADM__')
+            self.stdout.write(f'Generando {options["filas"]:,} filas...')
+            poblar(corredor, options['filas'])
+            usuario = User.objects.create_superuser('__benchmark_admin__', password=None)
+            anterior = AdminAnterior(CalificacionTributaria, admin.site)
+            actual = CalificacionTributariaAdmin(CalificacionTributaria, admin.site)
+
+            # La página profunda del listado actual se pide con el cursor de la última fila de la página anterior
+            por_pagina = actual.list_per_page
+            ultima = CalificacionTributaria.objects.order_by('-fecha', 'instrumento', 'id')[(options['pagina'] - 1) * por_pagina - 1]
+            casos = [
+                ('primera página', {}, {}),
+                (f'página {options["pagina"]}', {'p': options['pagina']}, {CURSOR_VAR: codificar_cursor(ultima)}),
+                ('filtro por corredor', {'corredor__id__exact': corredor.pk}, {'corredor__id__exact': corredor.pk}),
+                ('búsqueda', {'q': 'INS0001'}, {'q': 'INS0001'}),
+            ]
+            self.stdout.write(f'{"":<22} {"anterior":>22} {"actual":>22}')
+            for titulo, param_anterior, param_actual in casos:
+                ms_a, q_a = self.render(anterior, usuario, param_anterior, repeticiones)
+                ms_n, q_n = self.render(actual, usuario, param_actual, repeticiones)
+                self.stdout.write(f'{titulo:<22} {ms_a:9.1f} ms {q_a:4d} cons. {ms_n:9.1f} ms {q_n:4d} cons.')
+            transaction.set_rollback(True)
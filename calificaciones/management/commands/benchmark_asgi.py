@@ -0,0 +1,197 @@
+# calificaciones/management/commands/benchmark_asgi.py
+import asyncio
+import importlib
+import io
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.backends import utils as utils_db
+from django.test import Client, override_settings
+from django.urls import clear_url_caches, reverse
+
+from calificaciones.models import CalificacionTributaria, Corredor
+
+from .benchmark_conexiones import percentil
+
+NOMBRE_CORREDOR = '__benchmark_asgi__'
+
+
+@contextmanager
+def latencia_simulada(segundos):
+    """
+    Agrega `segundos` a cada consulta, para que una base local haga de sustituto de Oracle
+    (ida y vuelta por la red). Es espera, no CPU: lo que un servidor async puede solapar.
+    """
+    original = utils_db.CursorWrapper.execute
+
+    def execute(self, sql, params=None):
+        time.sleep(segundos)
+        return original(self, sql, params)
+
+    utils_db.CursorWrapper.execute = execute
+    try:
+        yield
+    finally:
+        utils_db.CursorWrapper.execute = original
+
+
+@contextmanager
+def rutas_despliegue(asgi):
+    """
+    URLconf tal como la arma cada despliegue: calificaciones/urls.py elige la variante síncrona o
+    async de las vistas AJAX según SERVIDOR_ASGI al importarse.
+    """
+    def recargar():
+        importlib.reload(importlib.import_module('calificaciones.urls'))
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+    try:
+        with override_settings(SERVIDOR_ASGI=asgi):
+            recargar()
+            yield
+    finally:
+        recargar()
+
+
+def _host():
+    # Un host aceptado por ALLOWED_HOSTS (con DEBUG=True y la lista vacía se acepta localhost)
+    return next((host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')), 'localhost')
+
+
+class Command(BaseCommand):
+    help = ('Compara el despliegue WSGI (un hilo por request, hasta --hilos-wsgi, vistas síncronas) con ASGI '
+            '(un event loop, vistas async) para N clientes concurrentes sobre las vistas AJAX del mantenedor, '
+            'pasando por el handler y los middlewares reales de Django.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400, help='Requests por medición.')
+        parser.add_argument('--concurrencia', default='8,32,128', help='Clientes concurrentes, separados por coma.')
+        parser.add_argument('--hilos-wsgi', type=int, default=8,
+                            help='Hilos del servidor WSGI (p. ej. gunicorn --threads) por proceso.')
+        parser.add_argument('--latencia-ms', type=float,
+                            help='Latencia simulada por consulta (por defecto 0 en Oracle y 5 en otras bases).')
+
+    def medir_wsgi(self, rutas, cookie, total, clientes, hilos):
+        aplicacion = WSGIHandler()
+        servidor = threading.Semaphore(hilos)
+        latencias = []
+        candado = threading.Lock()
+
+        estados = set()
+
+        def cliente(indices):
+            propias = []
+            for i in indices:
+                environ = {
+                    'REQUEST_METHOD': 'GET', 'PATH_INFO': rutas[i % len(rutas)], 'QUERY_STRING': '',
+                    'SERVER_NAME': _host(), 'SERVER_PORT': '80', 'HTTP_HOST': _host(), 'HTTP_COOKIE': cookie,
+                    'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+                }
+                t0 = time.perf_counter()
+                # El request espera un hilo libre del servidor, como en un servidor real
+                with servidor:
+                    respuesta = aplicacion(environ, lambda estado, encabezados: estados.add(int(estado[:3])))
+                    b''.join(respuesta)
+                    respuesta.close()
+                propias.append((time.perf_counter() - t0) * 1000)
+            connections.close_all()
+            with candado:
+                latencias.extend(propias)
+
+        hebras = [threading.Thread(target=cliente, args=(range(c, total, clientes),)) for c in range(clientes)]
+        inicio = time.perf_counter()
+        for hebra in hebras:
+            hebra.start()
+        for hebra in hebras:
+            hebra.join()
+        return latencias, time.perf_counter() - inicio, estados
+
+    def medir_asgi(self, rutas, cookie, total, clientes):
+        aplicacion = ASGIHandler()
+        encabezados = [(b'host', _host().encode()), (b'cookie', cookie.encode())]
+        estados = set()
+
+        async def request(ruta):
+            comunicador = ApplicationCommunicator(aplicacion, {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': ruta, 'raw_path': ruta.encode(), 'query_string': b'', 'root_path': '',
+                'headers': encabezados, 'client': ('127.0.0.1', 0), 'server': (_host(), 80),
+            })
+            await comunicador.send_input({'type': 'http.request', 'body': b'', 'more_body': False})
+            mensaje = await comunicador.receive_output(60)
+            estados.add(mensaje['status'])
+            while mensaje['type'] != 'http.response.body' or mensaje.get('more_body'):
+                mensaje = await comunicador.receive_output(60)
+            await comunicador.wait(60)
+
+        async def cliente(indices, latencias):
+            for i in indices:
+                t0 = time.perf_counter()
+                await request(rutas[i % len(rutas)])
+                latencias.append((time.perf_counter() - t0) * 1000)
+
+        async def todos():
+            latencias = []
+            await asyncio.gather(*(cliente(range(c, total, clientes), latencias) for c in range(clientes)))
+            return latencias
+
+        inicio = time.perf_counter()
+        latencias = asyncio.run(todos())
+        return latencias, time.perf_counter() - inicio, estados
+
+    def handle(self, *args, **options):
+        latencia_ms = options['latencia_ms']
+        if latencia_ms is None:
+            latencia_ms = 0 if connection.vendor == 'oracle' else 5
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING('DEBUG=True: las consultas registradas alteran los tiempos.'))
+
+        corredor, _ = Corredor.objects.get_or_create(nombre=NOMBRE_CORREDOR, codigo_corredor='__BASGI__')
+        usuario, _ = User.objects.get_or_create(username=NOMBRE_CORREDOR)
+        corredor.usuario = usuario
+        corredor.save()
+        CalificacionTributaria.objects.filter(corredor=corredor).delete()
+        rutas = [
+            reverse('obtener_calificacion_json', args=[CalificacionTributaria.objects.create(
+                corredor=corredor, instrumento=f'BA{i:03d}', fecha='2024-01-01', secuencia=10001 + i,
+                numero_dividendo=1, tipo_sociedad='A', valor_historico=0,
+            ).pk])
+            for i in range(20)
+        ]
+        cliente = Client()
+        cliente.force_login(usuario)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={cliente.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+        self.stdout.write(f'Base: {connection.vendor} | latencia simulada por consulta: {latencia_ms} ms | '
+                          f'{options["requests"]} requests | WSGI con {options["hilos_wsgi"]} hilos por proceso')
+        try:
+            with latencia_simulada(latencia_ms / 1000):
+                for clientes in [int(x) for x in options['concurrencia'].split(',')]:
+                    for titulo, asgi, medir in (
+                        ('WSGI', False, lambda: self.medir_wsgi(rutas, cookie, options['requests'], clientes,
+                                                                options['hilos_wsgi'])),
+                        ('ASGI', True, lambda: self.medir_asgi(rutas, cookie, options['requests'], clientes)),
+                    ):
+                        with rutas_despliegue(asgi):
+                            latencias, segundos, estados = medir()
+                        if estados != {200}:
+                            raise CommandError(f'{titulo}: respuestas con estado {sorted(estados)} (se esperaba 200).')
+                        self.stdout.write(
+                            f'{clientes:>4} clientes {titulo}: p50 {statistics.median(latencias):8.2f} ms | '
+                            f'p99 {percentil(latencias, 99):8.2f} ms | {len(latencias) / segundos:7.1f} req/s'
+                        )
+        finally:
+            CalificacionTributaria.objects.filter(corredor=corredor).delete()
+            corredor.delete()
+            usuario.delete()
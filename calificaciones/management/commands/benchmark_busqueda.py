@@ -0,0 +1,65 @@
+# calificaciones/management/commands/benchmark_busqueda.py
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from calificaciones.busqueda import IndiceInstrumentos, buscar_instrumentos
+from calificaciones.management.commands.benchmark_indices import NOMBRE_CORREDOR, poblar
+from calificaciones.models import CalificacionTributaria, Corredor
+
+PREFIJOS = ['I', 'INS', 'INS01', 'INS012', 'INS0123', 'ins00', 'XYZ']
+
+
+def mediana_ms(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tiempos)
+
+
+class Command(BaseCommand):
+    help = ('Latencia de la búsqueda de instrumentos: icontains sobre los search_fields anteriores del '
+            'admin, prefijo con el índice UPPER(instrumento) y el índice en memoria del typeahead.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=200_000)
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING('DEBUG=True: las consultas registradas alteran los tiempos.'))
+        repeticiones = options['repeticiones']
+        with transaction.atomic():
+            corredor = Corredor.objects.create(nombre=NOMBRE_CORREDOR, codigo_corredor='__BBUS__')
+            self.stdout.write(f'Generando {options["filas"]:,} filas...')
+            poblar(corredor, options['filas'])
+            todas = CalificacionTributaria.objects.all()
+            propias = todas.filter(corredor=corredor).order_by()
+
+            self.stdout.write(self.style.MIGRATE_HEADING('Admin (primeras 100 filas)'))
+            for prefijo in PREFIJOS[1:4]:
+                anterior = todas.filter(
+                    Q(instrumento__icontains=prefijo) | Q(secuencia__icontains=prefijo)
+                    | Q(corredor__nombre__icontains=prefijo) | Q(descripcion_dividendo__icontains=prefijo))
+                nuevo = todas.filter(Q(instrumento__istartswith=prefijo) | Q(corredor__nombre__istartswith=prefijo))
+                ms_anterior = mediana_ms(lambda: list(anterior[:100]), repeticiones)
+                ms_nuevo = mediana_ms(lambda: list(nuevo[:100]), repeticiones)
+                self.stdout.write(f'  {prefijo!r:<10} icontains {ms_anterior:9.2f} ms   prefijo {ms_nuevo:9.2f} ms')
+
+            self.stdout.write(self.style.MIGRATE_HEADING('Typeahead del mantenedor (20 sugerencias)'))
+            distintos = lambda: IndiceInstrumentos(propias.values_list('instrumento', flat=True).distinct())
+            self.stdout.write(f'  construcción del índice (SELECT DISTINCT) {mediana_ms(distintos, repeticiones):9.2f} ms'
+                              f'  ({len(distintos()):,} instrumentos)')
+            buscar_instrumentos(corredor, '')
+            for prefijo in PREFIJOS:
+                consulta = propias.filter(instrumento__istartswith=prefijo).values_list('instrumento', flat=True).distinct()
+                ms_consulta = mediana_ms(lambda: list(consulta.order_by('instrumento')[:20]), repeticiones)
+                ms_indice = mediana_ms(lambda: buscar_instrumentos(corredor, prefijo), repeticiones)
+                self.stdout.write(f'  {prefijo!r:<10} consulta {ms_consulta:9.2f} ms   índice en memoria {ms_indice * 1000:9.1f} µs')
+            transaction.set_rollback(True)
@@ -0,0 +1,72 @@
+# calificaciones/management/commands/benchmark_carga_masiva.py
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from calificaciones.carga_masiva import upsert_calificaciones, registros_factores
+from calificaciones.models import CalificacionTributaria, Corredor
+
+
+def generar_archivo_factores(filas, instrumentos=500):
+    """
+    DataFrame sintético con el mismo layout que el CSV de carga de factores.
+    """
+    inicio = date(2020, 1, 1)
+    datos = {
+        'instrumento': [f'INS{i % instrumentos:04d}' for i in range(filas)],
+        'fecha': [(inicio + timedelta(days=i // instrumentos)).isoformat() for i in range(filas)],
+        'secuencia': [10001 + i for i in range(filas)],
+        'numero_dividendo': [i % 12 for i in range(filas)],
+        'tipo_sociedad': ['A'] * filas,
+        'valor_historico': ['1500,25'] * filas,
+    }
+    for i in range(8, 38):
+        datos[f'factor_{i}'] = ['0,01000000'] * filas
+    return pd.DataFrame(datos)
+
+
+def upsert_fila_a_fila(corredor, registros):
+    # Implementación anterior: un update_or_create por fila (reescribe también las filas idénticas)
+    creados = actualizados = 0
+    for instrumento, fecha, defaults in registros:
+        _, created = CalificacionTributaria.objects.update_or_create(
+            corredor=corredor, instrumento=instrumento, fecha=fecha, defaults=defaults
+        )
+        if created: creados += 1
+        else: actualizados += 1
+    return creados, actualizados, 0
+
+
+class Command(BaseCommand):
+    help = 'Mide el rendimiento (filas/s) de la carga masiva fila a fila versus el motor por bloques.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=20000)
+        parser.add_argument('--bloque', type=int, default=500)
+        parser.add_argument('--sin-fila-a-fila', action='store_true', help='Omite la medición de la implementación anterior.')
+
+    def handle(self, *args, **options):
+        df = generar_archivo_factores(options['filas'])
+        modificado = df.assign(factor_20='0,02000000')
+        estrategias = [('bloques', lambda c, r: upsert_calificaciones(c, r, options['bloque']))]
+        if not options['sin_fila_a_fila']:
+            estrategias.insert(0, ('fila a fila', upsert_fila_a_fila))
+
+        for nombre, estrategia in estrategias:
+            # Todo se ejecuta dentro de una transacción que se revierte al final
+            with transaction.atomic():
+                corredor = Corredor.objects.create(nombre='__benchmark__', codigo_corredor='__BENCH__')
+                # La re-subida idéntica es el caso habitual (el archivo del año completo cada pocos días)
+                for pasada, datos in (('inserción', df), ('sin cambios', df), ('actualización', modificado)):
+                    t0 = time.perf_counter()
+                    creados, actualizados, sin_cambios = estrategia(corredor, registros_factores(datos))
+                    segundos = time.perf_counter() - t0
+                    self.stdout.write(
+                        f'{nombre:<12} {pasada:<13} {len(datos)} filas en {segundos:.2f}s '
+                        f'({len(datos) / segundos:,.0f} filas/s) creados={creados} actualizados={actualizados} '
+                        f'sin_cambios={sin_cambios}'
+                    )
+                transaction.set_rollback(True)
@@ -0,0 +1,71 @@
+# calificaciones/management/commands/benchmark_carga_paralela.py
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from calificaciones.carga_masiva import TAMANO_BLOQUE_CSV, detectar_decimal
+from calificaciones.carga_paralela import _bloques_crudos, _preparados_en_orden, cargar_archivo_paralelo
+from calificaciones.models import Corredor
+
+from .benchmark_memoria_carga import escribir_archivo_montos
+
+
+class Command(BaseCommand):
+    help = ('Mide la carga de montos con N procesos preparando bloques (lectura, validación, factores y hash) '
+            'y verifica que el resultado no dependa de N.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=200000)
+        parser.add_argument('--procesos', default='1,2,4,8', help='Cantidades de procesos separadas por coma.')
+        parser.add_argument('--bloque', type=int, default=TAMANO_BLOQUE_CSV)
+        parser.add_argument('--escribir', action='store_true',
+                            help='Mide también la carga completa con escritura (se revierte al terminar).')
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING('DEBUG=True: las consultas registradas alteran los tiempos.'))
+        self.stdout.write(f'CPUs disponibles: {os.cpu_count()}')
+        filas = options['filas']
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'montos.csv')
+            escribir_archivo_montos(ruta, filas)
+
+            referencia = None
+            base = None
+            for procesos in [int(x) for x in options['procesos'].split(',')]:
+                # Solo preparación: lo que se reparte entre procesos (el escritor es uno solo)
+                huella = hashlib.sha256()
+                t0 = time.perf_counter()
+                with open(ruta, 'rb') as archivo:
+                    decimal = detectar_decimal(archivo)
+                    tareas = (
+                        (numero, linea, encabezado, datos, 'MON', decimal)
+                        for numero, linea, encabezado, datos in _bloques_crudos(archivo, options['bloque'])
+                    )
+                    for numero, n, registros in _preparados_en_orden(tareas, procesos):
+                        huella.update(pickle.dumps((numero, n, registros)))
+                segundos = time.perf_counter() - t0
+                base = base or segundos
+                huella = huella.hexdigest()
+                referencia = referencia or huella
+                linea = (f'{procesos:>2} procesos: preparación {segundos:7.2f}s ({filas / segundos:9,.0f} filas/s, '
+                         f'x{base / segundos:.2f})')
+
+                if options['escribir']:
+                    t0 = time.perf_counter()
+                    with transaction.atomic():
+                        corredor = Corredor.objects.create(nombre='__benchmark__', codigo_corredor='__BENCH__')
+                        with open(ruta, 'rb') as archivo:
+                            creados, actualizados, _, _ = cargar_archivo_paralelo(
+                                corredor, archivo, 'MON', procesos, options['bloque'])
+                        transaction.set_rollback(True)
+                    linea += f' | carga completa {time.perf_counter() - t0:7.2f}s ({creados:,} creados)'
+
+                estilo = self.style.SUCCESS if huella == referencia else self.style.ERROR
+                self.stdout.write(f'{linea} | ' + estilo('mismo resultado' if huella == referencia else 'RESULTADO DISTINTO'))
@@ -0,0 +1,137 @@
+# calificaciones/management/commands/benchmark_conexiones.py
+import copy
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, connections
+from django.test import RequestFactory
+
+from calificaciones import views
+from calificaciones.models import CalificacionTributaria, Corredor
+
+NOMBRE_CORREDOR = '__benchmark_conexiones__'
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+@contextmanager
+def handshake_simulado(segundos):
+    """
+    Agrega `segundos` a cada conexión física nueva, para que una base local (SQLite) haga de
+    sustituto de Oracle, donde abrir una sesión cuesta decenas de milisegundos.
+    """
+    clase = type(connections['default'])
+    original = clase.get_new_connection
+
+    def get_new_connection(self, conn_params):
+        if not getattr(self, 'pool', None):
+            time.sleep(segundos)
+        return original(self, conn_params)
+
+    clase.get_new_connection = get_new_connection
+    try:
+        yield
+    finally:
+        clase.get_new_connection = original
+
+
+@contextmanager
+def modo_conexion(reutilizar):
+    """
+    Sin reutilización: una conexión nueva por request (CONN_MAX_AGE=0 y sin pool, la
+    configuración anterior). Con reutilización: la configuración actual (pool de oracledb en
+    Oracle); en otras bases, conexiones persistentes como sustituto del pool.
+    """
+    settings_dict = connection.settings_dict
+    respaldo = copy.deepcopy({clave: settings_dict[clave] for clave in ('CONN_MAX_AGE', 'OPTIONS')})
+    if not reutilizar:
+        settings_dict['CONN_MAX_AGE'] = 0
+        settings_dict['OPTIONS'] = {k: v for k, v in settings_dict['OPTIONS'].items() if k != 'pool'}
+    elif not settings_dict['OPTIONS'].get('pool'):
+        settings_dict['CONN_MAX_AGE'] = None
+    connections.close_all()
+    try:
+        yield
+    finally:
+        connections.close_all()
+        settings_dict.update(respaldo)
+
+
+class Command(BaseCommand):
+    help = ('Latencia p50/p99 de las vistas AJAX pequeñas (obtener/) con y sin reutilización de '
+            'conexiones. En una base local se simula el costo del handshake de Oracle.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400, help='Requests por modo.')
+        parser.add_argument('--concurrencia', type=int, default=4, help='Hilos que hacen requests en paralelo.')
+        parser.add_argument('--handshake-ms', type=float,
+                            help='Costo simulado de abrir una conexión (por defecto 0 en Oracle y 30 en otras bases).')
+
+    def medir(self, usuario, ids, total, concurrencia):
+        fabrica = RequestFactory()
+        latencias = []
+        candado = threading.Lock()
+
+        def trabajador(cantidad):
+            propias = []
+            for i in range(cantidad):
+                request = fabrica.get('/')
+                request.user = usuario
+                t0 = time.perf_counter()
+                # Igual que el handler de Django: request_started y request_finished cierran conexiones vencidas
+                close_old_connections()
+                views.obtener_calificacion_json(request, ids[i % len(ids)])
+                close_old_connections()
+                propias.append((time.perf_counter() - t0) * 1000)
+            connections.close_all()
+            with candado:
+                latencias.extend(propias)
+
+        hilos = [threading.Thread(target=trabajador, args=(total // concurrencia,)) for _ in range(concurrencia)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return latencias, time.perf_counter() - inicio
+
+    def handle(self, *args, **options):
+        handshake_ms = options['handshake_ms']
+        if handshake_ms is None:
+            handshake_ms = 0 if connection.vendor == 'oracle' else 30
+
+        corredor, _ = Corredor.objects.get_or_create(nombre=NOMBRE_CORREDOR, codigo_corredor='__BCON__')
+        usuario, _ = User.objects.get_or_create(username=NOMBRE_CORREDOR)
+        corredor.usuario = usuario
+        corredor.save()
+        usuario.corredor = corredor
+        CalificacionTributaria.objects.filter(corredor=corredor).delete()
+        ids = [
+            CalificacionTributaria.objects.create(
+                corredor=corredor, instrumento=f'BC{i:03d}', fecha='2024-01-01', secuencia=i,
+                numero_dividendo=1, tipo_sociedad='A', valor_historico=0,
+            ).pk
+            for i in range(20)
+        ]
+        self.stdout.write(f'Base: {connection.vendor} | handshake simulado: {handshake_ms} ms | '
+                          f'{options["requests"]} requests, {options["concurrencia"]} hilos')
+        try:
+            with handshake_simulado(handshake_ms / 1000):
+                for titulo, reutilizar in (('Conexión nueva por request', False), ('Conexiones reutilizadas', True)):
+                    with modo_conexion(reutilizar):
+                        latencias, segundos = self.medir(usuario, ids, options['requests'], options['concurrencia'])
+                    self.stdout.write(
+                        f'{titulo:<28} p50 {statistics.median(latencias):7.2f} ms | p99 {percentil(latencias, 99):7.2f} ms '
+                        f'| {len(latencias) / segundos:7.1f} req/s'
+                    )
+        finally:
+            CalificacionTributaria.objects.filter(corredor=corredor).delete()
+            corredor.delete()
+            usuario.delete()
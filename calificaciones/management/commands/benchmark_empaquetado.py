@@ -0,0 +1,93 @@
+# calificaciones/management/commands/benchmark_empaquetado.py
+import statistics
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from calificaciones.calculos import COLUMNAS_FACTOR, fila_a_factores
+from calificaciones.empaquetado import BYTES_EMPAQUETADO, empaquetar, matriz_factores
+from calificaciones.management.commands.benchmark_indices import NOMBRE_CORREDOR
+from calificaciones.models import CalificacionTributaria, Corredor
+
+
+def poblar(corredor, filas, semilla=0, lote=5000):
+    # Factores aleatorios que suman 1 en 8..19, con ambas representaciones llenas
+    rng = np.random.default_rng(semilla)
+    inicio = date(2000, 1, 1)
+    for desde in range(0, filas, lote):
+        cantidad = min(lote, filas - desde)
+        factores = rng.integers(0, 8_000_000, size=(cantidad, len(COLUMNAS_FACTOR)))
+        CalificacionTributaria.objects.bulk_create([
+            CalificacionTributaria(
+                corredor=corredor, instrumento=f'EMP{(desde + i) % 5000:05d}',
+                fecha=inicio + timedelta(days=(desde + i) // 5000), secuencia=10001, numero_dividendo=1,
+                tipo_sociedad='A', valor_historico=0, factores_empaquetados=empaquetar(vector), **fila_a_factores(vector),
+            )
+            for i, vector in enumerate(factores)
+        ])
+
+
+def desde_orm(calificaciones):
+    # Camino habitual: instancias del modelo con 30 Decimal por fila
+    filas = calificaciones.only('id', *COLUMNAS_FACTOR).order_by('id')
+    return np.array([[int(getattr(c, columna).scaleb(8)) for columna in COLUMNAS_FACTOR] for c in filas], dtype=np.int64)
+
+
+def desde_columnas(calificaciones):
+    with override_settings(FACTORES_EMPAQUETADOS=False):
+        return matriz_factores(calificaciones)[1]
+
+
+def desde_empaquetado(calificaciones):
+    with override_settings(FACTORES_EMPAQUETADOS=True):
+        return matriz_factores(calificaciones)[1]
+
+
+class Command(BaseCommand):
+    help = ('Compara la lectura de los 30 factores a una matriz NumPy: instancias ORM, las 30 columnas '
+            'NUMBER (values_list) y la columna empaquetada. Mide tiempo y memoria pico.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=200_000)
+        parser.add_argument('--repeticiones', type=int, default=3)
+
+    def medir(self, funcion, calificaciones, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            matriz = funcion(calificaciones)
+            tiempos.append(time.perf_counter() - t0)
+        # tracemalloc enlentece mucho la ejecución: la memoria se mide en una pasada aparte
+        tracemalloc.start()
+        funcion(calificaciones)
+        pico = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+        return statistics.median(tiempos), pico, matriz
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING('DEBUG=True: las consultas registradas inflan la memoria medida.'))
+        filas = options['filas']
+        with transaction.atomic():
+            corredor = Corredor.objects.create(nombre=NOMBRE_CORREDOR, codigo_corredor='__BEMP__')
+            poblar(corredor, filas)
+            calificaciones = CalificacionTributaria.objects.filter(corredor=corredor)
+            referencia = None
+            for titulo, funcion in (('instancias ORM', desde_orm), ('30 columnas', desde_columnas),
+                                    ('empaquetado', desde_empaquetado)):
+                segundos, pico, matriz = self.medir(funcion, calificaciones, options['repeticiones'])
+                if referencia is None:
+                    referencia = matriz
+                iguales = 'ok' if np.array_equal(matriz, referencia) else 'DISTINTA'
+                self.stdout.write(
+                    f'{titulo:<15} {filas:,} filas en {segundos:6.2f}s ({filas / segundos:>10,.0f} filas/s) '
+                    f'| pico {pico:7.1f} MB | matriz {iguales}'
+                )
+            transaction.set_rollback(True)
+        self.stdout.write(f'Columna empaquetada: {BYTES_EMPAQUETADO} bytes por fila (30 x int32).')
@@ -0,0 +1,57 @@
+# calificaciones/management/commands/benchmark_exportacion.py
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from calificaciones.exportacion import TAMANO_LECTURA, generar_xlsx
+from calificaciones.management.commands.benchmark_indices import NOMBRE_CORREDOR, poblar
+from calificaciones.models import CalificacionTributaria, Corredor
+from calificaciones.views import CAMPOS_REPORTE, encabezados_reporte
+
+
+class Command(BaseCommand):
+    help = 'Mide tiempo al primer byte, tiempo total y memoria pico del reporte Excel en streaming.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', default='50000,500000', help='Tamaños de reporte separados por coma.')
+
+    def exportar(self, corredor, medir_memoria=False):
+        filas = (
+            CalificacionTributaria.objects.filter(corredor=corredor).order_by('-fecha')
+            .values_list(*CAMPOS_REPORTE).iterator(chunk_size=TAMANO_LECTURA)
+        )
+        if medir_memoria:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        primer_byte = None
+        total = 0
+        for trozo in generar_xlsx(encabezados_reporte(), filas):
+            if trozo and primer_byte is None:
+                primer_byte = time.perf_counter() - t0
+            total += len(trozo)
+        segundos = time.perf_counter() - t0
+        pico = None
+        if medir_memoria:
+            pico = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+        return primer_byte, segundos, pico, total
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING('DEBUG=True: las consultas registradas inflan la memoria medida.'))
+        for filas in [int(x) for x in options['filas'].split(',')]:
+            with transaction.atomic():
+                corredor = Corredor.objects.create(nombre=NOMBRE_CORREDOR, codigo_corredor='__BXLS__')
+                # Todas las filas para el corredor medido
+                poblar(corredor, filas, otros_corredores=0)
+                # tracemalloc enlentece mucho la ejecución: tiempos y memoria se miden en pasadas separadas
+                primer_byte, segundos, _, total = self.exportar(corredor)
+                pico = self.exportar(corredor, medir_memoria=True)[2]
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f'{filas:>9,} filas: primer byte {primer_byte * 1000:7.1f} ms | total {segundos:6.1f}s '
+                f'({filas / segundos:,.0f} filas/s) | pico {pico:6.1f} MB | archivo {total / 2 ** 20:6.1f} MB'
+            )
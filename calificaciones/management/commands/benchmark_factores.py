@@ -0,0 +1,65 @@
+# calificaciones/management/commands/benchmark_factores.py
+import time
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from calificaciones.calculos import COLUMNAS_MONTO, calcular_factores, fila_a_factores, montos_a_enteros
+
+
+def factores_fila_a_fila(df):
+    # Implementación anterior: Decimal por celda y división fila a fila
+    resultado = []
+    for row in df.to_dict('records'):
+        suma_base = sum(Decimal(str(row.get(f'monto_{i}', '0.0')).replace(',', '.')) for i in range(8, 20))
+        if suma_base > 0:
+            resultado.append({
+                f'factor_{i}': Decimal(str(row.get(f'monto_{i}', '0.0')).replace(',', '.')) / suma_base
+                for i in range(8, 38)
+            })
+        else:
+            resultado.append({f'factor_{i}': Decimal('0.0') for i in range(8, 38)})
+    return resultado
+
+
+class Command(BaseCommand):
+    help = 'Compara el cálculo montos -> factores fila a fila (Decimal) con el kernel vectorizado.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=1_000_000)
+        parser.add_argument('--filas-legado', type=int, default=50_000,
+                            help='Filas para medir la versión Decimal (se extrapola al total).')
+        parser.add_argument('--semilla', type=int, default=0)
+
+    def handle(self, *args, **options):
+        filas = options['filas']
+        rng = np.random.default_rng(options['semilla'])
+        # Montos en pesos con 2 decimales; ~5% de filas con suma base en cero
+        centavos = rng.integers(0, 10 ** 11, size=(filas, len(COLUMNAS_MONTO)))
+        centavos[rng.random(filas) < 0.05, :12] = 0
+        df = pd.DataFrame(centavos / 100, columns=COLUMNAS_MONTO)
+
+        t0 = time.perf_counter()
+        enteros = montos_a_enteros(df)
+        t1 = time.perf_counter()
+        factores = calcular_factores(enteros)
+        t2 = time.perf_counter()
+        vectorizado = t2 - t0
+        self.stdout.write(f'vectorizado: {filas:,} filas, conversión {t1 - t0:.2f}s + kernel {t2 - t1:.2f}s')
+
+        n = min(options['filas_legado'], filas)
+        t0 = time.perf_counter()
+        legado = factores_fila_a_fila(df.iloc[:n])
+        segundos = time.perf_counter() - t0
+        estimado = segundos * filas / n
+        self.stdout.write(f'fila a fila: {n:,} filas en {segundos:.2f}s (estimado {estimado:.1f}s para {filas:,})')
+        self.stdout.write(f'aceleración: x{estimado / vectorizado:.0f}')
+
+        # Verificación: mismo resultado que el Decimal cuantizado a 8 decimales
+        distintos = sum(
+            1 for esperado, fila in zip(legado, factores[:n])
+            if {k: v.quantize(Decimal('1e-8')) for k, v in esperado.items()} != fila_a_factores(fila)
+        )
+        self.stdout.write(f'filas distintas a la versión Decimal: {distintos}')
@@ -0,0 +1,129 @@
+# calificaciones/management/commands/benchmark_indices.py
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from calificaciones.consultas import rango_periodo
+from calificaciones.models import CalificacionTributaria, Corredor
+
+NOMBRE_CORREDOR = '__benchmark_indices__'
+
+
+def poblar(corredor, filas, otros_corredores=4, lote=5000, stdout=None):
+    """
+    Inserta `filas` calificaciones repartidas entre el corredor medido y otros corredores,
+    con claves (instrumento, fecha) únicas. Solo se llenan los campos obligatorios.
+    """
+    corredores = [corredor] + [
+        Corredor.objects.get_or_create(nombre=f'{NOMBRE_CORREDOR}{i}', codigo_corredor=f'__BI{i}__')[0]
+        for i in range(otros_corredores)
+    ]
+    inicio = date(2000, 1, 1)
+    mercados = ['ACC', 'CFI', 'FFM', None]
+    instrumentos = 2000
+    for desde in range(0, filas, lote):
+        objs = []
+        for i in range(desde, min(desde + lote, filas)):
+            objs.append(CalificacionTributaria(
+                corredor=corredores[i % len(corredores)],
+                instrumento=f'INS{(i // len(corredores)) % instrumentos:05d}',
+                fecha=inicio + timedelta(days=i // (len(corredores) * instrumentos)),
+                secuencia=10001,
+                numero_dividendo=1,
+                tipo_sociedad='A',
+                valor_historico=0,
+                tipo_mercado=mercados[i % 7 % 4],
+                origen='COR' if i % 3 else 'SIS',
+            ))
+        CalificacionTributaria.objects.bulk_create(objs)
+        if stdout and (desde // lote) % 100 == 0:
+            stdout.write(f'  {desde + len(objs):,} / {filas:,} filas')
+
+
+def medir(queryset, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        list(queryset[:100])
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tiempos)
+
+
+class Command(BaseCommand):
+    help = ('Plan de ejecución y latencia de las consultas del mantenedor y del upsert '
+            'con y sin los índices de CalificacionTributaria.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=10_000_000)
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--conservar', action='store_true', help='No borra los datos sintéticos al terminar.')
+
+    def consultas(self, corredor):
+        base = CalificacionTributaria.objects.filter(corredor=corredor)
+        desde, hasta = rango_periodo(2005)
+        una = base.order_by('-fecha').values('instrumento', 'fecha').first()
+        return {
+            'grilla (-fecha)': base.order_by('-fecha'),
+            'mercado': base.filter(tipo_mercado='CFI').order_by('-fecha'),
+            'origen': base.filter(origen='SIS').order_by('-fecha'),
+            'año con fecha__year': base.filter(fecha__year=2005).order_by('-fecha'),
+            'año con rango de fechas': base.filter(fecha__gte=desde, fecha__lt=hasta).order_by('-fecha'),
+            'clave del upsert': base.filter(instrumento=una['instrumento'], fecha=una['fecha']),
+        }
+
+    def reportar(self, titulo, corredor, repeticiones):
+        self.stdout.write(self.style.MIGRATE_HEADING(titulo))
+        for nombre, queryset in self.consultas(corredor).items():
+            ms = medir(queryset, repeticiones)
+            plan = ' | '.join(linea.strip() for linea in queryset[:100].explain().splitlines() if linea.strip())
+            self.stdout.write(f'{nombre:<26} {ms:9.2f} ms  plan: {plan[:160]}')
+
+    def _existentes(self):
+        with connection.cursor() as cursor:
+            return set(connection.introspection.get_constraints(cursor, CalificacionTributaria._meta.db_table))
+
+    def quitar_indices(self):
+        # La restricción va primero: en SQLite quitarla reconstruye la tabla con todos los índices del modelo
+        opts = CalificacionTributaria._meta
+        with connection.schema_editor() as editor:
+            for constraint in opts.constraints:
+                editor.remove_constraint(CalificacionTributaria, constraint)
+        existentes = self._existentes()
+        with connection.schema_editor() as editor:
+            for index in opts.indexes:
+                if index.name in existentes:
+                    editor.remove_index(CalificacionTributaria, index)
+
+    def restaurar_indices(self):
+        opts = CalificacionTributaria._meta
+        with connection.schema_editor() as editor:
+            for constraint in opts.constraints:
+                editor.add_constraint(CalificacionTributaria, constraint)
+        existentes = self._existentes()
+        with connection.schema_editor() as editor:
+            for index in opts.indexes:
+                if index.name not in existentes:
+                    editor.add_index(CalificacionTributaria, index)
+
+    def handle(self, *args, **options):
+        corredor, _ = Corredor.objects.get_or_create(nombre=NOMBRE_CORREDOR, codigo_corredor='__BIDX__')
+        existentes = CalificacionTributaria.objects.filter(corredor__nombre__startswith=NOMBRE_CORREDOR).count()
+        if existentes < options['filas']:
+            CalificacionTributaria.objects.filter(corredor__nombre__startswith=NOMBRE_CORREDOR).delete()
+            self.stdout.write(f'Generando {options["filas"]:,} filas...')
+            poblar(corredor, options['filas'], stdout=self.stdout)
+
+        try:
+            self.reportar('Con índices', corredor, options['repeticiones'])
+            self.quitar_indices()
+            try:
+                self.reportar('Sin índices', corredor, options['repeticiones'])
+            finally:
+                self.restaurar_indices()
+        finally:
+            if not options['conservar']:
+                CalificacionTributaria.objects.filter(corredor__nombre__startswith=NOMBRE_CORREDOR).delete()
+                Corredor.objects.filter(nombre__startswith=NOMBRE_CORREDOR).delete()
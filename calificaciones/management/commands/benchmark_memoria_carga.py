@@ -0,0 +1,70 @@
+# calificaciones/management/commands/benchmark_memoria_carga.py
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from calificaciones.carga_masiva import TAMANO_BLOQUE_CSV, cargar_archivo
+from calificaciones.models import Corredor
+
+
+def escribir_archivo_montos(ruta, filas, bloque=50000):
+    """
+    Escribe un CSV de montos sintético (coma decimal) sin tenerlo completo en memoria.
+    """
+    encabezado = ['instrumento', 'fecha', 'secuencia', 'numero_dividendo', 'tipo_sociedad', 'valor_historico']
+    encabezado += [f'monto_{i}' for i in range(8, 38)]
+    with open(ruta, 'w') as f:
+        f.write(';'.join(encabezado) + '\n')
+        for inicio in range(0, filas, bloque):
+            for i in range(inicio, min(inicio + bloque, filas)):
+                montos = ';'.join(f'{(i * 7 + j) % 100000},{j:02d}' for j in range(30))
+                f.write(f'INS{i % 1000:04d};{2000 + i // 365000}-{1 + (i // 1000) % 12:02d}-{1 + (i // 12000) % 28:02d};'
+                        f'{10001 + i};1;A;1500,25;{montos}\n')
+
+
+class Command(BaseCommand):
+    help = 'Mide la memoria pico (tracemalloc) de la carga de montos según el tamaño del archivo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', default='10000,50000,200000', help='Tamaños de archivo separados por coma.')
+        parser.add_argument('--bloque', type=int, default=TAMANO_BLOQUE_CSV)
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            # Con DEBUG=True Django guarda las últimas consultas SQL y el pico crece con el archivo
+            self.stdout.write(self.style.WARNING('DEBUG=True: las consultas registradas inflan la memoria medida.'))
+        for filas in [int(x) for x in options['filas'].split(',')]:
+            with tempfile.TemporaryDirectory() as directorio:
+                ruta = os.path.join(directorio, 'montos.csv')
+                escribir_archivo_montos(ruta, filas)
+                mb_archivo = os.path.getsize(ruta) / 2 ** 20
+
+                # Referencia: el archivo completo en un solo DataFrame (comportamiento anterior)
+                tracemalloc.start()
+                with open(ruta, 'rb') as archivo:
+                    df = pd.read_csv(archivo, sep=';')
+                del df
+                pico_completo = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                tracemalloc.stop()
+
+                tracemalloc.start()
+                t0 = time.perf_counter()
+                with transaction.atomic():
+                    corredor = Corredor.objects.create(nombre='__benchmark__', codigo_corredor='__BENCH__')
+                    with open(ruta, 'rb') as archivo:
+                        _, _, _, bloques = cargar_archivo(corredor, archivo, 'MON', options['bloque'])
+                    transaction.set_rollback(True)
+                segundos = time.perf_counter() - t0
+                pico_streaming = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                tracemalloc.stop()
+
+            self.stdout.write(
+                f'{filas:>9,} filas ({mb_archivo:7.1f} MB): pico lectura completa {pico_completo:8.1f} MB | '
+                f'pico carga por bloques {pico_streaming:6.1f} MB en {len(bloques)} bloques ({segundos:.1f}s)'
+            )
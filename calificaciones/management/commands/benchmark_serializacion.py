@@ -0,0 +1,83 @@
+# calificaciones/management/commands/benchmark_serializacion.py
+import json
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.forms.models import model_to_dict
+from django.http import JsonResponse
+
+from calificaciones.calculos import COLUMNAS_FACTOR
+from calificaciones.models import CalificacionTributaria, Corredor
+from calificaciones.serializacion import SERIALIZADOR_CALIFICACION
+
+
+def _anterior(calificacion):
+    # Lo que hacía obtener_calificacion_json antes del serializador
+    data = model_to_dict(calificacion)
+    data['fecha'] = calificacion.fecha.strftime('%Y-%m-%d')
+    return data
+
+
+class Command(BaseCommand):
+    help = ('Costo por registro de serializar calificaciones: instancia + model_to_dict + DjangoJSONEncoder '
+            'frente a values_list + Serializador.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=2000)
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def medir(self, funcion, repeticiones):
+        # El mejor de N: descarta el ruido de otros procesos
+        mejor = float('inf')
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            funcion()
+            mejor = min(mejor, time.perf_counter() - t0)
+        return mejor
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING('DEBUG=True: las consultas registradas alteran los tiempos.'))
+        filas, repeticiones = options['filas'], options['repeticiones']
+        with transaction.atomic():
+            corredor = Corredor.objects.create(nombre='__benchmark__', codigo_corredor='__BSER__')
+            CalificacionTributaria.objects.bulk_create([
+                CalificacionTributaria(
+                    corredor=corredor, instrumento=f'BS{i:06d}', fecha=date(2024, 1 + i % 12, 1 + i % 28),
+                    secuencia=10001 + i, numero_dividendo=1, tipo_sociedad='A', valor_historico='1500.25',
+                    **{columna: f'0.0{(i + j) % 10}123456' for j, columna in enumerate(COLUMNAS_FACTOR)},
+                )
+                for i in range(filas)
+            ])
+            # .all() en cada lectura: un queryset ya evaluado devolvería su caché sin consultar
+            consulta = CalificacionTributaria.objects.filter(corredor=corredor)
+            instancias = list(consulta.all())
+            tuplas = list(consulta.values_list(*SERIALIZADOR_CALIFICACION.columnas))
+
+            def codificar_anterior():
+                for calificacion in instancias:
+                    JsonResponse({'success': True, 'data': _anterior(calificacion)})
+
+            def codificar_nuevo():
+                for fila in tuplas:
+                    JsonResponse({'success': True, 'data': SERIALIZADOR_CALIFICACION.fila(fila)})
+
+            pasos = [
+                ('model_to_dict', lambda: [_anterior(calificacion) for calificacion in instancias]),
+                ('Serializador.fila', lambda: [SERIALIZADOR_CALIFICACION.fila(fila) for fila in tuplas]),
+                ('model_to_dict + JsonResponse', codificar_anterior),
+                ('Serializador + JsonResponse', codificar_nuevo),
+                ('lectura instancias + model_to_dict + JSON', lambda: json.dumps(
+                    [_anterior(calificacion) for calificacion in consulta.all()], cls=DjangoJSONEncoder)),
+                ('lectura values_list + Serializador + JSON', lambda: json.dumps(
+                    list(SERIALIZADOR_CALIFICACION.filas(consulta.values_list(*SERIALIZADOR_CALIFICACION.columnas))))),
+            ]
+            self.stdout.write(f'{filas:,} registros, mejor de {repeticiones}:')
+            for titulo, funcion in pasos:
+                segundos = self.medir(funcion, repeticiones)
+                self.stdout.write(f'  {titulo:<44} {segundos * 1e6 / filas:8.1f} µs/registro')
+            transaction.set_rollback(True)
@@ -0,0 +1,48 @@
+# calificaciones/management/commands/empaquetar_factores.py
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from calificaciones.calculos import COLUMNAS_FACTOR
+from calificaciones.empaquetado import empaquetado_activo, empaquetar, matriz_desde_columnas
+from calificaciones.models import CalificacionTributaria
+
+
+class Command(BaseCommand):
+    help = ('Llena la columna factores_empaquetados desde factor_8..factor_37 (al activar '
+            'FACTORES_EMPAQUETADOS) o la deja en NULL con --limpiar (al desactivarlo).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limpiar', action='store_true', help='Deja la columna en NULL.')
+        parser.add_argument('--todas', action='store_true',
+                            help='Reempaqueta también las filas que ya tienen la columna llena.')
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por transacción.')
+
+    def handle(self, *args, **options):
+        if options['limpiar']:
+            total = CalificacionTributaria.objects.filter(factores_empaquetados__isnull=False).update(factores_empaquetados=None)
+            self.stdout.write(self.style.SUCCESS(f'{total:,} filas con la columna empaquetada en NULL.'))
+            return
+        if not empaquetado_activo():
+            self.stdout.write(self.style.WARNING(
+                'FACTORES_EMPAQUETADOS está apagado: las próximas escrituras volverán a dejar la columna en NULL.'))
+
+        opts = CalificacionTributaria._meta
+        qn = connection.ops.quote_name
+        sql = 'UPDATE {} SET {} = %s WHERE {} = %s'.format(
+            qn(opts.db_table), qn(opts.get_field('factores_empaquetados').column), qn(opts.pk.column))
+        calificaciones = CalificacionTributaria.objects.order_by('id')
+        if not options['todas']:
+            calificaciones = calificaciones.filter(factores_empaquetados__isnull=True)
+
+        # Por rangos de id: cada lote es una transacción corta y el recorrido no depende de un cursor abierto
+        ultimo, total = 0, 0
+        while True:
+            filas = list(calificaciones.filter(id__gt=ultimo).values_list('id', *COLUMNAS_FACTOR)[:options['lote']])
+            if not filas:
+                break
+            matriz = matriz_desde_columnas([fila[1:] for fila in filas])
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, [[empaquetar(vector), fila[0]] for fila, vector in zip(filas, matriz)])
+            ultimo = filas[-1][0]
+            total += len(filas)
+        self.stdout.write(self.style.SUCCESS(f'{total:,} filas empaquetadas.'))
@@ -0,0 +1,76 @@
+# calificaciones/management/commands/exportar_calificaciones.py
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from calificaciones.consultas import aplicar_filtros
+from calificaciones.exportacion import FORMATOS_EXPORTACION, consulta_exportacion, formatos_disponibles, generar_exportacion, leer_marca, marca_exportacion
+from calificaciones.forms import FiltroCalificacionesForm
+from calificaciones.models import CalificacionTributaria, Corredor
+
+
+class Command(BaseCommand):
+    help = ('Exporta calificaciones en CSV (formato de carga masiva), JSON Lines, Parquet o Arrow. '
+            'Con --marca guarda la fecha de la exportación para que la siguiente sea incremental. '
+            'Las exportaciones incrementales no incluyen las calificaciones eliminadas: para '
+            'reflejarlas hay que hacer una exportación completa (sin --desde ni --marca).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('salida', help="Archivo de salida ('-' para la salida estándar).")
+        parser.add_argument('--formato', default='csv', choices=list(FORMATOS_EXPORTACION))
+        parser.add_argument('--corredor', action='append', metavar='CODIGO',
+                            help='Código de corredor (repetible). Por defecto, todos.')
+        parser.add_argument('--desde', help='Solo calificaciones modificadas después de esta fecha (ISO 8601).')
+        parser.add_argument('--marca', help='Archivo con la fecha de la última exportación; se lee como --desde '
+                                            'si no se indica y se actualiza al terminar.')
+        parser.add_argument('--mercado', default='', help='Filtro por tipo de mercado.')
+        parser.add_argument('--origen', default='', help='Filtro por origen.')
+        parser.add_argument('--periodo', default='', help='Filtro por periodo comercial (año).')
+
+    def handle(self, *args, **options):
+        formato = options['formato']
+        if formato not in formatos_disponibles():
+            raise CommandError(f'El formato {formato} requiere el paquete pyarrow.')
+
+        marca = Path(options['marca']) if options['marca'] else None
+        texto_desde = options['desde']
+        if texto_desde is None and marca and marca.exists():
+            texto_desde = marca.read_text()
+        try:
+            desde = leer_marca(texto_desde) if texto_desde else None
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        calificaciones = CalificacionTributaria.objects.all()
+        corredores = None
+        if options['corredor']:
+            codigos = set(options['corredor'])
+            encontrados = set(Corredor.objects.filter(codigo_corredor__in=codigos).values_list('codigo_corredor', flat=True))
+            if codigos - encontrados:
+                raise CommandError(f'Corredores inexistentes: {", ".join(sorted(codigos - encontrados))}.')
+            calificaciones = calificaciones.filter(corredor__codigo_corredor__in=codigos)
+            corredores = Corredor.objects.filter(codigo_corredor__in=codigos)
+        filtro_form = FiltroCalificacionesForm({
+            'tipo_mercado': options['mercado'], 'origen': options['origen'], 'periodo_comercial': options['periodo'],
+        })
+        if not filtro_form.is_valid():
+            raise CommandError(f'Filtros inválidos: {filtro_form.errors.as_text()}')
+        calificaciones = aplicar_filtros(calificaciones, filtro_form)
+
+        hasta = marca_exportacion(corredores)
+        filas = consulta_exportacion(calificaciones, desde, hasta)
+        destino = sys.stdout.buffer if options['salida'] == '-' else open(options['salida'], 'wb')
+        total = 0
+        try:
+            for trozo in generar_exportacion(filas, formato):
+                destino.write(trozo)
+                total += len(trozo)
+        finally:
+            if destino is not sys.stdout.buffer:
+                destino.close()
+
+        if marca:
+            marca.write_text(hasta.isoformat())
+        self.stderr.write(f'Exportados {total:,} bytes ({formato}) hasta {hasta.isoformat()}'
+                          + (f', modificadas desde {desde.isoformat()}' if desde else '') + '.')
@@ -0,0 +1,17 @@
+# calificaciones/management/commands/limpiar_cargas.py
+from django.core.management.base import BaseCommand
+
+from calificaciones.trabajos import DIAS_RETENCION_ERROR, limpiar_archivos
+
+
+class Command(BaseCommand):
+    help = ('Borra los archivos subidos que ya no se necesitan: los de cargas completadas o revertidas '
+            'y los de cargas con error más antiguas que --dias (después ya no se pueden reanudar).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=DIAS_RETENCION_ERROR,
+                            help='Días que se conservan los archivos de cargas con error.')
+
+    def handle(self, *args, **options):
+        borrados = limpiar_archivos(options['dias'])
+        self.stdout.write(self.style.SUCCESS(f'{borrados:,} archivos de carga borrados.'))
@@ -0,0 +1,68 @@
+# calificaciones/management/commands/procesar_cargas.py
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from calificaciones.models import TrabajoCarga
+from calificaciones.trabajos import procesar_trabajo, reanudar_trabajo, tomar_siguiente
+
+
+def ejecutar_worker(intervalo, una_vez, stdout=None):
+    while True:
+        trabajo = tomar_siguiente()
+        if trabajo is None:
+            if una_vez:
+                return
+            time.sleep(intervalo)
+            continue
+        trabajo = procesar_trabajo(trabajo)
+        if stdout:
+            stdout.write(f'Trabajo #{trabajo.pk}: {trabajo.get_estado_display()} '
+                         f'({trabajo.filas_procesadas} filas, {trabajo.creados} creados, '
+                         f'{trabajo.actualizados} actualizados, {trabajo.sin_cambios} sin cambios) {trabajo.errores}')
+
+
+def _worker_hijo(intervalo, una_vez):
+    # Cada proceso abre sus propias conexiones
+    connections.close_all()
+    ejecutar_worker(intervalo, una_vez)
+
+
+class Command(BaseCommand):
+    help = 'Worker de la cola de cargas masivas (TrabajoCarga).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=1, help='Cantidad de procesos worker.')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos de espera cuando la cola está vacía.')
+        parser.add_argument('--una-vez', action='store_true', help='Procesa lo pendiente y termina.')
+        parser.add_argument('--reanudar', type=int, metavar='ID', help='Vuelve a encolar un trabajo con error (o abandonado en proceso) antes de empezar.')
+
+    def handle(self, *args, **options):
+        if options['reanudar']:
+            try:
+                trabajo = TrabajoCarga.objects.get(pk=options['reanudar'])
+            except TrabajoCarga.DoesNotExist:
+                raise CommandError(f'No existe el trabajo #{options["reanudar"]}.')
+            if not reanudar_trabajo(trabajo):
+                raise CommandError(f'El trabajo #{trabajo.pk} no tiene error o sigue en proceso.')
+            self.stdout.write(f'Trabajo #{trabajo.pk} reanudado desde el bloque {trabajo.bloques_confirmados + 1}.')
+
+        if options['procesos'] <= 1:
+            ejecutar_worker(options['intervalo'], options['una_vez'], self.stdout)
+            return
+
+        connections.close_all()
+        # Un pool de sesiones Oracle heredado por fork compartiría los sockets del padre con los hijos
+        for conexion in connections.all():
+            if (conexion.alias, conexion.settings_dict['USER']) in getattr(conexion, '_connection_pools', {}):
+                conexion.close_pool()
+        procesos = [
+            multiprocessing.Process(target=_worker_hijo, args=(options['intervalo'], options['una_vez']))
+            for _ in range(options['procesos'])
+        ]
+        for proceso in procesos:
+            proceso.start()
+        for proceso in procesos:
+            proceso.join()
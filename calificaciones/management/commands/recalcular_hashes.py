@@ -0,0 +1,47 @@
+# calificaciones/management/commands/recalcular_hashes.py
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from calificaciones.calculos import COLUMNAS_FACTOR, escalar_decimal
+from calificaciones.contenido import CAMPOS_CONTENIDO, hash_contenido
+from calificaciones.models import CalificacionTributaria
+
+
+class Command(BaseCommand):
+    help = ('Recalcula hash_contenido de todas las calificaciones. Se ejecuta si cambia la forma de '
+            'calcular el hash: con hashes antiguos la próxima carga reescribe cada fila una vez.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por transacción.')
+
+    def handle(self, *args, **options):
+        opts = CalificacionTributaria._meta
+        qn = connection.ops.quote_name
+        sql = 'UPDATE {} SET {} = %s WHERE {} = %s'.format(
+            qn(opts.db_table), qn(opts.get_field('hash_contenido').column), qn(opts.pk.column))
+        calificaciones = CalificacionTributaria.objects.order_by('id')
+        posiciones = {campo: i for i, campo in enumerate(CAMPOS_CONTENIDO)}
+
+        # Por rangos de id, como empaquetar_factores
+        ultimo, total = 0, 0
+        while True:
+            filas = list(calificaciones.filter(id__gt=ultimo).values_list('id', *CAMPOS_CONTENIDO)[:options['lote']])
+            if not filas:
+                break
+            # Sin todos los valores el hash queda en NULL, igual que en calcular_derivados
+            completas = [fila for fila in filas if None not in fila[1:]]
+            hashes = {}
+            if completas:
+                def columna(campo):
+                    return [fila[1 + posiciones[campo]] for fila in completas]
+                factores = [[escalar_decimal(fila[1 + posiciones[c]]) for c in COLUMNAS_FACTOR] for fila in completas]
+                calculados = hash_contenido(
+                    columna('secuencia'), columna('numero_dividendo'), columna('tipo_sociedad'),
+                    columna('valor_historico'), columna('instrumento_no_inscrito'), columna('fuente_ingreso'), factores,
+                )
+                hashes = {fila[0]: int(valor) for fila, valor in zip(completas, calculados)}
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, [[hashes.get(fila[0]), fila[0]] for fila in filas])
+            ultimo = filas[-1][0]
+            total += len(filas)
+        self.stdout.write(self.style.SUCCESS(f'{total:,} hashes recalculados.'))
@@ -0,0 +1,23 @@
+# calificaciones/management/commands/reconstruir_resumenes.py
+from django.core.management.base import BaseCommand, CommandError
+
+from calificaciones.models import Corredor
+from calificaciones.resumenes import reconstruir_resumen
+
+
+class Command(BaseCommand):
+    help = ('Recalcula la tabla de resúmenes por (corredor, tipo de mercado, año comercial) desde las '
+            'calificaciones. Se ejecuta una vez tras la migración que la crea; después la mantienen '
+            'las escrituras, y el comando solo repara diferencias.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corredor', help='Código del corredor (por defecto, todos).')
+
+    def handle(self, *args, **options):
+        corredor = None
+        if options['corredor']:
+            corredor = Corredor.objects.filter(codigo_corredor=options['corredor']).first()
+            if corredor is None:
+                raise CommandError(f"No existe el corredor {options['corredor']}.")
+        grupos = reconstruir_resumen(corredor)
+        self.stdout.write(self.style.SUCCESS(f'{grupos:,} grupos de resumen recalculados.'))
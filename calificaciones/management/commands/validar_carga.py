@@ -0,0 +1,43 @@
+# calificaciones/management/commands/validar_carga.py
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from calificaciones.validacion import MAX_ERRORES_DETALLE, validar_archivo
+
+
+class Command(BaseCommand):
+    help = 'Valida un archivo de carga masiva completo sin escribir en la base de datos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo')
+        parser.add_argument('--tipo', choices=['FAC', 'MON'], required=True, help='FAC: factores, MON: montos.')
+        parser.add_argument('--reporte', help='Escribe el detalle de errores en este CSV (separado por ;).')
+        parser.add_argument('--max-detalle', type=int, default=MAX_ERRORES_DETALLE,
+                            help='Errores a detallar fila a fila (el resumen siempre los cuenta todos).')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                reporte = validar_archivo(archivo, options['tipo'], max_detalle=options['max_detalle'])
+        except OSError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f'{reporte["filas"]:,} filas validadas en {reporte["segundos"]:.2f}s '
+                          f'(separador decimal "{reporte["decimal"]}").')
+        for advertencia in reporte['advertencias']:
+            self.stdout.write(self.style.WARNING(advertencia))
+        for item in reporte['resumen']:
+            self.stdout.write(f'  {item["cantidad"]:>9,}  {item["columna"]}: {item["mensaje"]}')
+
+        if options['reporte']:
+            with open(options['reporte'], 'w', newline='') as salida:
+                escritor = csv.writer(salida, delimiter=';')
+                escritor.writerow(['fila', 'columna', 'mensaje', 'valor'])
+                for error in reporte['errores']:
+                    escritor.writerow([error['fila'], error['columna'], error['mensaje'], error['valor'] or ''])
+
+        if reporte['valido']:
+            self.stdout.write(self.style.SUCCESS('Archivo válido.'))
+        else:
+            raise CommandError(f'{reporte["total_errores"]:,} errores.')
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calificaciones', '0005_corredor_usuario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoCarga',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('FAC', 'Carga Factores'), ('MON', 'Carga Montos')], max_length=3, verbose_name='Tipo de Carga')),
+                ('archivo', models.FileField(upload_to='cargas/%Y/%m/', verbose_name='Archivo')),
+                ('nombre_archivo', models.CharField(max_length=255, verbose_name='Nombre del Archivo')),
+                ('estado', models.CharField(choices=[('PEN', 'Pendiente'), ('PRO', 'En Proceso'), ('OK', 'Completado'), ('ERR', 'Con Error')], default='PEN', max_length=3, verbose_name='Estado')),
+                ('tamano_bloque', models.PositiveIntegerField(default=5000, verbose_name='Filas por Bloque')),
+                ('bloques_confirmados', models.PositiveIntegerField(default=0, verbose_name='Bloques Confirmados')),
+                ('filas_procesadas', models.PositiveIntegerField(default=0, verbose_name='Filas Procesadas')),
+                ('creados', models.PositiveIntegerField(default=0, verbose_name='Registros Creados')),
+                ('actualizados', models.PositiveIntegerField(default=0, verbose_name='Registros Actualizados')),
+                ('errores', models.TextField(blank=True, default='', verbose_name='Errores')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Inicio del Proceso')),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fin del Proceso')),
+                ('corredor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='calificaciones.corredor', verbose_name='Corredor')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Carga',
+                'verbose_name_plural': 'Trabajos de Carga',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
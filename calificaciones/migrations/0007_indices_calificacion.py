@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:43
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# Claves duplicadas que se listan en el mensaje de error
+MAX_LISTADO = 50
+
+
+def verificar_duplicados(apps, schema_editor):
+    # La clave (corredor, instrumento, fecha) pasa a ser única, pero el ingreso manual no la validaba.
+    # Si hay duplicados la migración se detiene y los lista sin borrar nada: se corrigen o eliminan
+    # los registros sobrantes y se vuelve a migrar
+    CalificacionTributaria = apps.get_model('calificaciones', 'CalificacionTributaria')
+    duplicados = list(
+        CalificacionTributaria.objects.values('corredor', 'instrumento', 'fecha')
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+        .order_by('corredor', 'instrumento', 'fecha')
+    )
+    if not duplicados:
+        return
+    lineas = []
+    for clave in duplicados[:MAX_LISTADO]:
+        ids = list(
+            CalificacionTributaria.objects.filter(
+                corredor=clave['corredor'], instrumento=clave['instrumento'], fecha=clave['fecha']
+            ).order_by('id').values_list('id', flat=True)
+        )
+        lineas.append(f"  corredor={clave['corredor']} instrumento={clave['instrumento']!r} fecha={clave['fecha']}: ids {ids}")
+    if len(duplicados) > MAX_LISTADO:
+        lineas.append(f'  ... y {len(duplicados) - MAX_LISTADO} claves más.')
+    raise RuntimeError(
+        f'Hay {len(duplicados)} claves (corredor, instrumento, fecha) con más de una calificación y no se '
+        'puede crear la restricción única calif_corr_instr_fecha_uniq. Corrija o elimine los registros '
+        'sobrantes y vuelva a ejecutar migrate:\n' + '\n'.join(lineas)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calificaciones', '0006_trabajocarga'),
+    ]
+
+    operations = [
+        migrations.RunPython(verificar_duplicados, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='calificaciontributaria',
+            index=models.Index(fields=['corredor', '-fecha', 'instrumento'], name='calif_corr_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calificaciontributaria',
+            index=models.Index(fields=['corredor', 'tipo_mercado', '-fecha'], name='calif_corr_mercado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calificaciontributaria',
+            index=models.Index(fields=['corredor', 'origen', '-fecha'], name='calif_corr_origen_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='calificaciontributaria',
+            constraint=models.UniqueConstraint(fields=('corredor', 'instrumento', 'fecha'), name='calif_corr_instr_fecha_uniq'),
+        ),
+    ]
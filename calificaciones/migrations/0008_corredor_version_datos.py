@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calificaciones', '0007_indices_calificacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='corredor',
+            name='version_datos',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Versión de Datos'),
+        ),
+    ]
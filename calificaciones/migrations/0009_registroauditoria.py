@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calificaciones', '0008_corredor_version_datos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroAuditoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('usuario_nombre', models.CharField(blank=True, max_length=150, verbose_name='Nombre de Usuario')),
+                ('fecha_accion', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha y Hora')),
+                ('accion', models.CharField(choices=[('CRE', 'Creación'), ('MOD', 'Modificación'), ('FAC', 'Modificación de Factores'), ('ELI', 'Eliminación'), ('CAR', 'Carga Masiva')], max_length=3, verbose_name='Acción')),
+                ('calificacion_id', models.BigIntegerField(blank=True, null=True, verbose_name='ID Calificación')),
+                ('objeto', models.CharField(blank=True, max_length=200, verbose_name='Elemento Afectado')),
+                ('cantidad', models.PositiveIntegerField(default=1, verbose_name='Registros Afectados')),
+                ('detalle', models.TextField(blank=True, verbose_name='Detalle')),
+                ('corredor', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='calificaciones.corredor', verbose_name='Corredor')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Registro de Auditoría',
+                'verbose_name_plural': 'Registros de Auditoría',
+                'ordering': ['-fecha_accion', '-id'],
+                'indexes': [models.Index(fields=['corredor', '-fecha_accion', '-id'], name='audit_corr_fecha_idx')],
+            },
+        ),
+    ]
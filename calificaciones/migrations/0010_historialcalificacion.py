@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calificaciones', '0009_registroauditoria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistorialCalificacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('calificacion_id', models.BigIntegerField(verbose_name='ID Calificación')),
+                ('fecha_cambio', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha del Cambio')),
+                ('accion', models.CharField(choices=[('CRE', 'Creación'), ('MOD', 'Modificación'), ('ELI', 'Eliminación')], max_length=3, verbose_name='Acción')),
+                ('origen', models.CharField(choices=[('MAN', 'Ingreso Manual'), ('CAR', 'Carga Masiva'), ('ADM', 'Administración')], max_length=3, verbose_name='Origen')),
+                ('anteriores', models.TextField(blank=True, verbose_name='Valores Anteriores')),
+            ],
+            options={
+                'verbose_name': 'Historial de Calificación',
+                'verbose_name_plural': 'Historial de Calificaciones',
+                'ordering': ['-fecha_cambio', '-id'],
+                'indexes': [models.Index(fields=['calificacion_id', '-fecha_cambio', '-id'], name='hist_calif_fecha_idx')],
+            },
+        ),
+    ]
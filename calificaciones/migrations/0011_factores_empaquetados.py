@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calificaciones', '0010_historialcalificacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calificaciontributaria',
+            name='factores_empaquetados',
+            field=models.BinaryField(blank=True, null=True, verbose_name='Factores Empaquetados'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calificaciones', '0011_factores_empaquetados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calificaciontributaria',
+            name='hash_contenido',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='Hash del Contenido'),
+        ),
+        migrations.AddField(
+            model_name='trabajocarga',
+            name='sin_cambios',
+            field=models.PositiveIntegerField(default=0, verbose_name='Registros sin Cambios'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calificaciones', '0012_hash_contenido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenPeriodo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_mercado', models.CharField(blank=True, choices=[('ACC', 'Acciones'), ('CFI', 'CFI'), ('FFM', 'Fondos Mutuos')], max_length=3, null=True, verbose_name='Tipo de Mercado')),
+                ('periodo_comercial', models.PositiveSmallIntegerField(verbose_name='Periodo Comercial (Año)')),
+                ('cantidad', models.IntegerField(default=0, verbose_name='Calificaciones')),
+                ('suma_valor_historico', models.DecimalField(decimal_places=2, default=0, max_digits=24, verbose_name='Total Valor Histórico')),
+                ('suma_factor_8', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('suma_factor_9', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('suma_factor_10', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('suma_factor_11', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('suma_factor_12', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('suma_factor_13', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('suma_factor_14', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('suma_factor_15', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('suma_factor_16', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('suma_factor_17', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('suma_factor_18', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('suma_factor_19', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('corredor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='calificaciones.corredor', verbose_name='Corredor')),
+            ],
+            options={
+                'verbose_name': 'Resumen por Periodo',
+                'verbose_name_plural': 'Resúmenes por Periodo',
+                'ordering': ['corredor', '-periodo_comercial', 'tipo_mercado'],
+                'constraints': [models.UniqueConstraint(fields=('corredor', 'tipo_mercado', 'periodo_comercial'), name='resumen_corr_merc_per_uniq')],
+            },
+        ),
+    ]
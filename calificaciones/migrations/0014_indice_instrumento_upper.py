@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:51
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calificaciones', '0013_resumen_periodo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calificaciontributaria',
+            index=models.Index(django.db.models.functions.text.Upper('instrumento'), name='calif_instr_upper_idx'),
+        ),
+    ]
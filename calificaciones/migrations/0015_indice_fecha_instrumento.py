@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calificaciones', '0014_indice_instrumento_upper'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calificaciontributaria',
+            index=models.Index(fields=['-fecha', 'instrumento'], name='calif_fecha_instr_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calificaciones', '0015_indice_fecha_instrumento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calificaciontributaria',
+            name='ultima_carga',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='calificaciones', to='calificaciones.trabajocarga', verbose_name='Última Carga'),
+        ),
+        migrations.AddField(
+            model_name='historialcalificacion',
+            name='carga',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='calificaciones.trabajocarga', verbose_name='Carga'),
+        ),
+        migrations.AddField(
+            model_name='trabajocarga',
+            name='fecha_reversion',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Reversión'),
+        ),
+        migrations.AddField(
+            model_name='trabajocarga',
+            name='revertidos',
+            field=models.PositiveIntegerField(default=0, verbose_name='Registros Revertidos'),
+        ),
+        migrations.AlterField(
+            model_name='historialcalificacion',
+            name='origen',
+            field=models.CharField(choices=[('MAN', 'Ingreso Manual'), ('CAR', 'Carga Masiva'), ('ADM', 'Administración'), ('REV', 'Reversión de Carga')], max_length=3, verbose_name='Origen'),
+        ),
+        migrations.AlterField(
+            model_name='registroauditoria',
+            name='accion',
+            field=models.CharField(choices=[('CRE', 'Creación'), ('MOD', 'Modificación'), ('FAC', 'Modificación de Factores'), ('ELI', 'Eliminación'), ('CAR', 'Carga Masiva'), ('REV', 'Reversión de Carga')], max_length=3, verbose_name='Acción'),
+        ),
+        migrations.AlterField(
+            model_name='trabajocarga',
+            name='estado',
+            field=models.CharField(choices=[('PEN', 'Pendiente'), ('PRO', 'En Proceso'), ('OK', 'Completado'), ('ERR', 'Con Error'), ('REV', 'Revertido')], default='PEN', max_length=3, verbose_name='Estado'),
+        ),
+        migrations.AddIndex(
+            model_name='historialcalificacion',
+            index=models.Index(fields=['carga', 'calificacion_id'], name='hist_carga_calif_idx'),
+        ),
+    ]
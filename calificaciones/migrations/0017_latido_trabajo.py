@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calificaciones', '0016_carga_lote'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajocarga',
+            name='latido',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Último Latido'),
+        ),
+    ]
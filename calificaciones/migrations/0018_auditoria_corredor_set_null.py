@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copiar_codigo_corredor(apps, schema_editor):
+    # Los registros existentes guardan el código de su corredor antes de que la FK pueda quedar nula
+    Corredor = apps.get_model('calificaciones', 'Corredor')
+    RegistroAuditoria = apps.get_model('calificaciones', 'RegistroAuditoria')
+    RegistroAuditoria.objects.update(corredor_codigo=Subquery(
+        Corredor.objects.filter(pk=OuterRef('corredor_id')).values('codigo_corredor')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calificaciones', '0017_latido_trabajo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroauditoria',
+            name='corredor_codigo',
+            field=models.CharField(blank=True, max_length=10, verbose_name='Código de Corredor'),
+        ),
+        migrations.RunPython(copiar_codigo_corredor, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='registroauditoria',
+            name='corredor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='calificaciones.corredor', verbose_name='Corredor'),
+        ),
+    ]
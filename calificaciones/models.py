@@ -1,7 +1,13 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .calculos import COLUMNAS_FACTOR
+from .contenido import CAMPOS_CONTENIDO, hash_valores
+from .empaquetado import desempaquetar, empaquetar_valores, vector_desde_valores
 
 #Modelo para los CORREDORES
 class Corredor(models.Model):
@@ -17,6 +23,8 @@ class Corredor(models.Model):
     nombre = models.CharField(max_length=100, unique=True, verbose_name="Nombre del Corredor")
     codigo_corredor = models.CharField(max_length=10, unique=True, verbose_name="Código")
     activo = models.BooleanField(default=True)
+    # Contador que sube con cada escritura de calificaciones del corredor (invalida la caché de la grilla)
+    version_datos = models.PositiveIntegerField(default=0, editable=False, verbose_name="Versión de Datos")
 
     def __str__(self):
         return self.nombre
@@ -107,6 +115,16 @@ class CalificacionTributaria(models.Model):
         default='MAN', # Por defecto, sigla para: 'Ingreso Manual'
         verbose_name="Fuente de Ingreso"
     )
+    # Última carga masiva que escribió la fila (la que se deshace con reversion.revertir_carga)
+    ultima_carga = models.ForeignKey(
+        'TrabajoCarga',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='calificaciones',
+        verbose_name="Última Carga"
+    )
 
     numero_dividendo = models.IntegerField(
         verbose_name="Número de dividendo"
@@ -158,6 +176,11 @@ class CalificacionTributaria(models.Model):
     factor_35 = models.DecimalField(max_digits=9, decimal_places=8, default=0.0, validators=validator_factor)
     factor_36 = models.DecimalField(max_digits=9, decimal_places=8, default=0.0, validators=validator_factor)
     factor_37 = models.DecimalField(max_digits=9, decimal_places=8, default=0.0, validators=validator_factor)
+    # Copia de los 30 factores como int32 escalados por 10**8 (ver empaquetado.py). Se llena solo con
+    # FACTORES_EMPAQUETADOS activo; en NULL los lectores usan las columnas factor_N
+    factores_empaquetados = models.BinaryField(null=True, blank=True, editable=False, verbose_name="Factores Empaquetados")
+    # Hash de CAMPOS_CONTENIDO (ver contenido.py): las cargas masivas omiten las filas cuyo hash no cambia
+    hash_contenido = models.BigIntegerField(null=True, blank=True, editable=False, verbose_name="Hash del Contenido")
 
     # --- LÓGICA DE VALIDACIÓN con la suma de los factores que debe ser 1 ---
     def clean(self):
@@ -172,6 +195,39 @@ class CalificacionTributaria(models.Model):
                 'Error: La suma de los factores del 8 al 19 no puede ser mayor que 1.'
             )
 
+    def calcular_derivados(self):
+        """
+        Copia empaquetada de los factores y hash del contenido. save() los calcula siempre;
+        las escrituras en lote que no pasan por save() deben llamarlo.
+        """
+        # La copia empaquetada siempre acompaña a las columnas factor_N
+        self.factores_empaquetados = empaquetar_valores({columna: getattr(self, columna) for columna in COLUMNAS_FACTOR})
+        # Sin todos los valores (campos diferidos o vacíos) el hash queda en NULL y la próxima carga reescribe la fila
+        valores = {campo: getattr(self, campo) for campo in CAMPOS_CONTENIDO if campo not in self.get_deferred_fields()}
+        completo = len(valores) == len(CAMPOS_CONTENIDO) and None not in valores.values()
+        self.hash_contenido = hash_valores(valores) if completo else None
+
+    def save(self, *args, **kwargs):
+        self.calcular_derivados()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            extra = []
+            if set(update_fields) & set(COLUMNAS_FACTOR):
+                extra.append('factores_empaquetados')
+            if set(update_fields) & set(CAMPOS_CONTENIDO):
+                extra.append('hash_contenido')
+            kwargs['update_fields'] = [*update_fields, *extra]
+        super().save(*args, **kwargs)
+
+    @property
+    def vector_factores(self):
+        """
+        Los 30 factores como array int64 escalado por 10**8 (desde la columna empaquetada si existe).
+        """
+        if self.factores_empaquetados is not None:
+            return desempaquetar(self.factores_empaquetados)
+        return vector_desde_valores({columna: getattr(self, columna) for columna in COLUMNAS_FACTOR})
+
     def __str__(self):
         return f"{self.instrumento} ({self.corredor.nombre}) - {self.fecha}"
 #uso de metadatos para mostrar con nombre entendible
@@ -179,3 +235,203 @@ class CalificacionTributaria(models.Model):
         verbose_name = "Calificación Tributaria"
         verbose_name_plural = "Calificaciones Tributarias"
         ordering = ['-fecha', 'instrumento']
+        # Clave de las cargas masivas (update_or_create / upsert por bloques)
+        constraints = [
+            models.UniqueConstraint(fields=['corredor', 'instrumento', 'fecha'], name='calif_corr_instr_fecha_uniq'),
+        ]
+        # Índices según las consultas reales de la grilla: siempre por corredor y ordenadas por -fecha
+        indexes = [
+            models.Index(fields=['corredor', '-fecha', 'instrumento'], name='calif_corr_fecha_idx'),
+            models.Index(fields=['corredor', 'tipo_mercado', '-fecha'], name='calif_corr_mercado_idx'),
+            models.Index(fields=['corredor', 'origen', '-fecha'], name='calif_corr_origen_idx'),
+            # Listado del admin (todos los corredores) paginado por keyset sobre (-fecha, instrumento, id)
+            models.Index(fields=['-fecha', 'instrumento'], name='calif_fecha_instr_idx'),
+            # Búsqueda del admin por prefijo: istartswith compara UPPER(instrumento) LIKE 'X%'
+            models.Index(Upper('instrumento'), name='calif_instr_upper_idx'),
+        ]
+
+
+# --- RESUMEN PRECALCULADO POR (CORREDOR, TIPO DE MERCADO, AÑO COMERCIAL) (ver resumenes.py) ---
+class ResumenPeriodo(models.Model):
+    corredor = models.ForeignKey(Corredor, on_delete=models.CASCADE, verbose_name="Corredor")
+    tipo_mercado = models.CharField(
+        max_length=3,
+        choices=CalificacionTributaria.TIPO_MERCADO_CHOICES,
+        verbose_name="Tipo de Mercado",
+        null=True, blank=True
+    )
+    periodo_comercial = models.PositiveSmallIntegerField(verbose_name="Periodo Comercial (Año)")
+
+    # Cada escritura de calificaciones suma o resta su aporte: los promedios se obtienen dividiendo por cantidad
+    cantidad = models.IntegerField(default=0, verbose_name="Calificaciones")
+    suma_valor_historico = models.DecimalField(max_digits=24, decimal_places=2, default=0, verbose_name="Total Valor Histórico")
+    suma_factor_8 = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    suma_factor_9 = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    suma_factor_10 = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    suma_factor_11 = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    suma_factor_12 = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    suma_factor_13 = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    suma_factor_14 = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    suma_factor_15 = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    suma_factor_16 = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    suma_factor_17 = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    suma_factor_18 = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    suma_factor_19 = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+
+    def __str__(self):
+        return f"{self.corredor_id} {self.tipo_mercado or '-'} {self.periodo_comercial}"
+
+    class Meta:
+        verbose_name = "Resumen por Periodo"
+        verbose_name_plural = "Resúmenes por Periodo"
+        ordering = ['corredor', '-periodo_comercial', 'tipo_mercado']
+        constraints = [
+            models.UniqueConstraint(fields=['corredor', 'tipo_mercado', 'periodo_comercial'], name='resumen_corr_merc_per_uniq'),
+        ]
+
+
+# --- COLA DE CARGAS MASIVAS (procesadas en segundo plano por `manage.py procesar_cargas`) ---
+class TrabajoCarga(models.Model):
+    TIPO_CHOICES = [
+        ('FAC', 'Carga Factores'),
+        ('MON', 'Carga Montos'),
+    ]
+    ESTADO_CHOICES = [
+        ('PEN', 'Pendiente'),
+        ('PRO', 'En Proceso'),
+        ('OK', 'Completado'),
+        ('ERR', 'Con Error'),
+        ('REV', 'Revertido'),
+    ]
+
+    corredor = models.ForeignKey(Corredor, on_delete=models.CASCADE, verbose_name="Corredor")
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Usuario")
+    tipo = models.CharField(max_length=3, choices=TIPO_CHOICES, verbose_name="Tipo de Carga")
+    archivo = models.FileField(upload_to='cargas/%Y/%m/', verbose_name="Archivo")
+    nombre_archivo = models.CharField(max_length=255, verbose_name="Nombre del Archivo")
+    estado = models.CharField(max_length=3, choices=ESTADO_CHOICES, default='PEN', verbose_name="Estado")
+
+    # --- PROGRESO (se actualiza en la misma transacción que cada bloque) ---
+    tamano_bloque = models.PositiveIntegerField(default=5000, verbose_name="Filas por Bloque")
+    bloques_confirmados = models.PositiveIntegerField(default=0, verbose_name="Bloques Confirmados")
+    filas_procesadas = models.PositiveIntegerField(default=0, verbose_name="Filas Procesadas")
+    creados = models.PositiveIntegerField(default=0, verbose_name="Registros Creados")
+    actualizados = models.PositiveIntegerField(default=0, verbose_name="Registros Actualizados")
+    sin_cambios = models.PositiveIntegerField(default=0, verbose_name="Registros sin Cambios")
+    errores = models.TextField(blank=True, default='', verbose_name="Errores")
+    revertidos = models.PositiveIntegerField(default=0, verbose_name="Registros Revertidos")
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
+    fecha_inicio = models.DateTimeField(null=True, blank=True, verbose_name="Inicio del Proceso")
+    fecha_fin = models.DateTimeField(null=True, blank=True, verbose_name="Fin del Proceso")
+    # Lo renueva el worker al tomar el trabajo y en cada bloque confirmado (ver reanudar_trabajo)
+    latido = models.DateTimeField(null=True, blank=True, verbose_name="Último Latido")
+    fecha_reversion = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de Reversión")
+
+    def __str__(self):
+        return f"Carga {self.get_tipo_display()} #{self.pk} ({self.get_estado_display()})"
+
+    class Meta:
+        verbose_name = "Trabajo de Carga"
+        verbose_name_plural = "Trabajos de Carga"
+        ordering = ['-fecha_creacion']
+
+
+# --- REGISTRO DE AUDITORÍA (solo inserción; una entrada por acción o por carga masiva) ---
+class RegistroAuditoriaQuerySet(models.QuerySet):
+    # Las operaciones masivas no pasan por save() ni delete() del modelo: también se bloquean.
+    # El SET_NULL al eliminar un corredor usa el manager base y no pasa por aquí
+    def update(self, **kwargs):
+        raise ValueError('Los registros de auditoría no se pueden modificar.')
+
+    def delete(self):
+        raise ValueError('Los registros de auditoría no se pueden eliminar.')
+
+
+class RegistroAuditoria(models.Model):
+    ACCION_CHOICES = [
+        ('CRE', 'Creación'),
+        ('MOD', 'Modificación'),
+        ('FAC', 'Modificación de Factores'),
+        ('ELI', 'Eliminación'),
+        ('CAR', 'Carga Masiva'),
+        ('REV', 'Reversión de Carga'),
+    ]
+
+    # Eliminar un corredor no borra su registro: la FK queda nula y el código copiado lo identifica
+    corredor = models.ForeignKey(Corredor, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Corredor")
+    corredor_codigo = models.CharField(max_length=10, blank=True, verbose_name="Código de Corredor")
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Usuario")
+    # Copia del nombre: el registro no debe cambiar si el usuario se renombra o elimina
+    usuario_nombre = models.CharField(max_length=150, blank=True, verbose_name="Nombre de Usuario")
+    fecha_accion = models.DateTimeField(default=timezone.now, verbose_name="Fecha y Hora")
+    accion = models.CharField(max_length=3, choices=ACCION_CHOICES, verbose_name="Acción")
+    # Sin FK: la entrada se conserva aunque la calificación se elimine
+    calificacion_id = models.BigIntegerField(null=True, blank=True, verbose_name="ID Calificación")
+    objeto = models.CharField(max_length=200, blank=True, verbose_name="Elemento Afectado")
+    cantidad = models.PositiveIntegerField(default=1, verbose_name="Registros Afectados")
+    detalle = models.TextField(blank=True, verbose_name="Detalle")
+
+    objects = RegistroAuditoriaQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Los registros de auditoría no se pueden modificar.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Los registros de auditoría no se pueden eliminar.')
+
+    def __str__(self):
+        return f"{self.get_accion_display()} {self.objeto} ({self.fecha_accion:%d-%m-%Y %H:%M})"
+
+    class Meta:
+        verbose_name = "Registro de Auditoría"
+        verbose_name_plural = "Registros de Auditoría"
+        ordering = ['-fecha_accion', '-id']
+        # La vista siempre filtra por corredor y pagina por (-fecha_accion, -id)
+        indexes = [
+            models.Index(fields=['corredor', '-fecha_accion', '-id'], name='audit_corr_fecha_idx'),
+        ]
+
+
+# --- HISTORIAL DE CAMBIOS POR CAMPO (solo los campos que cambian, con su valor anterior) ---
+class HistorialCalificacion(models.Model):
+    ACCION_CHOICES = [
+        ('CRE', 'Creación'),
+        ('MOD', 'Modificación'),
+        ('ELI', 'Eliminación'),
+    ]
+    ORIGEN_CHOICES = [
+        ('MAN', 'Ingreso Manual'),
+        ('CAR', 'Carga Masiva'),
+        ('ADM', 'Administración'),
+        ('REV', 'Reversión de Carga'),
+    ]
+
+    # Sin FK: el historial se conserva aunque la calificación se elimine
+    calificacion_id = models.BigIntegerField(verbose_name="ID Calificación")
+    fecha_cambio = models.DateTimeField(default=timezone.now, verbose_name="Fecha del Cambio")
+    accion = models.CharField(max_length=3, choices=ACCION_CHOICES, verbose_name="Acción")
+    origen = models.CharField(max_length=3, choices=ORIGEN_CHOICES, verbose_name="Origen")
+    # JSON compacto {campo: valor anterior} con los campos modificados; en una eliminación, todos
+    anteriores = models.TextField(blank=True, verbose_name="Valores Anteriores")
+    # Carga masiva que hizo el cambio: sus entradas son la foto de los valores previos a la carga
+    carga = models.ForeignKey(
+        TrabajoCarga, on_delete=models.SET_NULL, null=True, blank=True, db_index=False, related_name='+',
+        verbose_name="Carga"
+    )
+
+    def __str__(self):
+        return f"{self.get_accion_display()} #{self.calificacion_id} ({self.fecha_cambio:%d-%m-%Y %H:%M})"
+
+    class Meta:
+        verbose_name = "Historial de Calificación"
+        verbose_name_plural = "Historial de Calificaciones"
+        ordering = ['-fecha_cambio', '-id']
+        # La reconstrucción lee los cambios de una calificación posteriores a una fecha
+        indexes = [
+            models.Index(fields=['calificacion_id', '-fecha_cambio', '-id'], name='hist_calif_fecha_idx'),
+            # La reversión de una carga lee sus entradas por bloques de calificaciones
+            models.Index(fields=['carga', 'calificacion_id'], name='hist_carga_calif_idx'),
+        ]
@@ -0,0 +1,236 @@
+# calificaciones/reporte_pdf.py
+# Reporte PDF escrito página a página en disco, con caché de reportes ya generados
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .exportacion import TAMANO_LECTURA
+
+# Se incluye en la clave de caché: cambiarlo invalida los PDF generados con un formato anterior
+VERSION_FORMATO = 1
+
+# A4 apaisado, en puntos
+ANCHO_PAGINA, ALTO_PAGINA = 842, 595
+MARGEN = 28
+TAMANO_LETRA = 6
+ALTO_LINEA = 8
+
+# Ancho (en milésimas del tamaño de letra) de los caracteres de Helvetica que aparecen en los números
+_ANCHOS_NUMERO = {**{d: 556 for d in '0123456789'}, '.': 278, ',': 278, '-': 333, ' ': 278}
+_ANCHO_PROMEDIO = 500
+
+
+def _texto_pdf(texto):
+    # WinAnsiEncoding cubre los acentos y la ñ; se escapan los caracteres especiales de los strings PDF
+    datos = texto.encode('cp1252', errors='replace')
+    return datos.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def _formatear(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'Sí' if valor else 'No'
+    if isinstance(valor, datetime):
+        if timezone.is_aware(valor):
+            valor = timezone.localtime(valor)
+        return valor.strftime('%d-%m-%Y %H:%M')
+    if isinstance(valor, date):
+        return valor.strftime('%d-%m-%Y')
+    return str(valor)
+
+
+def _recortar(texto, ancho):
+    maximo = int(ancho * 1000 / (_ANCHO_PROMEDIO * TAMANO_LETRA))
+    return texto if len(texto) <= maximo else texto[:max(maximo - 1, 1)] + '.'
+
+
+def _ancho_numero(texto):
+    return sum(_ANCHOS_NUMERO.get(c, _ANCHO_PROMEDIO) for c in texto) * TAMANO_LETRA / 1000
+
+
+class _EscritorPDF:
+    """
+    Escribe los objetos del PDF a medida que se generan y guarda solo sus posiciones
+    para la tabla xref. El objeto 2 (árbol de páginas) se reserva y se escribe al final.
+    """
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.posiciones = {}
+        self.paginas = []
+        self.siguiente = 4
+        self.archivo.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._objeto(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        self._objeto(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+
+    def _objeto(self, numero, cuerpo):
+        self.posiciones[numero] = self.archivo.tell()
+        self.archivo.write(b'%d 0 obj\n' % numero + cuerpo + b'\nendobj\n')
+
+    def _nuevo_numero(self):
+        numero = self.siguiente
+        self.siguiente += 1
+        return numero
+
+    def agregar_pagina(self, contenido):
+        datos = zlib.compress(contenido)
+        n_contenido = self._nuevo_numero()
+        self._objeto(n_contenido, b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(datos) + datos + b'\nendstream')
+        n_pagina = self._nuevo_numero()
+        self._objeto(n_pagina, (
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>'
+        ) % (ANCHO_PAGINA, ALTO_PAGINA, n_contenido))
+        self.paginas.append(n_pagina)
+
+    def cerrar(self):
+        hijos = b' '.join(b'%d 0 R' % n for n in self.paginas)
+        self._objeto(2, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (hijos, len(self.paginas)))
+        inicio_xref = self.archivo.tell()
+        self.archivo.write(b'xref\n0 %d\n0000000000 65535 f \n' % self.siguiente)
+        for numero in range(1, self.siguiente):
+            self.archivo.write(b'%010d 00000 n \n' % self.posiciones[numero])
+        self.archivo.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (self.siguiente, inicio_xref))
+
+
+class _Pagina:
+    def __init__(self):
+        self.comandos = []
+
+    def texto(self, x, y, texto, destacado=False):
+        if texto:
+            self.comandos.append(b'BT /F1 %d Tf %.2f %.2f Td (%s) Tj ET' % (
+                TAMANO_LETRA + (1 if destacado else 0), x, y, _texto_pdf(texto)))
+
+    def linea(self, y):
+        self.comandos.append(b'%.2f %.2f m %.2f %.2f l S' % (MARGEN, y, ANCHO_PAGINA - MARGEN, y))
+
+    def contenido(self):
+        return b'0.3 w\n' + b'\n'.join(self.comandos)
+
+
+def escribir_pdf(archivo, titulo, encabezados, filas, fijas, por_linea):
+    """
+    Escribe en `archivo` (binario) una tabla PDF. Las primeras `fijas` columnas van en la
+    primera línea de cada registro y el resto en líneas de `por_linea` columnas bajo ellas.
+    Cada página se escribe apenas se completa, así la memoria no depende del número de filas.
+    Devuelve el número de páginas.
+    """
+    ancho_util = ANCHO_PAGINA - 2 * MARGEN
+    ancho_fijas = ancho_util * 0.3
+    ancho_fija = ancho_fijas / fijas
+    ancho_variable = (ancho_util - ancho_fijas) / por_linea
+    lineas_registro = max(1, -(-(len(encabezados) - fijas) // por_linea))
+
+    def posiciones(cantidad):
+        # (x, ancho, línea) de cada columna dentro de un registro
+        resultado = []
+        for i in range(cantidad):
+            if i < fijas:
+                resultado.append((MARGEN + i * ancho_fija, ancho_fija, 0))
+            else:
+                j = i - fijas
+                resultado.append((MARGEN + ancho_fijas + (j % por_linea) * ancho_variable, ancho_variable, j // por_linea))
+        return resultado
+
+    columnas = posiciones(len(encabezados))
+    escritor = _EscritorPDF(archivo)
+    numero_pagina = 0
+
+    def nueva_pagina():
+        nonlocal numero_pagina
+        numero_pagina += 1
+        pagina = _Pagina()
+        y = ALTO_PAGINA - MARGEN
+        pagina.texto(MARGEN, y, titulo, destacado=True)
+        pagina.texto(ANCHO_PAGINA - MARGEN - 40, y, f'Página {numero_pagina}')
+        y -= ALTO_LINEA * 2
+        for (x, ancho, linea), encabezado in zip(columnas, encabezados):
+            pagina.texto(x, y - linea * ALTO_LINEA, _recortar(encabezado, ancho - 2))
+        y -= lineas_registro * ALTO_LINEA
+        pagina.linea(y + ALTO_LINEA - 2)
+        return pagina, y
+
+    pagina, y = nueva_pagina()
+    for valores in filas:
+        if y - lineas_registro * ALTO_LINEA < MARGEN:
+            escritor.agregar_pagina(pagina.contenido())
+            pagina, y = nueva_pagina()
+        for (x, ancho, linea), valor in zip(columnas, valores):
+            texto = _formatear(valor)
+            if isinstance(valor, (int, float, Decimal)) and not isinstance(valor, bool):
+                # Números alineados a la derecha de su columna
+                pagina.texto(x + ancho - 2 - _ancho_numero(texto), y - linea * ALTO_LINEA, texto)
+            else:
+                pagina.texto(x, y - linea * ALTO_LINEA, _recortar(texto, ancho - 2))
+        y -= lineas_registro * ALTO_LINEA + 2
+    escritor.agregar_pagina(pagina.contenido())
+    escritor.cerrar()
+    return numero_pagina
+
+
+# --- Caché en disco ---
+def _directorio_cache():
+    directorio = Path(settings.REPORTES_CACHE_DIR)
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def _resumen(datos):
+    return hashlib.sha256(json.dumps(datos, sort_keys=True, default=str).encode()).hexdigest()[:24]
+
+
+def _generar(ruta, calificaciones, titulo, encabezados, campos, fijas, por_linea):
+    # Se escribe en un temporal del mismo directorio y se renombra: nunca se sirve un PDF a medias
+    descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as archivo:
+            filas = calificaciones.values_list(*campos).iterator(chunk_size=TAMANO_LECTURA)
+            escribir_pdf(archivo, titulo, encabezados, filas, fijas, por_linea)
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+
+
+def _limpiar(prefijo, ruta):
+    # Las versiones anteriores del mismo reporte ya no sirven. Una que otro request tenga abierta se
+    # sigue leyendo aunque se borre; donde el sistema no permite borrarla, queda para la próxima vez
+    for anterior in ruta.parent.glob(f'{prefijo}_*.pdf'):
+        if anterior != ruta:
+            try:
+                anterior.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+
+def reporte_pdf(corredor, calificaciones, filtros, titulo, encabezados, campos, fijas, por_linea):
+    """
+    PDF del reporte abierto para lectura, generándolo solo si no está en caché. La clave combina
+    corredor, filtros, todo lo que se dibuja aparte de las filas (título, con el nombre del
+    corredor, y columnas) y el estado de los datos: la última fecha_modificacion y la cantidad
+    de filas (esta última detecta eliminaciones, que no cambian la fecha máxima).
+    """
+    estado = calificaciones.aggregate(ultima=Max('fecha_modificacion'), total=Count('id'))
+    prefijo = f'{corredor.pk}_{_resumen(filtros)}'
+    contenido = [VERSION_FORMATO, titulo, encabezados, campos, fijas, por_linea, estado]
+    ruta = _directorio_cache() / f'{prefijo}_{_resumen(contenido)}.pdf'
+
+    # Se abre sin comprobar antes si existe: la limpieza de otro request puede borrarlo en cualquier
+    # momento, y entonces se vuelve a generar
+    for _ in range(2):
+        try:
+            return open(ruta, 'rb')
+        except FileNotFoundError:
+            _generar(ruta, calificaciones, titulo, encabezados, campos, fijas, por_linea)
+            _limpiar(prefijo, ruta)
+    return open(ruta, 'rb')
@@ -0,0 +1,140 @@
+# calificaciones/resumenes.py
+# Resumen precalculado por (corredor, tipo de mercado, año comercial). Cada escritura de
+# calificaciones suma el aporte de los valores nuevos y resta el de los anteriores; las
+# consultas analíticas leen solo esta tabla y nunca recorren las calificaciones
+from decimal import ROUND_HALF_EVEN, Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractYear
+
+from .calculos import COLUMNAS_FACTOR
+from .models import CalificacionTributaria, ResumenPeriodo
+
+# Factores que forman la distribución (los que deben sumar a lo más 1)
+FACTORES_RESUMEN = COLUMNAS_FACTOR[:12]
+COLUMNAS_SUMA = ['valor_historico', *FACTORES_RESUMEN]
+SUMAS = [f'suma_{columna}' for columna in COLUMNAS_SUMA]
+CLAVE = ['tipo_mercado', 'periodo_comercial']
+# Valores de una calificación que necesita ajustar_resumen
+CAMPOS_APORTE = ['corredor_id', 'tipo_mercado', 'fecha', *COLUMNAS_SUMA]
+
+# Escala de cada columna: el aporte es el valor tal como queda guardado
+_ESCALAS = {
+    columna: Decimal(1).scaleb(-CalificacionTributaria._meta.get_field(columna).decimal_places)
+    for columna in COLUMNAS_SUMA
+}
+_CERO = Decimal('0')
+
+
+def _aporte(valores):
+    clave = (valores['corredor_id'], valores['tipo_mercado'], valores['fecha'].year)
+    sumas = [Decimal(valores[columna] or 0).quantize(_ESCALAS[columna], rounding=ROUND_HALF_EVEN) for columna in COLUMNAS_SUMA]
+    return clave, sumas
+
+
+def _aplicar_delta(clave, cantidad, sumas):
+    corredor_id, tipo_mercado, periodo = clave
+    fila = ResumenPeriodo.objects.filter(corredor_id=corredor_id, tipo_mercado=tipo_mercado, periodo_comercial=periodo)
+    # UPDATE ... SET x = x + delta: dos escrituras concurrentes sobre la misma fila no se pisan
+    cambios = {'cantidad': F('cantidad') + cantidad, **{campo: F(campo) + valor for campo, valor in zip(SUMAS, sumas)}}
+    if fila.update(**cambios):
+        return
+    try:
+        with transaction.atomic():
+            ResumenPeriodo.objects.create(
+                corredor_id=corredor_id, tipo_mercado=tipo_mercado, periodo_comercial=periodo,
+                cantidad=cantidad, **dict(zip(SUMAS, sumas)),
+            )
+    except IntegrityError:
+        # Otra escritura creó la fila entre el UPDATE y el INSERT
+        fila.update(**cambios)
+
+
+def ajustar_resumen(anteriores=(), nuevos=()):
+    """
+    Resta el aporte de `anteriores` y suma el de `nuevos` (diccionarios con corredor_id,
+    tipo_mercado, fecha, valor_historico y los factores, como valores_calificacion). Hace un
+    UPDATE por cada grupo cuyo resumen cambia. Conviene llamarla en la misma transacción que la
+    escritura; reconstruir_resumen repara cualquier diferencia.
+    """
+    deltas = {}
+    for signo, filas in ((-1, anteriores), (1, nuevos)):
+        for valores in filas:
+            clave, sumas = _aporte(valores)
+            delta = deltas.setdefault(clave, [0, [_CERO] * len(SUMAS)])
+            delta[0] += signo
+            delta[1] = [acumulado + signo * valor for acumulado, valor in zip(delta[1], sumas)]
+    for clave, (cantidad, sumas) in deltas.items():
+        # Una modificación que no toca la clave ni los montos no escribe nada
+        if cantidad or any(sumas):
+            _aplicar_delta(clave, cantidad, sumas)
+
+
+def reconstruir_resumen(corredor=None):
+    """
+    Recalcula el resumen desde las calificaciones (todas o las de `corredor`) con un GROUP BY.
+    Se usa al crear la tabla o para reparar diferencias; devuelve la cantidad de grupos.
+    """
+    calificaciones = CalificacionTributaria.objects.all()
+    resumenes = ResumenPeriodo.objects.all()
+    if corredor is not None:
+        calificaciones = calificaciones.filter(corredor=corredor)
+        resumenes = resumenes.filter(corredor=corredor)
+    grupos = (
+        calificaciones.order_by()
+        .values('corredor_id', 'tipo_mercado', periodo=ExtractYear('fecha'))
+        .annotate(total=Count('id'), **{f'_{campo}': Sum(columna) for campo, columna in zip(SUMAS, COLUMNAS_SUMA)})
+    )
+    filas = [
+        ResumenPeriodo(
+            corredor_id=grupo['corredor_id'], tipo_mercado=grupo['tipo_mercado'], periodo_comercial=grupo['periodo'],
+            cantidad=grupo['total'], **{campo: grupo[f'_{campo}'] or _CERO for campo in SUMAS},
+        )
+        for grupo in grupos
+    ]
+    with transaction.atomic():
+        resumenes.delete()
+        ResumenPeriodo.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
+
+
+def _promedio(suma, cantidad, escala):
+    return str((suma / cantidad).quantize(escala, rounding=ROUND_HALF_EVEN)) if cantidad else None
+
+
+def consultar_resumen(corredor, tipo_mercado=None, periodo_comercial=None, agrupar=CLAVE):
+    """
+    Totales del corredor agrupados por `agrupar` (subconjunto de CLAVE; vacío = un solo total):
+    cantidad de calificaciones, total y promedio de valor_historico y la mezcla promedio de
+    factor_8..factor_19. Lee solo la tabla de resúmenes.
+    """
+    resumenes = ResumenPeriodo.objects.filter(corredor=corredor, cantidad__gt=0)
+    if tipo_mercado:
+        resumenes = resumenes.filter(tipo_mercado=tipo_mercado)
+    if periodo_comercial:
+        resumenes = resumenes.filter(periodo_comercial=periodo_comercial)
+    agrupar = [campo for campo in CLAVE if campo in agrupar]
+    orden = ['-periodo_comercial' if campo == 'periodo_comercial' else campo for campo in agrupar]
+    totales = {'total': Sum('cantidad'), **{f'_{campo}': Sum(campo) for campo in SUMAS}}
+    if agrupar:
+        grupos = resumenes.order_by(*orden).values(*agrupar).annotate(**totales)
+    else:
+        grupos = [resumenes.aggregate(**totales)]
+    resultado = []
+    for grupo in grupos:
+        cantidad = grupo['total'] or 0
+        if not cantidad:
+            continue
+        suma_valor = (grupo['_suma_valor_historico'] or _CERO).quantize(_ESCALAS['valor_historico'], rounding=ROUND_HALF_EVEN)
+        resultado.append({
+            **{campo: grupo[campo] for campo in agrupar},
+            'cantidad': cantidad,
+            'total_valor_historico': str(suma_valor),
+            'promedio_valor_historico': _promedio(suma_valor, cantidad, _ESCALAS['valor_historico']),
+            'promedio_factores': {
+                columna: _promedio(grupo[f'_suma_{columna}'] or _CERO, cantidad, _ESCALAS[columna])
+                for columna in FACTORES_RESUMEN
+            },
+        })
+    return resultado
@@ -0,0 +1,117 @@
+# calificaciones/reversion.py
+# Reversión de una carga masiva completa: las filas que la carga dejó marcadas (ultima_carga)
+# vuelven a los valores que su historial guardó antes de escribirlas, con SQL por bloques de ids
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Subquery
+from django.utils import timezone
+
+from .acciones_masivas import bloques_ids
+from .auditoria import registrar
+from .cache_corredor import invalidar_corredor
+from .carga_masiva import actualizar_en_lote
+from .historial import (
+    CAMPOS_HISTORIAL, desde_json, diferencias, entrada_historial, guardar_historial, registrar_eliminacion,
+    valores_calificacion,
+)
+from .models import CalificacionTributaria, HistorialCalificacion, TrabajoCarga
+from .resumenes import ajustar_resumen
+from .trabajos import eliminar_archivo
+
+ESTADOS_REVERSIBLES = ('OK', 'ERR')
+
+
+def _vigentes(trabajo):
+    # Filas marcadas por la carga que nadie más tocó después de que la carga las escribiera (no desde
+    # que se subió el archivo: otra carga en cola antes que esta pudo escribirlas en ese intervalo);
+    # no cuentan los cambios de cargas ya revertidas ni los de las propias reversiones
+    escrita = (
+        HistorialCalificacion.objects.filter(calificacion_id=OuterRef(OuterRef('pk')), carga=trabajo)
+        .order_by('-fecha_cambio').values('fecha_cambio')[:1]
+    )
+    posteriores = (
+        HistorialCalificacion.objects.filter(calificacion_id=OuterRef('pk'), fecha_cambio__gt=Subquery(escrita))
+        .exclude(carga=trabajo).exclude(carga__estado='REV').exclude(origen='REV')
+    )
+    return CalificacionTributaria.objects.filter(ultima_carga=trabajo).exclude(Exists(posteriores))
+
+
+def _revertir_bloque(trabajo, ids, ahora):
+    # Bloquea las filas y después vuelve a comprobar que siguen vigentes (en otra consulta, que ve lo
+    # confirmado mientras se esperaba el bloqueo): una edición o carga confirmada después de elegir
+    # el bloque queda como conflicto en vez de pisarse
+    list(CalificacionTributaria.objects.select_for_update().filter(pk__in=ids).values_list('id', flat=True))
+    ids = list(_vigentes(trabajo).filter(pk__in=ids).values_list('id', flat=True))
+
+    # Valores previos a la carga: si escribió la fila más de una vez, los de la primera escritura
+    anteriores, creadas = {}, set()
+    for calificacion_id, accion, texto in (
+        HistorialCalificacion.objects.filter(carga=trabajo, calificacion_id__in=ids)
+        .order_by('fecha_cambio', 'id').values_list('calificacion_id', 'accion', 'anteriores')
+    ):
+        if accion == 'CRE':
+            creadas.add(calificacion_id)
+        else:
+            anteriores[calificacion_id] = {**desde_json(texto), **anteriores.get(calificacion_id, {})}
+
+    a_eliminar = [pk for pk in ids if pk in creadas]
+    eliminadas = [
+        (fila[0], dict(zip(CAMPOS_HISTORIAL, fila[1:])))
+        for fila in CalificacionTributaria.objects.filter(pk__in=a_eliminar).values_list('id', *CAMPOS_HISTORIAL)
+    ]
+    CalificacionTributaria.objects.filter(pk__in=a_eliminar).delete()
+    registrar_eliminacion(eliminadas, 'REV')
+
+    a_restaurar = [pk for pk in ids if pk not in creadas and pk in anteriores]
+    restauradas = list(CalificacionTributaria.objects.filter(pk__in=a_restaurar))
+    antes, despues, historial = [valores for _, valores in eliminadas], [], []
+    for calificacion in restauradas:
+        valores = valores_calificacion(calificacion)
+        for nombre, valor in anteriores[calificacion.pk].items():
+            setattr(calificacion, nombre, valor)
+        calificacion.calcular_derivados()
+        calificacion.fecha_modificacion = ahora
+        nuevos = valores_calificacion(calificacion)
+        historial.append(entrada_historial(calificacion.pk, 'MOD', 'REV', diferencias(valores, nuevos), ahora))
+        antes.append(valores)
+        despues.append(nuevos)
+    actualizar_en_lote(restauradas)
+    guardar_historial(historial)
+    ajustar_resumen(antes, despues)
+    return len(restauradas), len(eliminadas)
+
+
+def revertir_carga(trabajo, usuario):
+    """
+    Deshace la carga `trabajo` en una sola transacción: elimina las calificaciones que creó y
+    devuelve las que modificó a sus valores anteriores (un DELETE y un UPDATE en lote por bloque).
+    Las filas que otro origen cambió después de la carga no se tocan y se informan como conflictos.
+    Lanza ValueError si la carga no terminó o ya fue revertida.
+    Devuelve {'restauradas', 'eliminadas', 'conflictos'}.
+    """
+    with transaction.atomic():
+        # Bloquea el trabajo: dos reversiones simultáneas no deshacen dos veces la misma carga
+        trabajo = TrabajoCarga.objects.select_for_update().get(pk=trabajo.pk)
+        if trabajo.estado not in ESTADOS_REVERSIBLES:
+            raise ValueError(f'La carga #{trabajo.pk} no se puede revertir ({trabajo.get_estado_display()}).')
+        ahora = timezone.now()
+        restauradas = eliminadas = 0
+        for ids in bloques_ids(_vigentes(trabajo)):
+            r, e = _revertir_bloque(trabajo, ids, ahora)
+            restauradas += r
+            eliminadas += e
+        tocadas = HistorialCalificacion.objects.filter(carga=trabajo).values('calificacion_id').distinct().count()
+        conflictos = tocadas - restauradas - eliminadas
+        invalidar_corredor(trabajo.corredor)
+        TrabajoCarga.objects.filter(pk=trabajo.pk).update(
+            estado='REV', revertidos=restauradas + eliminadas, fecha_reversion=ahora,
+        )
+        registrar(
+            trabajo.corredor, usuario, 'REV',
+            objeto=f'Trabajo #{trabajo.pk} {trabajo.nombre_archivo}',
+            detalle=(f'{restauradas} restauradas, {eliminadas} eliminadas, '
+                     f'{conflictos} con cambios posteriores (no se revirtieron).'),
+            cantidad=restauradas + eliminadas,
+        )
+        # Una carga revertida no se reanuda (si tenía error, su archivo seguía guardado)
+        transaction.on_commit(lambda: eliminar_archivo(trabajo))
+    return {'restauradas': restauradas, 'eliminadas': eliminadas, 'conflictos': conflictos}
@@ -0,0 +1,66 @@
+# calificaciones/serializacion.py
+# Serialización a JSON de calificaciones leídas con values_list: el formato de cada columna se
+# resuelve una sola vez y cada fila solo aplica las conversiones ya elegidas
+from datetime import date, datetime
+
+from django.db import models
+
+from .models import CalificacionTributaria
+
+
+def campo_de_ruta(ruta, modelo=CalificacionTributaria):
+    """
+    Campo del modelo para una ruta de values_list ('fecha', 'corredor_id', 'corredor__codigo_corredor').
+    """
+    opts = modelo._meta
+    if '__' in ruta:
+        relacion, resto = ruta.split('__', 1)
+        return campo_de_ruta(resto, opts.get_field(relacion).related_model)
+    for campo in opts.concrete_fields:
+        if ruta in (campo.name, campo.attname):
+            return campo
+    return opts.get_field(ruta)
+
+
+def _conversion(campo):
+    if isinstance(campo, models.DecimalField):
+        # Igual que DjangoJSONEncoder; str() de un Decimal es varias veces más rápido que format()
+        return str
+    if isinstance(campo, models.DateTimeField):
+        return datetime.isoformat
+    if isinstance(campo, models.DateField):
+        return date.isoformat
+    # Enteros, textos y booleanos van tal cual a JSON
+    return None
+
+
+class Serializador:
+    """
+    Convierte filas de values_list(*columnas) en diccionarios {nombre: valor} que JSON serializa
+    sin encoder propio (decimales como texto, fechas ISO 8601).
+    `columnas`: pares (nombre en la salida, ruta de values_list).
+    """
+    def __init__(self, columnas):
+        self.nombres = [nombre for nombre, _ in columnas]
+        self.columnas = [ruta for _, ruta in columnas]
+        self._conversiones = [
+            (i, conversion) for i, conversion in enumerate(_conversion(campo_de_ruta(ruta)) for ruta in self.columnas)
+            if conversion is not None
+        ]
+
+    def fila(self, valores):
+        valores = list(valores)
+        for i, convertir in self._conversiones:
+            valor = valores[i]
+            if valor is not None:
+                valores[i] = convertir(valor)
+        return dict(zip(self.nombres, valores))
+
+    def filas(self, filas):
+        return map(self.fila, filas)
+
+
+# Mismos campos y nombres que model_to_dict (los editables; la FK va como id)
+SERIALIZADOR_CALIFICACION = Serializador([
+    (campo.name, campo.attname) for campo in CalificacionTributaria._meta.concrete_fields if campo.editable
+])
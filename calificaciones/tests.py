@@ -1,3 +1,1267 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+import warnings
+import zipfile
+from datetime import date, timedelta
+from decimal import ROUND_HALF_EVEN, Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+
+try:
+    import openpyxl
+except ImportError:  # Solo para leer los XLSX generados en las pruebas
+    openpyxl = None
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth.models import User
+from django.forms.models import model_to_dict
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.management import CommandError, call_command
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .admin import CalificacionTributariaAdmin
+from .auditoria import pagina_auditoria, registrar
+from .cache_corredor import clave_corredor, invalidar_corredor, obtener_o_calcular
+from .calculos import COLUMNAS_BASE, COLUMNAS_FACTOR, ESCALA_FACTOR, calcular_factores, escalar_decimal, escalar_matriz
+from .carga_masiva import cargar_archivo, registros_factores, upsert_calificaciones
+from .carga_paralela import cargar_archivo_paralelo
+from .consultas import codificar_cursor, pagina_keyset
+from .contenido import hash_valores
+from .empaquetado import matriz_factores, texto_factor
+from .exportacion import leer_marca, marca_exportacion, pa
+from .historial import calificacion_en_fecha, cambios_calificacion, registrar_modificacion, valores_calificacion
+from .models import CalificacionTributaria, Corredor, HistorialCalificacion, RegistroAuditoria, ResumenPeriodo, TrabajoCarga
+from . import reporte_pdf
+from .resumenes import SUMAS, consultar_resumen, reconstruir_resumen
+from .reversion import revertir_carga
+from .serializacion import SERIALIZADOR_CALIFICACION, Serializador
+from .trabajos import encolar_carga, limpiar_archivos, procesar_trabajo, reanudar_trabajo, tomar_siguiente
+from .validacion import validar_archivo
+from . import busqueda, lotes, urls, views
+
+ENCABEZADO_MONTOS = 'instrumento;fecha;secuencia;numero_dividendo;tipo_sociedad;valor_historico;' + ';'.join(
+    f'monto_{i}' for i in range(8, 38)
+)
+ENCABEZADO_FACTORES = 'instrumento;fecha;secuencia;numero_dividendo;tipo_sociedad;valor_historico;' + ';'.join(
+    f'factor_{i}' for i in range(8, 38)
+)
+
+
+def _fila_montos(instrumento, fecha, valor='100,5', base='1,5'):
+    return f'{instrumento};{fecha};10001;1;A;{valor};' + ';'.join([base] * 12 + ['2'] * 18)
+
+
+def _fila_factores(instrumento, fecha, valor='100,5', factor='0,01'):
+    return f'{instrumento};{fecha};10001;1;A;{valor};' + ';'.join([factor] * 30)
+
+
+def _archivo(filas, encabezado=ENCABEZADO_MONTOS):
+    return io.BytesIO('\n'.join([encabezado, *filas]).encode())
+
+
+class BaseCalificacionesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('corredor', password='clave')
+        cls.corredor = Corredor.objects.create(nombre='Corredor Prueba', codigo_corredor='PRB', usuario=cls.usuario)
+
+    def setUp(self):
+        # Las cachés sobreviven entre pruebas y los ids de corredor se repiten al deshacer cada una
+        for cache in caches.all():
+            cache.clear()
+        busqueda._indices.clear()
+
+    def cargar(self, filas, trabajo=None, tamano_bloque=5000, tipo='MON'):
+        encabezado = ENCABEZADO_MONTOS if tipo == 'MON' else ENCABEZADO_FACTORES
+        return cargar_archivo(self.corredor, _archivo(filas, encabezado), tipo, tamano_bloque=tamano_bloque,
+                              carga_id=trabajo.pk if trabajo else None)
+
+    def calificacion(self, instrumento):
+        return CalificacionTributaria.objects.get(corredor=self.corredor, instrumento=instrumento)
+
+    def crear(self, instrumento, fecha=date(2024, 1, 10), corredor=None, **campos):
+        campos = {'secuencia': 10001, 'numero_dividendo': 1, 'tipo_sociedad': 'A', 'valor_historico': Decimal('1'), **campos}
+        return CalificacionTributaria.objects.create(
+            corredor=corredor or self.corredor, instrumento=instrumento, fecha=fecha, **campos,
+        )
+
+    def entrar(self):
+        self.client.force_login(self.usuario)
+
+    def nuevo_trabajo(self, tipo='MON', estado='OK'):
+        return TrabajoCarga.objects.create(corredor=self.corredor, usuario=self.usuario, tipo=tipo,
+                                           nombre_archivo='prueba.csv', estado=estado)
+
+    def foto(self):
+        return {
+            (c.instrumento, c.fecha): {k: v for k, v in valores_calificacion(c).items() if k != 'ultima_carga_id'}
+            for c in CalificacionTributaria.objects.filter(corredor=self.corredor)
+        }
+
+    def editar(self, instrumento, **campos):
+        # Edición manual con su historial, como la hacen las vistas
+        calificacion = self.calificacion(instrumento)
+        antes = valores_calificacion(calificacion)
+        for nombre, valor in campos.items():
+            setattr(calificacion, nombre, valor)
+        calificacion.save()
+        registrar_modificacion(calificacion, antes, 'MAN')
+        return calificacion
+
+
+# --- Carga masiva (upsert por bloques) ---
+class CargaMasivaTest(BaseCalificacionesTest):
+
+    def test_crea_y_actualiza_por_bloques(self):
+        filas = [_fila_montos(f'INS{i}', f'2024-0{1 + i % 3}-10') for i in range(6)]
+        filas.append(_fila_montos('INS9', '2023-05-05'))
+        creados, actualizados, sin_cambios, bloques = self.cargar(filas, tamano_bloque=3)
+        self.assertEqual((creados, actualizados, sin_cambios), (7, 0, 0))
+        self.assertEqual([b['filas'] for b in bloques], [3, 3, 1])
+
+        cambios = [_fila_montos('INS0', '2024-01-10', valor='7'), _fila_montos('NUEVO', '2024-03-01')]
+        self.assertEqual(self.cargar(cambios)[:3], (1, 1, 0))
+        self.assertEqual(self.calificacion('INS0').valor_historico, Decimal('7'))
+        self.assertEqual(CalificacionTributaria.objects.filter(corredor=self.corredor).count(), 8)
+
+    def test_carga_de_factores(self):
+        self.cargar([_fila_factores('FAC1', '2024-02-01'), _fila_factores('FAC2', '2024-02-01', factor='0,02')],
+                    tipo='FAC')
+        self.assertEqual(self.calificacion('FAC1').factor_8, Decimal('0.01'))
+        self.assertEqual(self.calificacion('FAC2').factor_37, Decimal('0.02'))
+        self.assertEqual(self.calificacion('FAC1').fuente_ingreso, 'FAC')
+
+    def test_clave_repetida_gana_la_ultima_fila(self):
+        # Mismos contadores que update_or_create fila a fila: la primera crea y la segunda actualiza
+        filas = [_fila_montos('INS1', '2024-01-10', valor='1'), _fila_montos('INS1', '2024-01-10', valor='2')]
+        self.assertEqual(self.cargar(filas)[:3], (1, 1, 0))
+        self.assertEqual(self.calificacion('INS1').valor_historico, Decimal('2'))
+
+    def test_upsert_por_bloques_de_registros(self):
+        registros = [
+            ('REG1', '2024-01-01', {'secuencia': 10001, 'numero_dividendo': 1, 'tipo_sociedad': 'A',
+                                    'valor_historico': Decimal('5'), 'fuente_ingreso': 'FAC'}),
+            ('REG2', '2024-01-01', {'secuencia': 10002, 'numero_dividendo': 1, 'tipo_sociedad': 'C',
+                                    'valor_historico': Decimal('6'), 'fuente_ingreso': 'FAC'}),
+        ]
+        self.assertEqual(upsert_calificaciones(self.corredor, registros, tamano_bloque=1), (2, 0, 0))
+        self.assertEqual(upsert_calificaciones(self.corredor, registros[1:], tamano_bloque=1), (0, 1, 0))
+        self.assertEqual(self.calificacion('REG2').tipo_sociedad, 'C')
+
+    def test_otro_corredor_no_se_toca(self):
+        otro = Corredor.objects.create(nombre='Otro Corredor', codigo_corredor='OTR')
+        cargar_archivo(otro, _archivo([_fila_montos('INS1', '2024-01-10', valor='3')]), 'MON')
+        self.cargar([_fila_montos('INS1', '2024-01-10', valor='4')])
+        valores = CalificacionTributaria.objects.filter(instrumento='INS1').order_by('corredor__codigo_corredor')
+        self.assertEqual([c.valor_historico for c in valores], [Decimal('3'), Decimal('4')])
+
+
+# --- Cola de cargas masivas (encolar, procesar, reanudar y limpiar archivos) ---
+class ColaCargasTest(BaseCalificacionesTest):
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=directorio.name, CARGA_PROCESOS=1)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def encolar(self, filas, **opciones):
+        archivo = SimpleUploadedFile('montos.csv', '\n'.join([ENCABEZADO_MONTOS, *filas]).encode())
+        return encolar_carga(self.corredor, self.usuario, 'MON', archivo, **opciones)
+
+    def test_encolar_procesar_y_consultar(self):
+        self.entrar()
+        archivo = SimpleUploadedFile('montos.csv', _archivo([_fila_montos('COLA1', '2024-01-10')]).getvalue())
+        respuesta = self.client.post(reverse('carga_masiva_montos'), {'archivo_csv': archivo}).json()
+        trabajo = TrabajoCarga.objects.get(pk=respuesta['trabajo_id'])
+        self.assertEqual(trabajo.estado, 'PEN')
+
+        self.assertEqual(tomar_siguiente().pk, trabajo.pk)
+        self.assertIsNone(tomar_siguiente())
+        ruta = trabajo.archivo.path
+        trabajo = procesar_trabajo(TrabajoCarga.objects.get(pk=trabajo.pk))
+        self.assertEqual((trabajo.estado, trabajo.creados, trabajo.archivo.name), ('OK', 1, ''))
+        self.assertFalse(os.path.exists(ruta))
+        self.assertEqual(RegistroAuditoria.objects.get(accion='CAR').cantidad, 1)
+        datos = self.client.get(respuesta['url_estado']).json()['data']
+        self.assertTrue(datos['terminado'])
+        self.assertEqual(datos['creados'], 1)
+
+    def test_error_y_reanudacion_desde_el_ultimo_bloque(self):
+        filas = [_fila_montos(f'BLQ{i}', '2024-01-10') for i in range(4)]
+        trabajo = self.encolar(filas[:2] + [_fila_montos('BLQ2', '2024-01-10', valor='abc'), filas[3]], tamano_bloque=2)
+        with self.assertLogs('calificaciones.trabajos', 'ERROR'):
+            trabajo = procesar_trabajo(tomar_siguiente())
+        self.assertEqual((trabajo.estado, trabajo.bloques_confirmados, trabajo.filas_procesadas), ('ERR', 1, 2))
+        self.assertIn('bloque 2', trabajo.errores)
+        self.assertEqual(CalificacionTributaria.objects.count(), 2)
+
+        # El corredor corrige el archivo y reanuda: el primer bloque no se vuelve a procesar
+        with open(trabajo.archivo.path, 'w') as archivo:
+            archivo.write('\n'.join([ENCABEZADO_MONTOS, *filas]))
+        self.entrar()
+        self.assertTrue(self.client.post(reverse('reanudar_carga', args=[trabajo.pk])).json()['success'])
+        self.assertFalse(self.client.post(reverse('reanudar_carga', args=[trabajo.pk])).json()['success'])
+        trabajo = procesar_trabajo(tomar_siguiente())
+        self.assertEqual((trabajo.estado, trabajo.bloques_confirmados, trabajo.creados, trabajo.filas_procesadas), ('OK', 2, 4, 4))
+
+    def test_reanudar_solo_trabajos_abandonados(self):
+        trabajo = self.encolar([_fila_montos('ABN', '2024-01-10')])
+        tomar_siguiente()
+        self.assertFalse(reanudar_trabajo(trabajo))
+        with override_settings(CARGA_LEASE_SEGUNDOS=60):
+            TrabajoCarga.objects.filter(pk=trabajo.pk).update(latido=timezone.now() - timedelta(minutes=2))
+            self.assertTrue(reanudar_trabajo(trabajo))
+        self.assertEqual(tomar_siguiente().pk, trabajo.pk)
+
+    def test_limpiar_archivos_de_errores_antiguos(self):
+        antiguo, reciente = self.encolar([]), self.encolar([])
+        ahora = timezone.now()
+        TrabajoCarga.objects.filter(pk=antiguo.pk).update(estado='ERR', fecha_fin=ahora - timedelta(days=31))
+        TrabajoCarga.objects.filter(pk=reciente.pk).update(estado='ERR', fecha_fin=ahora - timedelta(days=1))
+        self.assertEqual(limpiar_archivos(), 1)
+        self.assertFalse(os.path.exists(antiguo.archivo.path))
+        self.assertTrue(os.path.exists(reciente.archivo.path))
+        self.assertEqual(TrabajoCarga.objects.exclude(archivo='').get().pk, reciente.pk)
+
+
+# --- Validación completa de un archivo sin cargarlo (modo "solo validar") ---
+class ValidacionArchivoTest(BaseCalificacionesTest):
+
+    FILAS = [
+        _fila_montos('VAL1', '2024-01-10'),
+        _fila_montos('VAL2', '10-01-2024'),
+        _fila_montos('', '2024-01-10'),
+        _fila_montos('VAL4', '2024-01-10', valor='abc'),
+        _fila_montos('VAL1', '2024-01-10'),
+    ]
+
+    def test_reporta_cada_fila_entre_bloques(self):
+        reporte = validar_archivo(_archivo(self.FILAS), 'MON', tamano_bloque=2)
+        self.assertFalse(reporte['valido'])
+        self.assertEqual((reporte['filas'], reporte['total_errores']), (5, 3))
+        self.assertEqual([(e['fila'], e['columna']) for e in reporte['errores']],
+                         [(3, 'fecha'), (4, 'instrumento'), (5, 'valor_historico')])
+        self.assertEqual(reporte['errores'][0]['valor'], '10-01-2024')
+        # La clave repetida no es error: la carga conserva la última aparición
+        self.assertIn('filas 2)', reporte['advertencias'][0])
+        self.assertFalse(CalificacionTributaria.objects.exists())
+
+    def test_detalle_acotado_y_resumen_completo(self):
+        filas = [_fila_factores(f'LIM{i}', '2024-01-10', factor='x') for i in range(3)]
+        reporte = validar_archivo(_archivo(filas, ENCABEZADO_FACTORES), 'FAC', max_detalle=4)
+        self.assertEqual((reporte['total_errores'], len(reporte['errores'])), (90, 4))
+        self.assertEqual(sum(item['cantidad'] for item in reporte['resumen']), 90)
+
+    def test_archivo_sin_columnas_obligatorias(self):
+        reporte = validar_archivo(_archivo(['A;1'], 'codigo;valor'), 'MON')
+        self.assertFalse(reporte['valido'])
+        self.assertEqual(reporte['resumen'][0]['mensaje'], 'Faltan columnas obligatorias.')
+        self.assertFalse(validar_archivo(io.BytesIO(b''), 'MON')['valido'])
+
+    def test_vista_solo_validar_no_encola(self):
+        self.entrar()
+        archivo = SimpleUploadedFile('montos.csv', _archivo(self.FILAS).getvalue())
+        respuesta = self.client.post(reverse('carga_masiva_montos'), {'archivo_csv': archivo, 'solo_validar': '1'}).json()
+        self.assertTrue(respuesta['success'])
+        self.assertEqual(respuesta['validacion']['total_errores'], 3)
+        self.assertFalse(TrabajoCarga.objects.exists())
+
+    def test_comando_con_reporte(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            entrada, salida = os.path.join(directorio, 'carga.csv'), os.path.join(directorio, 'errores.csv')
+            with open(entrada, 'wb') as archivo:
+                archivo.write(_archivo(self.FILAS).getvalue())
+            with self.assertRaisesMessage(CommandError, '3 errores'):
+                call_command('validar_carga', entrada, tipo='MON', reporte=salida, stdout=io.StringIO())
+            with open(salida) as archivo:
+                self.assertEqual(len(archivo.read().splitlines()), 4)
+            with open(entrada, 'wb') as archivo:
+                archivo.write(_archivo(self.FILAS[:1]).getvalue())
+            stdout = io.StringIO()
+            call_command('validar_carga', entrada, tipo='MON', stdout=stdout)
+            self.assertIn('Archivo válido.', stdout.getvalue())
+
+
+# --- Validación por bloque en ambos caminos de carga (en serie y en paralelo) ---
+class ValidacionPorBloqueTest(BaseCalificacionesTest):
+
+    def filas(self):
+        filas = [_fila_montos(f'PAR{i % 7}', f'2024-01-{1 + i % 3:02d}', valor=str(i)) for i in range(40)]
+        return filas + [_fila_montos('PAR1', '2024-01-02', valor='999')]
+
+    def test_bloque_invalido_no_se_escribe_en_serie(self):
+        filas = [_fila_montos(f'INS{i}', '2024-01-10') for i in range(12)] + [_fila_montos('', '2024-01-10')]
+        with self.assertRaisesMessage(ValueError, 'bloque 2: fila 14, instrumento'):
+            self.cargar(filas, tamano_bloque=10)
+        self.assertFalse(CalificacionTributaria.objects.filter(corredor=self.corredor).exists())
+
+    def test_bloque_invalido_no_se_escribe_en_paralelo(self):
+        archivo = _archivo([_fila_montos('INS1', '2024-01-10'), _fila_montos('INS2', '2024-13-10')])
+        with self.assertRaisesMessage(ValueError, 'bloque 1: fila 3, fecha'):
+            cargar_archivo_paralelo(self.corredor, archivo, 'MON', procesos=1)
+        self.assertFalse(CalificacionTributaria.objects.filter(corredor=self.corredor).exists())
+
+    def test_paralelo_igual_a_en_serie(self):
+        serie = self.cargar(self.filas(), tamano_bloque=10)
+        foto = self.foto()
+        CalificacionTributaria.objects.filter(corredor=self.corredor).delete()
+        paralelo = cargar_archivo_paralelo(self.corredor, _archivo(self.filas()), 'MON', procesos=2, tamano_bloque=10)
+        self.assertEqual(paralelo[:3], serie[:3])
+        self.assertEqual([b['filas'] for b in paralelo[3]], [b['filas'] for b in serie[3]])
+        self.assertEqual(self.foto(), foto)
+        # La última fila de la clave gana aunque llegue en otro bloque
+        self.assertEqual(foto[('PAR1', date(2024, 1, 2))]['valor_historico'], Decimal('999'))
+
+
+# --- Filas sin cambios (hash de contenido) ---
+class HashContenidoTest(BaseCalificacionesTest):
+
+    def test_recarga_identica_no_reescribe(self):
+        filas = [_fila_montos('INS1', '2024-01-10'), _fila_montos('INS2', '2024-01-10')]
+        self.cargar(filas)
+        antes = dict(CalificacionTributaria.objects.values_list('id', 'fecha_modificacion'))
+        self.assertEqual(self.cargar(filas)[:3], (0, 0, 2))
+        self.assertEqual(dict(CalificacionTributaria.objects.values_list('id', 'fecha_modificacion')), antes)
+
+        cambiada = [_fila_montos('INS1', '2024-01-10', base='2'), filas[1]]
+        self.assertEqual(self.cargar(cambiada)[:3], (0, 1, 1))
+
+    def test_mismo_hash_por_la_carga_y_por_save(self):
+        # Empates en el último decimal guardado: todos los caminos redondean al par
+        filas = ['FAC1;2024-02-01;10001;1;A;100,125;0,125000005;' + ';'.join(['0,01'] * 29)]
+        self.cargar(filas, tipo='FAC')
+        calificacion = self.calificacion('FAC1')
+        self.assertEqual((calificacion.valor_historico, calificacion.factor_8), (Decimal('100.12'), Decimal('0.12500000')))
+        hash_carga = calificacion.hash_contenido
+        calificacion.save()
+        self.assertEqual(calificacion.hash_contenido, hash_carga)
+        self.assertEqual(self.cargar(filas, tipo='FAC')[:3], (0, 0, 1))
+
+    def test_hash_de_la_carga_igual_al_de_los_valores(self):
+        df = pd.read_csv(_archivo([_fila_factores('FAC1', '2024-02-01', valor='7,005', factor='0,000000015')],
+                                  ENCABEZADO_FACTORES), sep=';', decimal=',')
+        _, _, defaults = next(registros_factores(df))
+        valores = {**defaults, **{campo: escalar_decimal(defaults[campo]) / 10 ** ESCALA_FACTOR
+                                  for campo in defaults if campo.startswith('factor_')}}
+        self.assertEqual(defaults['hash_contenido'], hash_valores(valores))
+
+    def test_escalado_redondea_al_par(self):
+        self.assertEqual([escalar_decimal(v) for v in ('0,125000005', '0.125000015', Decimal('-0.000000005'))],
+                         [12500000, 12500002, 0])
+        self.assertEqual(escalar_decimal('100.125', 2), 10012)
+        matriz = np.array([[0.125000005, 0.125000015, 0.3, 1.0]])
+        self.assertEqual(escalar_matriz(matriz).tolist(), [[12500000, 12500002, 30000000, 100000000]])
+
+
+# --- Reversión de cargas completas ---
+class ReversionTest(BaseCalificacionesTest):
+
+    def test_revertir_restaura_y_elimina(self):
+        self.cargar([_fila_montos(f'INS{i}', '2024-01-10') for i in range(3)])
+        inicial = self.foto()
+
+        trabajo = self.nuevo_trabajo()
+        self.cargar([_fila_montos('INS0', '2024-01-10', valor='9'), _fila_montos('NUEVO', '2024-02-02')], trabajo)
+        self.assertEqual(self.calificacion('INS0').ultima_carga_id, trabajo.pk)
+
+        resultado = revertir_carga(trabajo, self.usuario)
+        self.assertEqual(resultado, {'restauradas': 1, 'eliminadas': 1, 'conflictos': 0})
+        self.assertEqual(self.foto(), inicial)
+        self.assertIsNone(self.calificacion('INS0').ultima_carga_id)
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.revertidos), ('REV', 2))
+
+    def test_revertir_en_orden_inverso_vuelve_al_inicio(self):
+        self.cargar([_fila_montos('INS1', '2024-01-10')])
+        inicial = self.foto()
+        primera, segunda = self.nuevo_trabajo(), self.nuevo_trabajo()
+        self.cargar([_fila_montos('INS1', '2024-01-10', valor='2')], primera)
+        self.cargar([_fila_montos('INS1', '2024-01-10', valor='3'), _fila_montos('INS2', '2024-01-10')], segunda)
+
+        revertir_carga(segunda, self.usuario)
+        self.assertEqual(self.calificacion('INS1').valor_historico, Decimal('2'))
+        self.assertEqual(self.calificacion('INS1').ultima_carga_id, primera.pk)
+        revertir_carga(primera, self.usuario)
+        self.assertEqual(self.foto(), inicial)
+
+    def test_cambio_posterior_queda_como_conflicto(self):
+        trabajo = self.nuevo_trabajo()
+        self.cargar([_fila_montos('INS1', '2024-01-10'), _fila_montos('INS2', '2024-01-10')], trabajo)
+        self.editar('INS1', valor_historico=Decimal('3'))
+
+        resultado = revertir_carga(trabajo, self.usuario)
+        self.assertEqual(resultado, {'restauradas': 0, 'eliminadas': 1, 'conflictos': 1})
+        self.assertEqual(self.calificacion('INS1').valor_historico, Decimal('3'))
+
+    def test_no_se_revierte_dos_veces_ni_en_proceso(self):
+        trabajo = self.nuevo_trabajo()
+        self.cargar([_fila_montos('INS1', '2024-01-10')], trabajo)
+        revertir_carga(trabajo, self.usuario)
+        with self.assertRaises(ValueError):
+            revertir_carga(trabajo, self.usuario)
+        with self.assertRaises(ValueError):
+            revertir_carga(self.nuevo_trabajo(estado='PRO'), self.usuario)
+
+    def test_listado_y_vista_de_reversion(self):
+        trabajo = self.nuevo_trabajo()
+        self.cargar([_fila_montos('INS1', '2024-01-10'), _fila_montos('INS2', '2024-01-10')], trabajo)
+        self.entrar()
+        listado = self.client.get(reverse('listado_cargas')).json()['data']
+        self.assertEqual([(d['trabajo_id'], d['filas_marcadas']) for d in listado], [(trabajo.pk, 2)])
+
+        respuesta = self.client.post(reverse('revertir_carga', args=[trabajo.pk])).json()
+        self.assertEqual(respuesta['data']['eliminadas'], 2)
+        self.assertFalse(self.client.post(reverse('revertir_carga', args=[trabajo.pk])).json()['success'])
+
+        ajeno = TrabajoCarga.objects.create(corredor=Corredor.objects.create(nombre='Otro', codigo_corredor='OTR'),
+                                            tipo='MON', nombre_archivo='x.csv', estado='OK')
+        self.assertEqual(self.client.post(reverse('revertir_carga', args=[ajeno.pk])).status_code, 404)
+
+
+# --- Factores empaquetados en una columna binaria ---
+@override_settings(FACTORES_EMPAQUETADOS=True)
+class EmpaquetadoTest(BaseCalificacionesTest):
+
+    def columnas(self, calificacion):
+        return [escalar_decimal(getattr(calificacion, columna)) for columna in COLUMNAS_FACTOR]
+
+    def test_save_y_carga_empaquetan(self):
+        calificacion = self.crear('PAQ1', factor_8=Decimal('0.12345678'), factor_37=Decimal('1'))
+        calificacion.refresh_from_db()
+        self.assertEqual(calificacion.vector_factores.tolist(), self.columnas(calificacion))
+        self.cargar([_fila_factores('PAQ2', '2024-01-10', factor='0,03125')], tipo='FAC')
+        cargada = self.calificacion('PAQ2')
+        self.assertIsNotNone(cargada.factores_empaquetados)
+        self.assertEqual(cargada.vector_factores.tolist(), [3125000] * 30)
+        with override_settings(FACTORES_EMPAQUETADOS=False):
+            self.assertIsNone(self.crear('PAQ3').factores_empaquetados)
+
+    def test_matriz_con_filas_sin_empaquetar(self):
+        for i in range(3):
+            self.crear(f'MTZ{i}', factor_9=Decimal(f'0.{i}5'))
+        CalificacionTributaria.objects.filter(instrumento='MTZ1').update(factores_empaquetados=None)
+        ids, matriz = matriz_factores(CalificacionTributaria.objects.all())
+        esperado = {c.pk: self.columnas(c) for c in CalificacionTributaria.objects.all()}
+        self.assertEqual(ids.tolist(), sorted(esperado))
+        self.assertEqual(matriz.tolist(), [esperado[pk] for pk in ids.tolist()])
+
+    def test_grilla_igual_con_y_sin_empaquetado(self):
+        self.crear('GRP1', factor_8=Decimal('0.5'), factor_20=Decimal('0.00000001'))
+        self.entrar()
+        parametros = {'columnas': 'factor_8,factor_20,secuencia'}
+        empaquetada = self.client.get(reverse('grilla_calificaciones'), parametros).json()['filas']
+        caches['calificaciones'].clear()
+        with override_settings(FACTORES_EMPAQUETADOS=False):
+            columnas = self.client.get(reverse('grilla_calificaciones'), parametros).json()['filas']
+        self.assertEqual(empaquetada, columnas)
+        self.assertEqual(empaquetada[0]['factor_20'], '0.00000001')
+        self.assertEqual([texto_factor(v) for v in (-5, 100000000)], ['-0.00000005', '1.00000000'])
+
+    def test_comando_empaquetar_y_limpiar(self):
+        self.crear('CMD1', factor_8=Decimal('0.25'))
+        CalificacionTributaria.objects.update(factores_empaquetados=None)
+        call_command('empaquetar_factores', stdout=io.StringIO())
+        self.assertEqual(self.calificacion('CMD1').vector_factores[0], 25000000)
+        call_command('empaquetar_factores', limpiar=True, stdout=io.StringIO())
+        self.assertIsNone(self.calificacion('CMD1').factores_empaquetados)
+
+
+# --- Paginación por keyset de la grilla ---
+class PaginaKeysetTest(BaseCalificacionesTest):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Fechas e instrumentos repetidos: las páginas se cortan dentro de una misma fecha
+        for i in range(7):
+            CalificacionTributaria.objects.create(
+                corredor=cls.corredor, instrumento=f'INS{i // 2}', fecha=date(2024, 1, 1) + timedelta(days=i % 2),
+                secuencia=10001 + i, numero_dividendo=1, tipo_sociedad='A', valor_historico=Decimal('1'),
+            )
+
+    def esperado(self):
+        return list(
+            CalificacionTributaria.objects.filter(corredor=self.corredor)
+            .order_by('-fecha', 'instrumento', 'id').values_list('id', flat=True)
+        )
+
+    def recorrer(self, tamano):
+        calificaciones = CalificacionTributaria.objects.filter(corredor=self.corredor)
+        paginas, cursor = [], None
+        while True:
+            filas, cursor = pagina_keyset(calificaciones, cursor, tamano)
+            paginas.append([c.pk for c in filas])
+            if cursor is None:
+                return paginas
+
+    def test_recorre_todo_en_orden_sin_repetir(self):
+        for tamano in (1, 2, 3, 7, 50):
+            paginas = self.recorrer(tamano)
+            self.assertEqual([pk for pagina in paginas for pk in pagina], self.esperado())
+            self.assertTrue(all(len(pagina) == tamano for pagina in paginas[:-1]))
+
+    def test_ultima_pagina_exacta_no_tiene_siguiente(self):
+        CalificacionTributaria.objects.filter(corredor=self.corredor, secuencia=10007).delete()
+        self.assertEqual([len(pagina) for pagina in self.recorrer(3)], [3, 3])
+
+    def test_cursor_de_fila_eliminada_sigue_valido(self):
+        calificaciones = CalificacionTributaria.objects.filter(corredor=self.corredor)
+        primera, cursor = pagina_keyset(calificaciones, None, 2)
+        self.assertEqual(cursor, codificar_cursor(primera[-1]))
+        primera[-1].delete()
+        siguiente, _ = pagina_keyset(calificaciones, cursor, 2)
+        self.assertEqual([c.pk for c in siguiente], self.esperado()[1:3])
+
+    def test_cursor_invalido(self):
+        with self.assertRaises(ValueError):
+            pagina_keyset(CalificacionTributaria.objects.all(), 'no-es-un-cursor')
+
+    def test_grilla_json_por_paginas_con_columnas(self):
+        self.crear('AJENO', corredor=Corredor.objects.create(nombre='Otro', codigo_corredor='OTR'))
+        self.entrar()
+        url = reverse('grilla_calificaciones')
+        primera = self.client.get(url, {'tamano': 25, 'columnas': 'secuencia,factor_8,no_existe'}).json()
+        self.assertTrue(primera['success'])
+        self.assertEqual(primera['columnas'], ['secuencia', 'factor_8'])
+        self.assertEqual([f['id'] for f in primera['filas']], self.esperado())
+        self.assertIsNone(primera['siguiente'])
+        self.assertEqual(set(primera['filas'][0]), {'id', 'ejercicio', 'instrumento', 'fecha', 'secuencia', 'factor_8'})
+
+        self.assertFalse(self.client.get(url, {'despues': 'xx'}).json()['success'])
+        filtrada = self.client.get(url, {'instrumento': 'INS0'}).json()
+        self.assertEqual({f['instrumento'] for f in filtrada['filas']}, {'INS0'})
+
+
+# --- Reporte XLSX en streaming ---
+class ReporteXlsxTest(BaseCalificacionesTest):
+
+    def setUp(self):
+        super().setUp()
+        self.crear('XLS1', valor_historico=Decimal('12.5'), factor_8=Decimal('0.125'))
+        self.crear('XLS2', fecha=date(2024, 2, 1))
+        self.entrar()
+
+    def reporte(self):
+        respuesta = self.client.get(reverse('generar_reporte', args=['excel']))
+        return b''.join(respuesta.streaming_content)
+
+    def test_estructura_del_libro(self):
+        with zipfile.ZipFile(io.BytesIO(self.reporte())) as libro:
+            estilos = libro.read('xl/styles.xml').decode()
+            hoja = libro.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('<cellStyle name="Normal" xfId="0" builtinId="0"/>', estilos)
+        self.assertEqual(hoja.count('<row>'), 3)
+
+    @skipUnless(openpyxl, 'requiere openpyxl')
+    def test_se_abre_sin_advertencias(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            hoja = openpyxl.load_workbook(io.BytesIO(self.reporte())).active
+        filas = list(hoja.iter_rows(values_only=True))
+        self.assertEqual(hoja.title, 'Calificaciones PRB')
+        self.assertEqual([fila[1] for fila in filas[1:]], ['XLS2', 'XLS1'])
+        self.assertEqual(filas[2][0].date(), date(2024, 1, 10))
+        self.assertEqual(filas[2][7], 12.5)
+
+
+# --- Reporte PDF con caché en disco ---
+class ReportePdfTest(BaseCalificacionesTest):
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+        ajustes = override_settings(REPORTES_CACHE_DIR=self.directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.crear('PDF1')
+        self.entrar()
+
+    def reporte(self):
+        # Devuelve el PDF y cuántas veces se dibujó
+        with mock.patch.object(reporte_pdf, 'escribir_pdf', wraps=reporte_pdf.escribir_pdf) as escribir:
+            respuesta = self.client.get(reverse('generar_reporte', args=['pdf']))
+            datos = b''.join(respuesta.streaming_content)
+        self.assertTrue(datos.startswith(b'%PDF-1.4'))
+        return datos, escribir.call_count
+
+    def archivos(self):
+        return sorted(os.listdir(self.directorio))
+
+    def test_reutiliza_hasta_que_cambian_los_datos(self):
+        self.assertEqual(self.reporte()[1], 1)
+        self.assertEqual(self.reporte()[1], 0)
+        self.editar('PDF1', valor_historico=Decimal('3'))
+        self.assertEqual(self.reporte()[1], 1)
+        self.assertEqual(len(self.archivos()), 1)
+
+    def test_renombrar_el_corredor_invalida(self):
+        self.reporte()
+        Corredor.objects.filter(pk=self.corredor.pk).update(nombre='Corredor Renombrado')
+        self.assertEqual(self.reporte()[1], 1)
+        self.assertEqual(len(self.archivos()), 1)
+
+    def test_archivo_borrado_se_vuelve_a_generar(self):
+        self.reporte()
+        anterior, = self.archivos()
+        # Un request que ya lo abrió lo sigue leyendo aunque la limpieza de otro lo borre
+        with open(os.path.join(self.directorio, anterior), 'rb') as abierto:
+            os.unlink(os.path.join(self.directorio, anterior))
+            self.assertEqual(self.reporte()[1], 1)
+            self.assertTrue(abierto.read().startswith(b'%PDF-1.4'))
+        self.assertEqual(self.archivos(), [anterior])
+
+
+# --- Caché por corredor invalidada por versión ---
+class CacheCorredorTest(BaseCalificacionesTest):
+
+    def secuencias(self):
+        datos = self.client.get(reverse('grilla_calificaciones'), {'columnas': 'secuencia'}).json()
+        return [fila['secuencia'] for fila in datos['filas']]
+
+    def test_grilla_cacheada_hasta_una_escritura(self):
+        calificacion = self.crear('CAC1')
+        self.entrar()
+        self.assertEqual(self.secuencias(), ['10001'])
+        # Un UPDATE que no pasa por las vistas no invalida: se sigue sirviendo lo cacheado
+        CalificacionTributaria.objects.filter(pk=calificacion.pk).update(secuencia=10002)
+        self.assertEqual(self.secuencias(), ['10001'])
+
+        self.client.post(reverse('modificar_calificacion', args=[calificacion.pk]), {
+            'instrumento': 'CAC1', 'fecha': '2024-01-10', 'secuencia': 10003, 'numero_dividendo': 1,
+            'valor_historico': '1', 'factor_actualizacion': '0',
+        })
+        self.assertEqual(self.secuencias(), ['10003'])
+        self.cargar([_fila_montos('CAC2', '2024-01-11')])
+        self.assertEqual(len(self.secuencias()), 2)
+
+    def test_version_y_corredor_en_la_clave(self):
+        otro = Corredor.objects.create(nombre='Otro', codigo_corredor='OTR')
+        calculos = []
+
+        def calcular():
+            calculos.append(1)
+            return {'n': len(calculos)}
+
+        self.assertEqual(obtener_o_calcular(self.corredor, 'prueba', ['a'], calcular), {'n': 1})
+        self.assertEqual(obtener_o_calcular(self.corredor, 'prueba', ['a'], calcular), {'n': 1})
+        self.assertEqual(obtener_o_calcular(otro, 'prueba', ['a'], calcular), {'n': 2})
+        anterior = clave_corredor(self.corredor, 'prueba', ['a'])
+        invalidar_corredor(self.corredor)
+        self.corredor.refresh_from_db()
+        self.assertNotEqual(clave_corredor(self.corredor, 'prueba', ['a']), anterior)
+        self.assertEqual(obtener_o_calcular(self.corredor, 'prueba', ['a'], calcular), {'n': 3})
+
+
+# --- Exportación masiva para sistemas externos (CSV / JSON Lines / Parquet / Arrow) ---
+class ExportacionTest(BaseCalificacionesTest):
+
+    def setUp(self):
+        super().setUp()
+        self.cargar([_fila_montos(f'INS{i}', '2024-01-10') for i in range(3)])
+        self.entrar()
+
+    def exportar(self, formato='csv', **parametros):
+        respuesta = self.client.get(reverse('exportar_calificaciones', args=[formato]), parametros)
+        return respuesta, b''.join(respuesta.streaming_content)
+
+    def filas_csv(self, datos):
+        return list(csv.reader(io.StringIO(datos.decode()), delimiter=';'))
+
+    def envejecer(self, segundos, **filtro):
+        # fecha_modificacion en el pasado, como si la fila se hubiera escrito hace `segundos`
+        CalificacionTributaria.objects.filter(corredor=self.corredor, **filtro).update(
+            fecha_modificacion=timezone.now() - timedelta(seconds=segundos))
+
+    def test_completa_incluye_lo_recien_cargado(self):
+        respuesta, datos = self.exportar()
+        filas = self.filas_csv(datos)
+        self.assertEqual(len(filas), 4)
+        self.assertEqual(filas[0][:3], ['corredor', 'instrumento', 'fecha'])
+        self.assertLess(leer_marca(respuesta['X-Exportacion-Hasta']), timezone.now())
+
+    def test_csv_exportado_se_puede_volver_a_cargar(self):
+        _, datos = self.exportar()
+        # La carga de factores no lee las columnas propias de la exportación
+        self.assertEqual(cargar_archivo(self.corredor, io.BytesIO(datos), 'FAC')[:3], (0, 3, 0))
+
+    def test_incremental_con_margen(self):
+        self.envejecer(3600)
+        desde = timezone.now() - timedelta(seconds=1800)
+        self.envejecer(600, instrumento='INS1')
+        respuesta, datos = self.exportar(desde=desde.isoformat())
+        self.assertEqual([fila[1] for fila in self.filas_csv(datos)[1:]], ['INS1'])
+
+        # Lo escrito dentro del margen va en la siguiente sincronización, no se pierde
+        self.envejecer(1, instrumento='INS2')
+        marca = respuesta['X-Exportacion-Hasta']
+        self.assertEqual(len(self.filas_csv(self.exportar(desde=marca)[1])), 1)
+        with override_settings(EXPORTACION_MARGEN_SEGUNDOS=0):
+            _, datos = self.exportar(desde=marca)
+        self.assertEqual([fila[1] for fila in self.filas_csv(datos)[1:]], ['INS2'])
+
+    def test_marca_no_pasa_de_una_carga_en_proceso_del_corredor(self):
+        ahora = timezone.now()
+        otro = Corredor.objects.create(nombre='Otro', codigo_corredor='OTR')
+        TrabajoCarga.objects.create(corredor=otro, tipo='MON', nombre_archivo='x.csv', estado='PRO',
+                                    fecha_inicio=ahora - timedelta(hours=1), latido=ahora)
+        inicio_propio = ahora - timedelta(minutes=30)
+        propio = TrabajoCarga.objects.create(corredor=self.corredor, tipo='MON', nombre_archivo='y.csv',
+                                             estado='PRO', fecha_inicio=inicio_propio, latido=ahora)
+        self.assertLess(marca_exportacion([otro]), ahora - timedelta(hours=1))
+        self.assertEqual(marca_exportacion([self.corredor]), inicio_propio - timedelta(microseconds=1))
+        # Una carga sin latido reciente está abandonada y no frena la marca
+        TrabajoCarga.objects.filter(pk=propio.pk).update(latido=ahora - timedelta(days=1))
+        self.assertGreater(marca_exportacion([self.corredor]), inicio_propio)
+
+    def test_jsonl_y_formato_invalido(self):
+        _, datos = self.exportar('jsonl')
+        objetos = [json.loads(linea) for linea in datos.decode().splitlines()]
+        self.assertEqual(len(objetos), 3)
+        self.assertEqual(objetos[0]['corredor'], 'PRB')
+        self.assertFalse(self.client.get(reverse('exportar_calificaciones', args=['xml'])).json()['success'])
+        self.assertFalse(self.client.get(reverse('exportar_calificaciones', args=['csv']), {'desde': 'ayer'}).json()['success'])
+
+    @skipUnless(pa, 'requiere pyarrow')
+    def test_parquet_y_arrow(self):
+        import pyarrow.parquet as pq
+        _, datos = self.exportar('parquet')
+        tabla = pq.read_table(io.BytesIO(datos))
+        self.assertEqual(tabla.num_rows, 3)
+        self.assertEqual(str(tabla.schema.field('factor_8').type), 'decimal128(9, 8)')
+        _, datos = self.exportar('arrow')
+        self.assertEqual(pa.ipc.open_stream(datos).read_all().num_rows, 3)
+
+    def test_comando_con_marca(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            salida, marca = os.path.join(directorio, 'e.csv'), os.path.join(directorio, 'marca')
+            call_command('exportar_calificaciones', salida, corredor=['PRB'], marca=marca, stderr=io.StringIO())
+            with open(salida) as archivo:
+                self.assertEqual(len(archivo.read().splitlines()), 4)
+            self.envejecer(3600)
+            call_command('exportar_calificaciones', salida, corredor=['PRB'], marca=marca, stderr=io.StringIO())
+            with open(salida) as archivo:
+                self.assertEqual(len(archivo.read().splitlines()), 1)
+
+
+# --- Historial por campo y reconstrucción a una fecha ---
+class HistorialTest(BaseCalificacionesTest):
+
+    def setUp(self):
+        super().setUp()
+        self.cargar([_fila_montos('HIS', '2024-01-10', valor='100')])
+        self.id = self.calificacion('HIS').pk
+        self.entrar()
+
+    def fechar(self, accion, momento):
+        # Lleva las entradas de `accion` a `momento`, para poder consultar entre cambios
+        HistorialCalificacion.objects.filter(calificacion_id=self.id, accion=accion).update(fecha_cambio=momento)
+
+    def test_reconstruye_antes_de_cada_cambio(self):
+        inicio = timezone.now()
+        self.fechar('CRE', inicio - timedelta(days=2))
+        self.editar('HIS', valor_historico=Decimal('250'), tipo_sociedad='C')
+        self.fechar('MOD', inicio - timedelta(days=1))
+        self.client.post(reverse('eliminar_calificacion', args=[self.id]))
+
+        self.assertIsNone(calificacion_en_fecha(self.id, inicio - timedelta(days=3)))
+        original = calificacion_en_fecha(self.id, inicio - timedelta(days=1, hours=12))
+        self.assertEqual((original['tipo_sociedad'], original['valor_historico']), ('A', Decimal('100')))
+        editada = calificacion_en_fecha(self.id, inicio - timedelta(hours=12))
+        self.assertEqual((editada['tipo_sociedad'], editada['valor_historico']), ('C', Decimal('250')))
+        self.assertEqual(editada['factor_20'], original['factor_20'])
+        self.assertIsNone(calificacion_en_fecha(self.id, timezone.now()))
+        self.assertEqual([c['accion'] for c in cambios_calificacion(self.id)], ['ELI', 'MOD', 'CRE'])
+
+    def test_modificacion_guarda_solo_los_campos_cambiados(self):
+        self.editar('HIS', valor_historico=Decimal('250'))
+        cambio = cambios_calificacion(self.id)[0]
+        self.assertEqual((cambio['accion'], cambio['origen']), ('MOD', 'MAN'))
+        self.assertEqual(cambio['anteriores'], {'valor_historico': '100'})
+
+    def test_redondeo_mitad_al_par_no_genera_cambios(self):
+        # 0.123456785 se guarda como 0.12345678 (mitad al par): no es un cambio
+        self.editar('HIS', factor_8=Decimal('0.12345678'))
+        total = HistorialCalificacion.objects.filter(calificacion_id=self.id).count()
+        self.editar('HIS', factor_8=Decimal('0.123456785'))
+        self.assertEqual(HistorialCalificacion.objects.filter(calificacion_id=self.id).count(), total)
+
+    def test_vista_por_fecha_y_de_otro_corredor(self):
+        ayer = (timezone.localdate() - timedelta(days=1)).isoformat()
+        self.fechar('CRE', timezone.now())
+        datos = self.client.get(reverse('historial_calificacion', args=[self.id])).json()
+        self.assertTrue(datos['success'])
+        self.assertEqual(datos['data']['valor_historico'], '100.00')
+        self.assertFalse(self.client.get(reverse('historial_calificacion', args=[self.id]), {'fecha': ayer}).json()['success'])
+        self.assertFalse(self.client.get(reverse('historial_calificacion', args=[self.id]), {'fecha': 'ayer'}).json()['success'])
+        otro = Corredor.objects.create(nombre='Otro', codigo_corredor='OTR')
+        CalificacionTributaria.objects.filter(pk=self.id).update(corredor=otro)
+        self.assertFalse(self.client.get(reverse('historial_calificacion', args=[self.id])).json()['success'])
+
+
+# --- Resúmenes por período (analítica) ---
+class ResumenTest(BaseCalificacionesTest):
+
+    def resumen(self):
+        return list(ResumenPeriodo.objects.filter(cantidad__gt=0).order_by('tipo_mercado', 'periodo_comercial')
+                    .values_list('tipo_mercado', 'periodo_comercial', 'cantidad', *SUMAS))
+
+    def test_incremental_igual_a_reconstruir(self):
+        self.cargar([_fila_montos(f'RES{i}', f'202{i % 2 + 3}-05-0{i + 1}', valor=f'{i}00,25') for i in range(4)])
+        self.cargar([_fila_montos('RES0', '2023-05-01', valor='7,5', base='2'), _fila_montos('RES9', '2024-01-01')])
+        self.entrar()
+        self.client.post(reverse('eliminar_calificacion', args=[self.calificacion('RES1').pk]))
+        respuesta = self.client.post(reverse('modificar_calificacion', args=[self.calificacion('RES2').pk]), {
+            'instrumento': 'RES2', 'fecha': '2023-05-03', 'secuencia': 10001, 'numero_dividendo': 1,
+            'valor_historico': '1', 'tipo_mercado': 'ACC', 'factor_actualizacion': '0',
+        })
+        self.assertTrue(respuesta.json()['success'])
+        incremental = self.resumen()
+        self.assertEqual(sum(fila[2] for fila in incremental), 4)
+        self.assertIn('ACC', [fila[0] for fila in incremental])
+        reconstruir_resumen(self.corredor)
+        self.assertEqual(self.resumen(), incremental)
+
+    def test_promedio_mitad_al_par(self):
+        # (1.00 + 0.01) / 2 = 0.505 -> 0.50
+        self.cargar([_fila_montos('PRM1', '2024-01-01', valor='1'), _fila_montos('PRM2', '2024-02-01', valor='0,01')])
+        total, = consultar_resumen(self.corredor, agrupar=[])
+        self.assertEqual((total['cantidad'], total['total_valor_historico']), (2, '1.01'))
+        self.assertEqual(total['promedio_valor_historico'], '0.50')
+
+    def test_vista_analitica(self):
+        self.cargar([_fila_montos('ANA1', '2023-01-01'), _fila_montos('ANA2', '2024-01-01')])
+        self.entrar()
+        url = reverse('analitica_calificaciones')
+        datos = self.client.get(url).json()
+        self.assertEqual([grupo['periodo_comercial'] for grupo in datos['resumenes']], [2024, 2023])
+        datos = self.client.get(url, {'agrupar': '', 'periodo_comercial': 2024}).json()
+        self.assertEqual([grupo['cantidad'] for grupo in datos['resumenes']], [1])
+        self.assertFalse(self.client.get(url, {'agrupar': 'instrumento'}).json()['success'])
+
+
+# --- Búsqueda de instrumentos por prefijo (typeahead) ---
+class BusquedaInstrumentosTest(BaseCalificacionesTest):
+
+    def buscar(self, q, **parametros):
+        return self.client.get(reverse('buscar_instrumentos'), {'q': q, **parametros}).json()
+
+    def test_prefijo_sin_mayusculas_y_limite(self):
+        for instrumento in ('BCH', 'bci', 'BSANTANDER', 'COPEC', 'BCI'):
+            self.crear(instrumento)
+        self.crear('BCHILE', fecha=date(2024, 2, 1))
+        self.crear('BANCO', corredor=Corredor.objects.create(nombre='Otro', codigo_corredor='OTR'))
+        self.entrar()
+        self.assertEqual(self.buscar(' bc')['instrumentos'], ['BCH', 'BCHILE', 'BCI', 'bci'])
+        self.assertEqual(self.buscar('B', limite=2)['instrumentos'], ['BCH', 'BCHILE'])
+        self.assertEqual(self.buscar('B', limite=0)['instrumentos'], ['BCH'])
+        self.assertEqual(self.buscar('Z')['instrumentos'], [])
+        self.assertFalse(self.buscar('B', limite='x')['success'])
+        # Sin prefijo: los primeros en orden
+        self.assertEqual(len(busqueda.buscar_instrumentos(self.corredor, '', limite=1000)), 6)
+
+    def test_indice_se_reconstruye_con_version_datos(self):
+        self.crear('AAA')
+        self.entrar()
+        self.assertEqual(self.buscar('A')['instrumentos'], ['AAA'])
+        # Sin subir la versión se sigue usando el índice en memoria
+        self.crear('AAB')
+        self.assertEqual(self.buscar('A')['instrumentos'], ['AAA'])
+        # Las escrituras de las vistas la suben
+        self.client.post(reverse('eliminar_calificacion', args=[self.calificacion('AAA').pk]))
+        self.assertEqual(self.buscar('A')['instrumentos'], ['AAB'])
+
+
+# --- Operaciones del mantenedor por lote ---
+class LotesTest(BaseCalificacionesTest):
+
+    def setUp(self):
+        super().setUp()
+        self.entrar()
+
+    def post_json(self, nombre, cuerpo):
+        return self.client.post(reverse(nombre), json.dumps(cuerpo), content_type='application/json').json()
+
+    def basicos(self, calificacion, **campos):
+        return {'id': calificacion.pk, 'instrumento': calificacion.instrumento, 'fecha': '2024-01-10', 'secuencia': 10001,
+                'numero_dividendo': 1, 'valor_historico': '1', 'factor_actualizacion': '0', **campos}
+
+    def test_obtener_en_orden_sin_ajenas(self):
+        a, b = self.crear('LTA'), self.crear('LTB')
+        ajena = self.crear('LTC', corredor=Corredor.objects.create(nombre='Otro', codigo_corredor='OTR'))
+        respuesta = self.client.get(reverse('obtener_calificaciones_lote'), {'ids': f'{b.pk},{ajena.pk},{a.pk},{b.pk}'}).json()
+        self.assertEqual([r['id'] for r in respuesta['resultados']], [b.pk, ajena.pk, a.pk])
+        self.assertEqual([r['success'] for r in respuesta['resultados']], [True, False, True])
+        self.assertEqual(respuesta['resultados'][0]['data']['instrumento'], 'LTB')
+        self.assertEqual(respuesta['correctas'], 2)
+        self.assertFalse(self.client.get(reverse('obtener_calificaciones_lote'), {'ids': '1,x'}).json()['success'])
+        ids = ','.join(str(i) for i in range(1, lotes.MAX_LOTE + 2))
+        self.assertFalse(self.client.get(reverse('obtener_calificaciones_lote'), {'ids': ids}).json()['success'])
+
+    def test_modificar_resultado_por_item(self):
+        a, b, c = self.crear('LMA'), self.crear('LMB'), self.crear('LMC')
+        respuesta = self.post_json('modificar_calificaciones_lote', {'calificaciones': [
+            self.basicos(a, secuencia=10005),
+            self.basicos(b, secuencia=5),
+            self.basicos(c, instrumento='LMA'),
+        ]})
+        resultados = {r['id']: r for r in respuesta['resultados']}
+        self.assertTrue(resultados[a.pk]['success'])
+        self.assertIn('secuencia', resultados[b.pk]['errors'])
+        self.assertEqual(resultados[c.pk]['errors'], lotes.MENSAJE_DUPLICADO)
+        self.assertEqual(self.calificacion('LMA').secuencia, 10005)
+        self.assertEqual(self.calificacion('LMB').secuencia, 10001)
+        self.assertEqual(self.calificacion('LMC').instrumento, 'LMC')
+        historial = HistorialCalificacion.objects.filter(accion='MOD')
+        self.assertEqual([(h.calificacion_id, h.origen) for h in historial], [(a.pk, 'MAN')])
+        self.assertEqual(RegistroAuditoria.objects.get(accion='MOD').cantidad, 1)
+        # Un mismo id dos veces en el lote se rechaza completo
+        repetido = self.post_json('modificar_calificaciones_lote', {'calificaciones': [self.basicos(a), self.basicos(a)]})
+        self.assertFalse(repetido['success'])
+
+    def test_guardar_factores_valida_la_suma(self):
+        a, b = self.crear('LFA', factor_9=Decimal('0.5')), self.crear('LFB')
+        respuesta = self.post_json('guardar_factores_lote', {'calificaciones': [
+            {'id': a.pk, 'factor_8': '0.25'},
+            {'id': b.pk, 'factor_8': '0.75', 'factor_9': '0.5'},
+        ]})
+        self.assertEqual([r['success'] for r in respuesta['resultados']], [True, False])
+        self.assertEqual(respuesta['resultados'][1]['errors'], lotes.MENSAJE_SUMA)
+        # Los factores ausentes quedan en 0
+        guardada = self.calificacion('LFA')
+        self.assertEqual((guardada.factor_8, guardada.factor_9), (Decimal('0.25'), Decimal('0')))
+        self.assertEqual(self.calificacion('LFB').factor_8, Decimal('0'))
+        self.assertEqual(RegistroAuditoria.objects.get(accion='FAC').cantidad, 1)
+
+    def test_eliminar_solo_propias(self):
+        a, b = self.crear('LEA'), self.crear('LEB')
+        ajena = self.crear('LEC', corredor=Corredor.objects.create(nombre='Otro', codigo_corredor='OTR'))
+        respuesta = self.post_json('eliminar_calificaciones_lote', {'ids': [a.pk, ajena.pk]})
+        self.assertEqual([r['success'] for r in respuesta['resultados']], [True, False])
+        self.assertEqual(set(CalificacionTributaria.objects.values_list('instrumento', flat=True)), {'LEB', 'LEC'})
+        self.assertEqual(list(HistorialCalificacion.objects.filter(accion='ELI').values_list('calificacion_id', flat=True)), [a.pk])
+        self.assertEqual(RegistroAuditoria.objects.get(accion='ELI').cantidad, 1)
+        self.assertFalse(self.post_json('eliminar_calificaciones_lote', {'id': [b.pk]})['success'])
+
+
+# --- Serialización a JSON con values_list ---
+class SerializacionTest(BaseCalificacionesTest):
+
+    def test_igual_a_model_to_dict(self):
+        # La salida anterior de obtener/<id>: model_to_dict con DjangoJSONEncoder
+        calificacion = self.crear('SER1', factor_8=Decimal('0.12500000'), factor_20=Decimal('0.00000001'),
+                                  descripcion_dividendo='', acogido_isfut=True)
+        self.crear('SER2', tipo_mercado=None, descripcion_dividendo=None)
+        for calificacion in CalificacionTributaria.objects.all():
+            esperado = json.loads(json.dumps(model_to_dict(calificacion), cls=DjangoJSONEncoder))
+            fila = CalificacionTributaria.objects.values_list(*SERIALIZADOR_CALIFICACION.columnas).get(pk=calificacion.pk)
+            self.assertEqual(json.loads(json.dumps(SERIALIZADOR_CALIFICACION.fila(fila))), esperado)
+
+        self.entrar()
+        respuesta = self.client.get(reverse('obtener_calificacion_json', args=[calificacion.pk])).json()
+        self.assertEqual(respuesta['data'], json.loads(json.dumps(model_to_dict(calificacion), cls=DjangoJSONEncoder)))
+
+    def test_rutas_con_relacion_y_nulos(self):
+        calificacion = self.crear('SER3')
+        serializador = Serializador([('codigo', 'corredor__codigo_corredor'), ('modificada', 'fecha_modificacion'),
+                                     ('fecha', 'fecha'), ('fin_carga', 'ultima_carga__fecha_fin')])
+        fila = CalificacionTributaria.objects.values_list(*serializador.columnas).get(pk=calificacion.pk)
+        self.assertEqual(serializador.fila(fila), {
+            'codigo': 'PRB', 'modificada': calificacion.fecha_modificacion.isoformat(),
+            'fecha': '2024-01-10', 'fin_carga': None,
+        })
+
+
+# --- Vistas AJAX del mantenedor: variante síncrona (WSGI) y async (ASGI) ---
+class VistasAsyncTest(BaseCalificacionesTest):
+
+    async def llamar(self, vista, *args, datos=None):
+        # Request ASGI autenticado, como lo deja AuthenticationMiddleware
+        fabrica = AsyncRequestFactory()
+        request = fabrica.post('/', datos) if datos is not None else fabrica.get('/')
+
+        async def auser():
+            return self.usuario
+        request.auser = auser
+        return json.loads((await vista(request, *args)).content)
+
+    def test_rutas_segun_servidor(self):
+        self.assertFalse(iscoroutinefunction(urls._vista(views.eliminar_calificacion, views.aeliminar_calificacion)))
+        with override_settings(SERVIDOR_ASGI=True):
+            self.assertTrue(iscoroutinefunction(urls._vista(views.eliminar_calificacion, views.aeliminar_calificacion)))
+
+    async def test_obtener_igual_en_ambas_variantes(self):
+        calificacion = await sync_to_async(self.crear)('ASY1', factor_8=Decimal('0.25'))
+        await sync_to_async(self.entrar)()
+        sincrona = (await sync_to_async(self.client.get)(reverse('obtener_calificacion_json', args=[calificacion.pk]))).json()
+        self.assertTrue(sincrona['success'])
+        self.assertEqual(await self.llamar(views.aobtener_calificacion_json, calificacion.pk), sincrona)
+        self.assertFalse((await self.llamar(views.aobtener_calificacion_json, calificacion.pk + 1))['success'])
+
+    async def test_guardar_factores_y_eliminar(self):
+        calificacion = await sync_to_async(self.crear)('ASY2')
+        factores = {f'factor_{i}': '0' for i in range(8, 38)}
+        respuesta = await self.llamar(views.aguardar_factores, calificacion.pk, datos={**factores, 'factor_8': '0.6', 'factor_9': '0.6'})
+        self.assertFalse(respuesta['success'])
+        respuesta = await self.llamar(views.aguardar_factores, calificacion.pk, datos={**factores, 'factor_8': '0.6'})
+        self.assertTrue(respuesta['success'])
+        self.assertEqual((await CalificacionTributaria.objects.aget(pk=calificacion.pk)).factor_8, Decimal('0.6'))
+
+        self.assertTrue((await self.llamar(views.aeliminar_calificacion, calificacion.pk, datos={}))['success'])
+        self.assertFalse(await CalificacionTributaria.objects.filter(pk=calificacion.pk).aexists())
+        acciones = [accion async for accion in RegistroAuditoria.objects.filter(calificacion_id=calificacion.pk)
+                    .order_by('fecha_accion', 'id').values_list('accion', flat=True)]
+        self.assertEqual(acciones, ['FAC', 'ELI'])
+        self.assertEqual(await HistorialCalificacion.objects.filter(calificacion_id=calificacion.pk, accion='ELI').acount(), 1)
+
+    async def test_previsualizar_y_montos(self):
+        archivo = SimpleUploadedFile('montos.csv', '\n'.join([ENCABEZADO_MONTOS, _fila_montos('ASY3', '2024-01-10')]).encode())
+        respuesta = await self.llamar(views.aprevisualizar_csv, datos={'archivo_csv': archivo})
+        self.assertTrue(respuesta['success'])
+        self.assertIn('factor_8 (calc)', respuesta['tabla_html'])
+
+        calificacion = await sync_to_async(self.crear)('ASY4')
+        respuesta = await self.llamar(views.aingresar_montos, calificacion.pk, datos={f'monto_{i}': '1' for i in range(8, 12)})
+        self.assertEqual(respuesta['factores']['factor_8'], '0.25000000')
+
+
+# --- Registro de auditoría (solo inserción) ---
+class AuditoriaTest(BaseCalificacionesTest):
+
+    def test_registro_es_de_solo_insercion(self):
+        registro = registrar(self.corredor, self.usuario, 'CRE', objeto='X')
+        self.assertEqual((registro.corredor_codigo, registro.usuario_nombre), ('PRB', 'corredor'))
+        with self.assertRaises(ValueError):
+            registro.save()
+        with self.assertRaises(ValueError):
+            registro.delete()
+        with self.assertRaises(ValueError):
+            RegistroAuditoria.objects.filter(pk=registro.pk).delete()
+        with self.assertRaises(ValueError):
+            RegistroAuditoria.objects.update(objeto='Y')
+        self.assertEqual(RegistroAuditoria.objects.get().objeto, 'X')
+
+    def test_eliminar_corredor_conserva_su_registro(self):
+        otro = Corredor.objects.create(nombre='Otro', codigo_corredor='OTR')
+        registrar(otro, None, 'CAR', cantidad=5)
+        otro.delete()
+        registro = RegistroAuditoria.objects.get()
+        self.assertEqual((registro.corredor_id, registro.corredor_codigo, registro.cantidad), (None, 'OTR', 5))
+
+    def test_pagina_y_vistas_por_corredor(self):
+        for i in range(5):
+            registrar(self.corredor, self.usuario, 'MOD' if i % 2 else 'CRE', objeto=f'INS{i}')
+        registrar(Corredor.objects.create(nombre='Otro', codigo_corredor='OTR'), None, 'CRE', objeto='AJENO')
+        registros = RegistroAuditoria.objects.filter(corredor=self.corredor)
+        primera, cursor = pagina_auditoria(registros, tamano=3)
+        segunda, fin = pagina_auditoria(registros, cursor, tamano=3)
+        self.assertEqual([r.objeto for r in primera + segunda], ['INS4', 'INS3', 'INS2', 'INS1', 'INS0'])
+        self.assertIsNone(fin)
+
+        self.entrar()
+        respuesta = self.client.get(reverse('registro_auditoria'), {'accion': 'MOD'})
+        self.assertEqual([r.objeto for r in respuesta.context['logs']], ['INS3', 'INS1'])
+        respuesta = self.client.get(reverse('exportar_auditoria'))
+        filas = list(csv.reader(io.StringIO(b''.join(respuesta.streaming_content).decode()), delimiter=';'))
+        self.assertEqual(len(filas), 6)
+        self.assertNotIn('AJENO', [fila[4] for fila in filas])
+
+
+# --- Listado y acciones masivas del admin de calificaciones ---
+class AdminCalificacionesTest(BaseCalificacionesTest):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', password='clave'))
+        self.url = reverse('admin:calificaciones_calificaciontributaria_changelist')
+
+    def listado(self, **parametros):
+        return self.client.get(self.url, parametros).context['cl']
+
+    def accion(self, accion, calificaciones=(), **datos):
+        return self.client.post(self.url, {
+            'action': accion, '_selected_action': [c.pk for c in calificaciones], **datos,
+        }, follow=True)
+
+    def test_paginas_por_cursor(self):
+        for i, dia in enumerate((10, 10, 9, 8, 8)):
+            self.crear(f'PAG{i}', fecha=date(2024, 1, dia))
+        paginas = []
+        with mock.patch.object(CalificacionTributariaAdmin, 'list_per_page', 2):
+            cl = self.listado()
+            paginas.append([c.instrumento for c in cl.result_list])
+            while cl.siguiente:
+                cl = self.listado(despues=cl.siguiente)
+                paginas.append([c.instrumento for c in cl.result_list])
+            self.assertEqual(cl.result_count, 5)
+            # Un cursor inválido vuelve a la primera página
+            self.assertEqual([c.instrumento for c in self.listado(despues='x').result_list], ['PAG0', 'PAG1'])
+        self.assertEqual(paginas, [['PAG0', 'PAG1'], ['PAG2', 'PAG3'], ['PAG4']])
+
+    def test_filtro_y_revalidar_suma_factores(self):
+        excedida = self.crear('SUM1', factor_8=Decimal('0.6'), factor_19=Decimal('0.5'))
+        self.crear('SUM2', factor_8=Decimal('0.5'), factor_19=Decimal('0.5'))
+        self.assertEqual(list(self.listado(suma_factores='excede').result_list), [excedida])
+        respuesta = self.accion('revalidar_suma_factores', [excedida], select_across='1', index='0')
+        self.assertIn('suma_factores=excede', respuesta.redirect_chain[-1][0])
+        self.assertEqual(list(respuesta.context['cl'].result_list), [excedida])
+
+    def test_busqueda_por_secuencia(self):
+        self.crear('BUS1', secuencia=10050)
+        self.crear('10050X', secuencia=10001)
+        self.crear('BUS2', secuencia=10051)
+        self.assertEqual({c.instrumento for c in self.listado(q='10050').result_list}, {'BUS1', '10050X'})
+
+    def test_eliminar_pide_confirmacion(self):
+        a, b = self.crear('ELI1'), self.crear('ELI2')
+        otro = Corredor.objects.create(nombre='Otro', codigo_corredor='OTR')
+        c = self.crear('ELI3', corredor=otro)
+        confirmacion = self.accion('eliminar_en_bloques', [a, c])
+        self.assertTemplateUsed(confirmacion, 'admin/calificaciones/confirmar_accion_masiva.html')
+        self.assertEqual(CalificacionTributaria.objects.count(), 3)
+        respuesta = self.accion('eliminar_en_bloques', [a, c], confirmar='si')
+        self.assertIn('2 calificaciones eliminadas.', [str(m) for m in respuesta.context['messages']])
+        self.assertEqual(list(CalificacionTributaria.objects.all()), [b])
+        self.assertEqual(sorted(HistorialCalificacion.objects.filter(accion='ELI', origen='ADM')
+                                .values_list('calificacion_id', flat=True)), sorted([a.pk, c.pk]))
+        # Una entrada de auditoría por corredor afectado
+        self.assertEqual(sorted(RegistroAuditoria.objects.filter(accion='ELI').values_list('corredor_codigo', 'cantidad')),
+                         [('OTR', 1), ('PRB', 1)])
+
+    def test_reasignar_solo_las_distintas(self):
+        a = self.crear('REA1', tipo_mercado='ACC')
+        b = self.crear('REA2', tipo_mercado='CFI')
+        self.crear('REA3', tipo_mercado='CFI')
+        respuesta = self.accion('reasignar_tipo_mercado_ACC', [a, b])
+        self.assertIn('1 calificaciones modificadas.', [str(m) for m in respuesta.context['messages']])
+        self.assertEqual(dict(CalificacionTributaria.objects.values_list('instrumento', 'tipo_mercado')),
+                         {'REA1': 'ACC', 'REA2': 'ACC', 'REA3': 'CFI'})
+        self.assertEqual([(c['origen'], c['anteriores']) for c in cambios_calificacion(b.pk)], [('ADM', {'tipo_mercado': 'CFI'})])
+        # Con "seleccionar todas" se aplica a todo lo filtrado, no solo a lo marcado
+        self.accion('reasignar_tipo_mercado_vacio', [a], select_across='1', index='0')
+        self.assertFalse(CalificacionTributaria.objects.exclude(tipo_mercado__isnull=True).exists())
+
+
+# --- Acciones del admin sobre las cargas ---
+class AdminCargasTest(BaseCalificacionesTest):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', password='clave'))
+
+    def terminada(self, filas, **campos):
+        trabajo = self.nuevo_trabajo()
+        resultado = self.cargar(filas, trabajo)
+        ahora = timezone.now()
+        TrabajoCarga.objects.filter(pk=trabajo.pk).update(
+            fecha_inicio=ahora - timedelta(minutes=1), fecha_fin=ahora, creados=resultado[0], **campos)
+        return trabajo
+
+    def accion(self, trabajo):
+        respuesta = self.client.post(reverse('admin:calificaciones_trabajocarga_changelist'), {
+            'action': 'eliminar_calificaciones_creadas', '_selected_action': [trabajo.pk],
+        }, follow=True)
+        return [str(mensaje) for mensaje in respuesta.context['messages']]
+
+    def instrumentos(self):
+        return sorted(CalificacionTributaria.objects.values_list('instrumento', flat=True))
+
+    def test_elimina_solo_lo_creado_por_la_carga(self):
+        self.crear('MANUAL')
+        primera = self.terminada([_fila_montos('C1', '2024-01-10'), _fila_montos('C2', '2024-01-10')])
+        self.cargar([_fila_montos('C1', '2024-01-10', valor='9'), _fila_montos('OTRA', '2024-01-10')], self.nuevo_trabajo())
+        self.calificacion('C2').delete()
+        self.assertEqual(self.accion(primera), [f'Carga #{primera.pk}: 1 de 2 calificaciones creadas eliminadas.'])
+        self.assertEqual(self.instrumentos(), ['MANUAL', 'OTRA'])
+
+    def test_carga_sin_creaciones_en_el_historial_no_elimina(self):
+        self.cargar([_fila_montos('SUELTA', '2024-01-10')])
+        # Una carga que solo actualizó (o anterior al registro del lote en el historial)
+        solo_actualiza = self.terminada([_fila_montos('SUELTA', '2024-01-10', valor='9')])
+        self.assertIn('no tiene calificaciones creadas', self.accion(solo_actualiza)[0])
+        revertida = self.terminada([_fila_montos('NUEVA', '2024-01-10')], estado='REV')
+        self.assertIn('fue revertida', self.accion(revertida)[0])
+        self.assertEqual(self.instrumentos(), ['NUEVA', 'SUELTA'])
+
+
+# --- Kernel de factores (montos -> factores) ---
+def _exacto(montos):
+    # La versión Decimal fila a fila que reemplaza el kernel
+    base = sum(montos[:COLUMNAS_BASE])
+    if base <= 0:
+        return [0] * len(montos)
+    escala = Decimal(1).scaleb(-ESCALA_FACTOR)
+    return [int((Decimal(m) / Decimal(base)).quantize(escala, rounding=ROUND_HALF_EVEN).scaleb(ESCALA_FACTOR))
+            for m in montos]
+
+
+def _fila_kernel(base, resto=()):
+    montos = list(base) + [0] * (COLUMNAS_BASE - len(base)) + list(resto)
+    return montos + [0] * (30 - len(montos))
+
+
+class CalcularFactoresTest(TestCase):
+
+    def test_redondeo_half_even_igual_a_decimal(self):
+        montos = [
+            _fila_kernel([1, 199999999]),  # 0,000000005 baja al par y 0,999999995 sube al par
+            _fila_kernel([1, 2, 3, 4, 5, 6, 7], [8, 9]),
+            _fila_kernel([1] * 6, [5]),  # seis factores 0,16666667: la suma redondeada pasa de 1 y no se corrige
+            _fila_kernel([10 ** 12, 3]),
+        ]
+        factores = calcular_factores(np.array(montos, dtype=np.int64))
+        for fila, calculada in zip(montos, factores.tolist()):
+            self.assertEqual(calculada, _exacto(fila))
+        self.assertEqual(int(factores[2, :COLUMNAS_BASE].sum()), 10 ** ESCALA_FACTOR + 2)
+
+    def test_aleatorio_igual_a_decimal(self):
+        montos = np.random.default_rng(7).integers(0, 10 ** 9, size=(300, 30))
+        for fila, calculada in zip(montos.tolist(), calcular_factores(montos).tolist()):
+            self.assertEqual(calculada, _exacto(fila))
+
+    def test_base_no_positiva_queda_en_cero(self):
+        montos = np.array([_fila_kernel([0], [4]), _fila_kernel([-5, 2], [1])], dtype=np.int64)
+        self.assertFalse(calcular_factores(montos).any())
+
+    def test_montos_grandes_usan_enteros_de_python(self):
+        fila = _fila_kernel([2 ** 60, 2 ** 60 + 1], [3 * 2 ** 60])
+        factores = calcular_factores(np.array([fila], dtype=object))
+        self.assertEqual([int(f) for f in factores[0]], _exacto(fila))
+
+
+class SumaRedondeadaTest(BaseCalificacionesTest):
+    # Montos cuyos factores 8..19 redondeados suman 1,00000002: no cumplen la regla de clean()
+    FILA = '{};2024-01-10;10001;1;A;10;' + ';'.join(['1'] * 6 + ['0'] * 24)
+
+    def test_validacion_y_carga_rechazan_la_fila(self):
+        archivo = _archivo([self.FILA.format('SUM1')])
+        reporte = validar_archivo(archivo, 'MON')
+        self.assertFalse(reporte['valido'])
+        self.assertEqual(reporte['errores'][0]['columna'], 'factor_8..factor_19')
+        with self.assertRaisesMessage(ValueError, 'factor_8..factor_19'):
+            self.cargar([self.FILA.format('SUM1')])
+        self.assertFalse(CalificacionTributaria.objects.filter(corredor=self.corredor).exists())
+
+    def test_ingresar_montos_rechaza_la_suma(self):
+        calificacion = self.crear('SUM2')
+        self.entrar()
+        url = reverse('ingresar_montos', args=[calificacion.pk])
+        respuesta = self.client.post(url, {f'monto_{i}': '1' for i in range(8, 14)}).json()
+        self.assertFalse(respuesta['success'])
+        respuesta = self.client.post(url, {f'monto_{i}': '1' for i in range(8, 12)}).json()
+        self.assertTrue(respuesta['success'])
+        self.assertEqual(respuesta['factores']['factor_8'], '0.25000000')
@@ -0,0 +1,196 @@
+# calificaciones/trabajos.py
+# Cola local de cargas masivas respaldada por la tabla TrabajoCarga
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .auditoria import registrar
+from .carga_masiva import TAMANO_BLOQUE_CSV, cargar_archivo
+from .carga_paralela import cargar_archivo_paralelo, procesos_carga
+from .models import CalificacionTributaria, TrabajoCarga
+
+logger = logging.getLogger(__name__)
+
+# Días que se conserva el archivo de una carga con error (mientras tanto se puede reanudar)
+DIAS_RETENCION_ERROR = 30
+
+
+def encolar_carga(corredor, usuario, tipo, archivo, tamano_bloque=TAMANO_BLOQUE_CSV):
+    """
+    Guarda el archivo subido y deja el trabajo pendiente. Devuelve el TrabajoCarga creado.
+    """
+    return TrabajoCarga.objects.create(
+        corredor=corredor,
+        usuario=usuario,
+        tipo=tipo,
+        archivo=archivo,
+        nombre_archivo=archivo.name[:255],
+        tamano_bloque=tamano_bloque,
+    )
+
+
+def tomar_siguiente():
+    """
+    Reserva el trabajo pendiente más antiguo. SKIP LOCKED permite varios workers
+    en paralelo sin que dos tomen el mismo trabajo.
+    """
+    with transaction.atomic():
+        trabajo = (
+            TrabajoCarga.objects.select_for_update(skip_locked=True)
+            .filter(estado='PEN')
+            .order_by('id')
+            .first()
+        )
+        if trabajo is None:
+            return None
+        trabajo.estado = 'PRO'
+        trabajo.fecha_inicio = trabajo.latido = timezone.now()
+        trabajo.save(update_fields=['estado', 'fecha_inicio', 'latido'])
+        return trabajo
+
+
+def procesar_trabajo(trabajo):
+    """
+    Ejecuta la carga confirmando bloque a bloque. El progreso se guarda en la misma
+    transacción que cada bloque, así un trabajo fallido se retoma desde el último
+    bloque confirmado. Con CARGA_PROCESOS > 1 los bloques se preparan en paralelo.
+    """
+    def registrar_bloque(detalle):
+        TrabajoCarga.objects.filter(pk=trabajo.pk).update(
+            bloques_confirmados=detalle['bloque'],
+            filas_procesadas=F('filas_procesadas') + detalle['filas'],
+            creados=F('creados') + detalle['creados'],
+            actualizados=F('actualizados') + detalle['actualizados'],
+            sin_cambios=F('sin_cambios') + detalle['sin_cambios'],
+            latido=timezone.now(),
+        )
+
+    cargar = cargar_archivo_paralelo if procesos_carga() > 1 else cargar_archivo
+    try:
+        with trabajo.archivo.open('rb') as archivo:
+            cargar(
+                trabajo.corredor,
+                archivo,
+                trabajo.tipo,
+                tamano_bloque=trabajo.tamano_bloque,
+                al_procesar_bloque=registrar_bloque,
+                desde_bloque=trabajo.bloques_confirmados + 1,
+                confirmar_por_bloque=True,
+                carga_id=trabajo.pk,
+            )
+    except Exception as e:
+        logger.exception('Error en el trabajo de carga #%s', trabajo.pk)
+        TrabajoCarga.objects.filter(pk=trabajo.pk).update(estado='ERR', errores=str(e), fecha_fin=timezone.now())
+    else:
+        TrabajoCarga.objects.filter(pk=trabajo.pk).update(estado='OK', errores='', fecha_fin=timezone.now())
+        # Una carga completada ya no se reanuda: el archivo subido no se vuelve a leer
+        eliminar_archivo(trabajo)
+    trabajo.refresh_from_db()
+    # Una sola entrada de auditoría por carga, no una por fila
+    registrar(
+        trabajo.corredor, trabajo.usuario, 'CAR',
+        objeto=f'Trabajo #{trabajo.pk} {trabajo.nombre_archivo}',
+        detalle=(f'{trabajo.get_tipo_display()} - {trabajo.get_estado_display()}: '
+                 f'{trabajo.creados} creados, {trabajo.actualizados} actualizados, '
+                 f'{trabajo.sin_cambios} sin cambios. {trabajo.errores}').strip(),
+        cantidad=trabajo.filas_procesadas,
+    )
+    return trabajo
+
+
+def reanudar_trabajo(trabajo):
+    """
+    Devuelve a la cola un trabajo con error; continúa desde el último bloque confirmado.
+    Un trabajo 'En Proceso' solo se reanuda si su worker dejó de dar latidos por más de
+    CARGA_LEASE_SEGUNDOS (se cayó): si no, dos workers procesarían la misma carga.
+    Devuelve False si el trabajo no estaba en condiciones de reanudarse.
+    """
+    vencido = timezone.now() - timedelta(seconds=settings.CARGA_LEASE_SEGUNDOS)
+    abandonado = Q(estado='PRO') & (Q(latido__lt=vencido) | Q(latido__isnull=True, fecha_inicio__lt=vencido))
+    # Verificación y cambio en un solo UPDATE: dos pedidos simultáneos no lo encolan dos veces
+    return bool(
+        TrabajoCarga.objects.filter(Q(estado='ERR') | abandonado, pk=trabajo.pk)
+        .update(estado='PEN', errores='', fecha_fin=None, latido=None)
+    )
+
+
+def eliminar_archivo(trabajo):
+    """
+    Borra del almacenamiento el archivo subido del trabajo. Un error al borrar se registra
+    y no interrumpe al llamador; limpiar_archivos lo vuelve a intentar.
+    """
+    if not trabajo.archivo:
+        return False
+    try:
+        trabajo.archivo.delete(save=False)
+    except OSError:
+        logger.warning('No se pudo borrar el archivo del trabajo de carga #%s', trabajo.pk, exc_info=True)
+        return False
+    TrabajoCarga.objects.filter(pk=trabajo.pk).update(archivo='')
+    return True
+
+
+def limpiar_archivos(dias=DIAS_RETENCION_ERROR):
+    """
+    Borra los archivos que siguen guardados: los de cargas completadas o revertidas y los de
+    cargas con error terminadas hace más de `dias` (esas ya no se podrán reanudar).
+    Devuelve la cantidad de archivos borrados.
+    """
+    limite = timezone.now() - timedelta(days=dias)
+    trabajos = TrabajoCarga.objects.exclude(archivo='').filter(
+        Q(estado__in=('OK', 'REV')) | Q(estado='ERR', fecha_fin__lt=limite)
+    )
+    return sum(eliminar_archivo(trabajo) for trabajo in trabajos.iterator())
+
+
+def estado_trabajo(trabajo):
+    return {
+        'trabajo_id': trabajo.id,
+        'tipo': trabajo.tipo,
+        'archivo': trabajo.nombre_archivo,
+        'estado': trabajo.estado,
+        'estado_display': trabajo.get_estado_display(),
+        'bloques_confirmados': trabajo.bloques_confirmados,
+        'filas_procesadas': trabajo.filas_procesadas,
+        'creados': trabajo.creados,
+        'actualizados': trabajo.actualizados,
+        'sin_cambios': trabajo.sin_cambios,
+        'errores': trabajo.errores,
+        'terminado': trabajo.estado in ('OK', 'ERR', 'REV'),
+    }
+
+
+def listar_cargas(corredor, limite=50):
+    """
+    Últimas cargas del corredor con sus contadores, la duración del proceso y cuántas
+    calificaciones siguen marcadas por cada una (las que revertiría revertir_carga, salvo conflictos).
+    """
+    # Subquery correlacionado y no un GROUP BY sobre TrabajoCarga: Oracle no agrupa por columnas CLOB
+    marcadas = (
+        CalificacionTributaria.objects.filter(ultima_carga=OuterRef('pk')).order_by()
+        .values('ultima_carga').annotate(total=Count('id')).values('total')
+    )
+    trabajos = (
+        TrabajoCarga.objects.filter(corredor=corredor)
+        .annotate(filas_marcadas=Coalesce(Subquery(marcadas), 0))
+        .order_by('-fecha_creacion', '-id')[:limite]
+    )
+    return [
+        {
+            **estado_trabajo(trabajo),
+            'revertidos': trabajo.revertidos,
+            'filas_marcadas': trabajo.filas_marcadas,
+            'fecha_creacion': trabajo.fecha_creacion.isoformat(),
+            'fecha_inicio': trabajo.fecha_inicio.isoformat() if trabajo.fecha_inicio else None,
+            'fecha_fin': trabajo.fecha_fin.isoformat() if trabajo.fecha_fin else None,
+            'segundos': (round((trabajo.fecha_fin - trabajo.fecha_inicio).total_seconds(), 3)
+                         if trabajo.fecha_inicio and trabajo.fecha_fin else None),
+            'fecha_reversion': trabajo.fecha_reversion.isoformat() if trabajo.fecha_reversion else None,
+        }
+        for trabajo in trabajos
+    ]
@@ -1,25 +1,49 @@
 # calificaciones/urls.py
+from django.conf import settings
 from django.urls import path
 from . import views
 
+
+def _vista(sincrona, asincrona):
+    # Bajo ASGI las vistas AJAX del mantenedor van en su variante async; bajo WSGI la síncrona
+    # evita que Django envuelva cada request en async_to_sync
+    return asincrona if settings.SERVIDOR_ASGI else sincrona
+
+
 urlpatterns = [
     # CORRECCIÓN: La raíz de la app apunta al Mantenedor (no al login)
     path('', views.mantenedor_calificaciones, name='mantenedor'),
+    path('grilla/', views.grilla_calificaciones, name='grilla_calificaciones'),
+    path('instrumentos/', views.buscar_instrumentos_corredor, name='buscar_instrumentos'),
     
     # CRUD Operations
     path('ingresar/', views.ingresar_calificacion, name='ingresar_calificacion'),
-    path('ingresar-montos/<int:calificacion_id>/', views.ingresar_montos, name='ingresar_montos'),
-    path('guardar-factores/<int:calificacion_id>/', views.guardar_factores, name='guardar_factores'),
-    path('eliminar/<int:calificacion_id>/', views.eliminar_calificacion, name='eliminar_calificacion'),
-    path('obtener/<int:calificacion_id>/', views.obtener_calificacion_json, name='obtener_calificacion_json'),
+    path('ingresar-montos/<int:calificacion_id>/', _vista(views.ingresar_montos, views.aingresar_montos), name='ingresar_montos'),
+    path('guardar-factores/<int:calificacion_id>/', _vista(views.guardar_factores, views.aguardar_factores), name='guardar_factores'),
+    path('eliminar/<int:calificacion_id>/', _vista(views.eliminar_calificacion, views.aeliminar_calificacion), name='eliminar_calificacion'),
+    path('obtener/<int:calificacion_id>/', _vista(views.obtener_calificacion_json, views.aobtener_calificacion_json), name='obtener_calificacion_json'),
     path('modificar/<int:calificacion_id>/', views.modificar_calificacion, name='modificar_calificacion'),
+    path('historial/<int:calificacion_id>/', views.historial_calificacion, name='historial_calificacion'),
+    path('analitica/', views.analitica_calificaciones, name='analitica_calificaciones'),
+
+    # Operaciones por lote (varias calificaciones por request)
+    path('lote/obtener/', views.obtener_calificaciones_lote, name='obtener_calificaciones_lote'),
+    path('lote/modificar/', views.modificar_calificaciones_lote, name='modificar_calificaciones_lote'),
+    path('lote/guardar-factores/', views.guardar_factores_lote, name='guardar_factores_lote'),
+    path('lote/eliminar/', views.eliminar_calificaciones_lote, name='eliminar_calificaciones_lote'),
 
     # Carga Masiva
-    path('previsualizar-csv/', views.previsualizar_csv, name='previsualizar_csv'),
+    path('previsualizar-csv/', _vista(views.previsualizar_csv, views.aprevisualizar_csv), name='previsualizar_csv'),
     path('upload/factores/', views.carga_masiva_factores, name='carga_masiva_factores'),
     path('upload/montos/', views.carga_masiva_montos, name='carga_masiva_montos'),
+    path('cargas/<int:trabajo_id>/estado/', views.estado_carga, name='estado_carga'),
+    path('cargas/<int:trabajo_id>/reanudar/', views.reanudar_carga, name='reanudar_carga'),
+    path('cargas/', views.listado_cargas, name='listado_cargas'),
+    path('cargas/<int:trabajo_id>/revertir/', views.revertir_carga_corredor, name='revertir_carga'),
 
     # FUNCIONALIDAD REPORTES Y AUDITORÍA
     path('reporte/<str:formato>/', views.generar_reporte, name='generar_reporte'),
+    path('exportar/<str:formato>/', views.exportar_calificaciones, name='exportar_calificaciones'),
     path('auditoria/', views.registro_auditoria, name='registro_auditoria'), 
+    path('auditoria/exportar/', views.exportar_auditoria, name='exportar_auditoria'),
 ]
\ No newline at end of file
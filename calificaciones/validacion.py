@@ -0,0 +1,265 @@
+# calificaciones/validacion.py
+# Validación completa de un archivo de carga masiva sin tocar la base de datos
+import time
+
+import numpy as np
+import pandas as pd
+
+from .calculos import COLUMNAS_BASE, COLUMNAS_FACTOR, ESCALA_FACTOR, calcular_factores, escalar_matriz, montos_a_enteros
+from .carga_masiva import COLUMNAS_COMUNES, TIPOS_CARGA, detectar_decimal
+from .models import CalificacionTributaria
+
+# Filas por lectura: la validación es vectorizada por bloque, con memoria acotada
+TAMANO_BLOQUE_VALIDACION = 100_000
+# Errores que se detallan fila a fila (el resumen cuenta todos)
+MAX_ERRORES_DETALLE = 1000
+# Errores que se muestran en el mensaje de un bloque inválido durante una carga
+MAX_ERRORES_MENSAJE = 5
+# Filas que se nombran en la advertencia de claves repetidas
+MAX_LINEAS_ADVERTENCIA = 20
+
+COLUMNAS_OBLIGATORIAS = ['instrumento', 'fecha']
+MENSAJE_SUMA = 'La suma de los factores del 8 al 19 no puede ser mayor que 1.'
+_UNO = 10 ** ESCALA_FACTOR
+_PATRON_FECHA = r'^\d{4}-\d{1,2}-\d{1,2}$'
+
+
+class _Reporte:
+    def __init__(self, max_detalle):
+        self.max_detalle = max_detalle
+        self.resumen = {}
+        self.errores = []
+
+    def agregar(self, lineas, mascara, columna, mensaje, valores=None):
+        """
+        Registra el error en las filas marcadas por `mascara` (array booleano del bloque).
+        """
+        indices = np.flatnonzero(mascara)
+        if not len(indices):
+            return
+        clave = (columna, mensaje)
+        self.resumen[clave] = self.resumen.get(clave, 0) + len(indices)
+        restantes = self.max_detalle - len(self.errores)
+        for i in indices[:max(restantes, 0)]:
+            valor = None if valores is None else valores[i]
+            self.errores.append({
+                'fila': int(lineas[i]),
+                'columna': columna,
+                'mensaje': mensaje,
+                'valor': None if valor is None or pd.isna(valor) else str(valor),
+            })
+
+    def como_dict(self):
+        return {
+            'total_errores': sum(self.resumen.values()),
+            'resumen': [
+                {'columna': columna, 'mensaje': mensaje, 'cantidad': cantidad}
+                for (columna, mensaje), cantidad in self.resumen.items()
+            ],
+            'errores': sorted(self.errores, key=lambda e: (e['fila'], e['columna'])),
+        }
+
+
+def _numerico(serie, decimal):
+    """
+    Devuelve (valores float64, vacíos, inválidos) de una columna leída por pandas.
+    """
+    if serie.dtype.kind in 'iuf':
+        valores = serie.to_numpy(dtype=np.float64)
+        return valores, np.isnan(valores), np.zeros(len(serie), dtype=bool)
+    texto = serie.astype('string').str.strip()
+    vacios = (serie.isna() | (texto == '')).to_numpy()
+    invalidos = np.zeros(len(serie), dtype=bool)
+    if decimal == ',':
+        # Con coma decimal el cargador no acepta puntos
+        invalidos = texto.str.contains('.', regex=False).fillna(False).to_numpy(dtype=bool)
+        texto = texto.str.replace(',', '.', regex=False)
+    valores = pd.to_numeric(texto, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    invalidos |= np.isnan(valores) & ~vacios
+    return valores, vacios, invalidos
+
+
+def _validar_claves(df, lineas, reporte):
+    instrumento = df['instrumento'].astype('string')
+    vacio = (instrumento.isna() | (instrumento.str.strip() == '')).to_numpy(dtype=bool)
+    reporte.agregar(lineas, vacio, 'instrumento', 'Instrumento vacío.')
+    largo = CalificacionTributaria._meta.get_field('instrumento').max_length
+    reporte.agregar(lineas, (instrumento.str.len() > largo).fillna(False).to_numpy(dtype=bool),
+                    'instrumento', f'El instrumento supera {largo} caracteres.', instrumento.to_numpy())
+
+    texto_fecha = df['fecha'].astype('string').str.strip()
+    fechas = pd.to_datetime(texto_fecha.where(texto_fecha.str.match(_PATRON_FECHA)), format='%Y-%m-%d', errors='coerce')
+    fecha_invalida = fechas.isna().to_numpy()
+    reporte.agregar(lineas, fecha_invalida, 'fecha', 'Fecha inválida (formato AAAA-MM-DD).', df['fecha'].to_numpy())
+
+    # Hash de la clave (instrumento, fecha) para detectar duplicados en todo el archivo
+    validas = ~(vacio | fecha_invalida)
+    claves = pd.DataFrame({'instrumento': df['instrumento'][validas], 'fecha': fechas[validas]})
+    return pd.util.hash_pandas_object(claves, index=False).to_numpy(), lineas[validas]
+
+
+def _validar_comunes(df, lineas, decimal, reporte):
+    for columna in ('secuencia', 'numero_dividendo'):
+        if columna in df.columns:
+            valores, vacios, invalidos = _numerico(df[columna], decimal)
+            no_entero = ~(vacios | invalidos) & (valores != np.floor(valores))
+            reporte.agregar(lineas, vacios | invalidos | no_entero, columna, 'Debe ser un número entero.', df[columna].to_numpy())
+    if 'tipo_sociedad' in df.columns:
+        opciones = [clave for clave, _ in CalificacionTributaria._meta.get_field('tipo_sociedad').choices]
+        invalido = ~df['tipo_sociedad'].isin(opciones).to_numpy()
+        reporte.agregar(lineas, invalido, 'tipo_sociedad', f'Tipo de sociedad inválido (use {", ".join(opciones)}).',
+                        df['tipo_sociedad'].to_numpy())
+    if 'valor_historico' in df.columns:
+        campo = CalificacionTributaria._meta.get_field('valor_historico')
+        valores, vacios, invalidos = _numerico(df['valor_historico'], decimal)
+        reporte.agregar(lineas, vacios | invalidos, 'valor_historico', 'Valor histórico vacío o no numérico.',
+                        df['valor_historico'].to_numpy())
+        excede = ~(vacios | invalidos) & (np.abs(valores) >= 10.0 ** (campo.max_digits - campo.decimal_places))
+        reporte.agregar(lineas, excede, 'valor_historico',
+                        f'El valor histórico supera {campo.max_digits - campo.decimal_places} dígitos enteros.',
+                        df['valor_historico'].to_numpy())
+
+
+def _validar_valores(df, lineas, tipo, decimal, reporte):
+    """
+    Columnas de montos o factores. Devuelve la matriz (N, 30) de factores escalados por 10**8
+    y la máscara (N, 30) de los factores que se pueden revisar: en una carga de factores cada
+    celda numérica; en una de montos, las filas con todos los montos válidos.
+    """
+    columnas = TIPOS_CARGA[tipo][0]
+    matriz = np.zeros((len(df), len(columnas)), dtype=np.float64)
+    celdas_validas = np.ones(matriz.shape, dtype=bool)
+    nombre = 'Factor' if tipo == 'FAC' else 'Monto'
+    for j, columna in enumerate(columnas):
+        if columna not in df.columns:
+            continue
+        valores, vacios, invalidos = _numerico(df[columna], decimal)
+        reporte.agregar(lineas, vacios, columna, f'{nombre} vacío.')
+        reporte.agregar(lineas, invalidos, columna, f'{nombre} no numérico.', df[columna].to_numpy())
+        celdas_validas[:, j] = ~(vacios | invalidos)
+        matriz[:, j] = np.where(celdas_validas[:, j], valores, 0.0)
+
+    if tipo == 'FAC':
+        # Mismo redondeo a 8 decimales que aplica el campo DecimalField al guardar
+        # (el recorte solo evita desbordes: todo lo que supera 1 ya está fuera de rango)
+        return escalar_matriz(np.clip(matriz, -2, 2)), celdas_validas
+
+    filas_validas = celdas_validas.all(axis=1)
+    factores = np.zeros((len(df), len(COLUMNAS_FACTOR)), dtype=np.int64)
+    if filas_validas.any():
+        calculados = calcular_factores(montos_a_enteros(pd.DataFrame(matriz[filas_validas], columns=columnas)))
+        if calculados.dtype == object:
+            factores = factores.astype(object)
+        factores[filas_validas] = calculados
+    return factores, np.repeat(filas_validas[:, None], len(COLUMNAS_FACTOR), axis=1)
+
+
+def _validar_factores(factores, validos, lineas, tipo, reporte):
+    # Validadores del modelo (0..1) y la regla de CalificacionTributaria.clean
+    origen = '' if tipo == 'FAC' else ' (calculado desde los montos)'
+    for j, columna in enumerate(COLUMNAS_FACTOR):
+        fuera = validos[:, j] & ((factores[:, j] < 0) | (factores[:, j] > _UNO))
+        reporte.agregar(lineas, fuera, columna, f'Factor fuera de rango (0 a 1){origen}.', factores[:, j] / _UNO)
+    # Sin tolerancia: los factores calculados desde montos pueden pasar de 1 por el redondeo a 8
+    # decimales, y esas filas tampoco pasarían clean() (la carga las rechaza igual que aquí)
+    suma = factores[:, :COLUMNAS_BASE].sum(axis=1)
+    reporte.agregar(lineas, validos[:, :COLUMNAS_BASE].all(axis=1) & (suma > _UNO), 'factor_8..factor_19',
+                    f'{MENSAJE_SUMA[:-1]}{origen}.', suma / _UNO)
+
+
+def _validar_df(df, lineas, tipo, decimal, reporte):
+    # Todas las reglas por fila; devuelve los hashes de clave para detectar repetidas en el archivo
+    claves = _validar_claves(df, lineas, reporte)
+    _validar_comunes(df, lineas, decimal, reporte)
+    factores, validos = _validar_valores(df, lineas, tipo, decimal, reporte)
+    _validar_factores(factores, validos, lineas, tipo, reporte)
+    return claves
+
+
+def validar_bloque(df, tipo, decimal, primera_linea=2, max_detalle=MAX_ERRORES_DETALLE):
+    """
+    Valida un bloque ya leído del archivo con las mismas reglas por fila que validar_archivo.
+    `primera_linea` es la línea del archivo de su primera fila. Devuelve el reporte del bloque.
+    """
+    reporte = _Reporte(max_detalle)
+    _validar_df(df, np.arange(len(df)) + primera_linea, tipo, decimal, reporte)
+    return reporte.como_dict()
+
+
+def verificar_bloque(df, tipo, decimal, numero, primera_linea):
+    """
+    Lo que hacen las cargas antes de escribir cada bloque: lanza ValueError con los primeros
+    errores si el bloque `numero` no pasa validar_bloque.
+    """
+    resultado = validar_bloque(df, tipo, decimal, primera_linea, MAX_ERRORES_MENSAJE)
+    if resultado['total_errores']:
+        detalle = '; '.join(f"fila {e['fila']}, {e['columna']}: {e['mensaje'].rstrip('.')}" for e in resultado['errores'])
+        raise ValueError(f'{resultado["total_errores"]} errores de validación en el bloque {numero}: {detalle}')
+
+
+def validar_archivo(archivo, tipo, tamano_bloque=TAMANO_BLOQUE_VALIDACION, max_detalle=MAX_ERRORES_DETALLE):
+    """
+    Valida el archivo completo de una carga `tipo` ('FAC' o 'MON') sin escribir en la base.
+    Revisa columnas obligatorias, números, rangos de factores y la suma de factores 8..19. Las
+    claves (instrumento, fecha) repetidas no son error (la carga conserva la última aparición)
+    pero se informan en las advertencias. Devuelve un reporte con el resumen de errores y el
+    detalle por fila (número de línea del archivo, contando el encabezado como línea 1).
+    """
+    inicio = time.perf_counter()
+    reporte = _Reporte(max_detalle)
+    columnas_valor = TIPOS_CARGA[tipo][0]
+    permitidas = set(COLUMNAS_COMUNES) | set(columnas_valor)
+    decimal = detectar_decimal(archivo)
+    advertencias = []
+    hashes, lineas_claves = [], []
+    total = 0
+    try:
+        lector = pd.read_csv(
+            archivo,
+            sep=';',
+            decimal=decimal,
+            usecols=lambda col: col in permitidas,
+            dtype={'instrumento': str, 'fecha': str, 'tipo_sociedad': str, 'valor_historico': str},
+            chunksize=tamano_bloque,
+        )
+    except pd.errors.EmptyDataError:
+        lector = []
+        reporte.resumen[('', 'El archivo está vacío.')] = 1
+    for df in lector:
+        if total == 0:
+            faltantes = [col for col in COLUMNAS_OBLIGATORIAS if col not in df.columns]
+            if faltantes:
+                reporte.resumen[(', '.join(faltantes), 'Faltan columnas obligatorias.')] = 1
+                break
+            sin_valores = [col for col in columnas_valor if col not in df.columns]
+            if sin_valores:
+                advertencias.append(f'Columnas ausentes (se cargarán en 0): {", ".join(sin_valores)}.')
+        lineas = np.arange(total, total + len(df)) + 2
+        total += len(df)
+
+        claves, lineas_validas = _validar_df(df, lineas, tipo, decimal, reporte)
+        hashes.append(claves)
+        lineas_claves.append(lineas_validas)
+
+    if hashes:
+        claves = pd.DataFrame({'clave': np.concatenate(hashes), 'linea': np.concatenate(lineas_claves)})
+        ultima = claves.groupby('clave')['linea'].transform('max').to_numpy()
+        reemplazadas = claves['linea'].to_numpy()[claves['linea'].to_numpy() != ultima]
+        if len(reemplazadas):
+            ejemplos = ', '.join(str(linea) for linea in np.sort(reemplazadas)[:MAX_LINEAS_ADVERTENCIA])
+            advertencias.append(
+                f'{len(reemplazadas)} filas repiten una clave (instrumento, fecha) que aparece más abajo en el '
+                f'archivo; la carga conserva la última aparición y no escribe estas filas (filas {ejemplos}'
+                f'{", ..." if len(reemplazadas) > MAX_LINEAS_ADVERTENCIA else ""}).'
+            )
+
+    resultado = reporte.como_dict()
+    return {
+        'valido': resultado['total_errores'] == 0,
+        'tipo': tipo,
+        'filas': total,
+        'decimal': decimal,
+        **resultado,
+        'advertencias': advertencias,
+        'segundos': round(time.perf_counter() - inicio, 3),
+    }
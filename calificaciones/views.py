@@ -1,16 +1,98 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.urls import reverse
+from django.db import IntegrityError, transaction
+from django.utils import dateformat, formats, timezone
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponseForbidden, HttpResponse
-from django.forms.models import model_to_dict
+from django.http import JsonResponse, HttpResponseForbidden, StreamingHttpResponse, FileResponse
 from django.contrib.auth.decorators import login_required
-from django.contrib.admin.models import LogEntry # <--- ¡NUEVO! Para la vista de Auditoría
-from .forms import CargaCSVForm, FiltroCalificacionesForm, IngresoBasicoForm, IngresoMontosForm, IngresoFactoresForm
-from .models import CalificacionTributaria, Corredor
+from .forms import CargaCSVForm, FiltroAuditoriaForm, FiltroCalificacionesForm, IngresoBasicoForm, IngresoMontosForm, IngresoFactoresForm
+from .models import CalificacionTributaria, Corredor, RegistroAuditoria, TrabajoCarga
+from .auditoria import CAMPOS_AUDITORIA, ORDEN_AUDITORIA, filtrar_registros, pagina_auditoria, registrar_calificacion
+from .busqueda import LIMITE_SUGERENCIAS, buscar_instrumentos
+from .cache_corredor import invalidar_corredor, obtener_o_calcular
+from .calculos import COLUMNAS_BASE, COLUMNAS_FACTOR, COLUMNAS_MONTO, ESCALA_FACTOR, factores_desde_dataframe, fila_a_factores
+from .historial import (
+    calificacion_en_fecha, cambios_calificacion, registrar_creacion, registrar_eliminacion, registrar_modificacion,
+    valores_calificacion,
+)
+from .empaquetado import empaquetado_activo, texto_factor, vectores_factores
+from .consultas import TAMANO_PAGINA, TAMANOS_PAGINA, aplicar_filtros, pagina_keyset
+from .exportacion import (
+    FORMATOS_EXPORTACION, TAMANO_LECTURA, consulta_exportacion, formatos_disponibles, generar_csv, generar_exportacion,
+    generar_xlsx, leer_marca, marca_exportacion,
+)
+from .reporte_pdf import reporte_pdf
+from .resumenes import CLAVE as CLAVE_RESUMEN, ajustar_resumen, consultar_resumen
+from .serializacion import SERIALIZADOR_CALIFICACION
+from .reversion import revertir_carga
+from .trabajos import encolar_carga, estado_trabajo, listar_cargas, reanudar_trabajo
+from .validacion import validar_archivo
+from . import lotes
+import json
 import pandas as pd
+from datetime import date, datetime, time
 from decimal import Decimal, InvalidOperation
 
+# La clave (corredor, instrumento, fecha) es única
+MENSAJE_DUPLICADO = 'Error: Ya existe una calificación para ese instrumento y fecha.'
+
+# Nombres cortos de los factores para encabezados (grilla y reportes)
+NOMBRES_FACTORES = {
+    'factor_8': 'Créd. DPC s/d', 'factor_9': 'Créd. DPC Acum.', 'factor_10': 'Créd. DPC Vol.',
+    'factor_11': 'Créd. s/d Acum.', 'factor_12': 'Rentas Prov.', 'factor_13': 'Otras Rentas',
+    'factor_14': 'Distr. Desprop.', 'factor_15': 'Util. Afectas', 'factor_16': 'Rentas Gen.',
+    'factor_17': 'Rentas Exentas (IGC)', 'factor_18': 'Rentas Exentas (IA)', 'factor_19': 'Ing. No Renta',
+    'factor_20': 'No Sujetos (Sin/d) H. 31.12.2019', 'factor_21': 'No Sujetos (Con/d) H. 31.12.2019',
+    'factor_22': 'No Sujetos (Sin/d) A. 01.01.2020', 'factor_23': 'No Sujetos (Con/d) A. 01.01.2020',
+    'factor_24': 'Sujeto Rest. (Sin/d)', 'factor_25': 'Sujeto Rest. (Con/d)',
+    'factor_26': 'Sujeto Rest. Sin derecho', 'factor_27': 'Sujeto Rest. Con derecho',
+    'factor_28': 'Crédito IPE', 'factor_29': 'Asoc. Rentas (Sin/d)', 'factor_30': 'Asoc. Rentas (Con/d)',
+    'factor_31': 'Asoc. Rentas Exentas (Sin)', 'factor_32': 'Asoc. Rentas Exentas (Con)',
+    'factor_33': 'Crédito por IPE (Asoc.)', 'factor_34': 'Tasa Efectiva', 'factor_35': 'Tasa Efectiva (Rest.)',
+    'factor_36': 'Tasa Efectiva (Acum.)', 'factor_37': 'Tasa Efectiva (Art. 20)',
+}
+
+# Columnas que la grilla puede pedir (id, fecha e instrumento van siempre)
+COLUMNAS_GRILLA = [
+    'descripcion_dividendo', 'secuencia', 'acogido_isfut', 'origen', 'fuente_ingreso',
+    'factor_actualizacion', 'fecha_modificacion', *COLUMNAS_FACTOR,
+]
+
+INDICE_FACTOR = {columna: j for j, columna in enumerate(COLUMNAS_FACTOR)}
+
+# Columnas de los reportes descargables, en orden
+CAMPOS_REPORTE = [
+    'fecha', 'instrumento', 'secuencia', 'numero_dividendo', 'tipo_mercado', 'descripcion_dividendo',
+    'tipo_sociedad', 'valor_historico', 'acogido_isfut', 'instrumento_no_inscrito', 'origen',
+    'fuente_ingreso', 'factor_actualizacion', 'fecha_modificacion', *COLUMNAS_FACTOR,
+]
+
+
+# En el PDF no caben todas: datos de identificación y los factores (en líneas de 10 bajo cada fila)
+CAMPOS_REPORTE_PDF = [
+    'fecha', 'instrumento', 'secuencia', 'numero_dividendo', 'tipo_mercado', 'origen', *COLUMNAS_FACTOR,
+]
+
+
+def encabezados_reporte(campos=CAMPOS_REPORTE):
+    opts = CalificacionTributaria._meta
+    return [NOMBRES_FACTORES.get(campo) or str(opts.get_field(campo).verbose_name) for campo in campos]
+
 # --- Decorador de ayuda para verificar si el usuario es un corredor ---
 def corredor_requerido(view_func):
+    if iscoroutinefunction(view_func):
+        @login_required
+        async def _wrapped_async_view(request, *args, **kwargs):
+            # En una vista async request.user consultaría la base de forma síncrona: se usa auser()
+            usuario = await request.auser()
+            corredor = await Corredor.objects.filter(usuario=usuario).afirst()
+            if corredor is None:
+                return HttpResponseForbidden("Acceso denegado. No está vinculado a un corredor.")
+            usuario.corredor = corredor  # Queda en caché: usuario.corredor ya no consulta la base
+            return await view_func(request, *args, **kwargs)
+        return _wrapped_async_view
+
     @login_required
     def _wrapped_view(request, *args, **kwargs):
         if not hasattr(request.user, 'corredor'):
@@ -19,6 +101,22 @@ def corredor_requerido(view_func):
         return view_func(request, *args, **kwargs)
     return _wrapped_view
 
+# Las vistas AJAX del mantenedor tienen una variante síncrona y una async (prefijo a). urls.py
+# enruta la async solo bajo ASGI (SERVIDOR_ASGI); bajo WSGI la síncrona se ejecuta directo en el
+# hilo del servidor, sin pasar por async_to_sync en cada request
+def _tabla_previsualizacion(archivo):
+    # Primeras filas del archivo; si trae montos se agregan los factores calculados
+    df = pd.read_csv(archivo, sep=';', nrows=5)
+
+    if 'monto_8' in df.columns:
+        factores = factores_desde_dataframe(df)
+        for j, col_monto in enumerate(COLUMNAS_MONTO):
+            if col_monto in df.columns:
+                df[f'{COLUMNAS_FACTOR[j]} (calc)'] = factores[:, j].astype(float) / 10 ** ESCALA_FACTOR
+
+    return df.to_html(classes=['table', 'table-sm', 'table-bordered'], index=False)
+
+
 @corredor_requerido
 def previsualizar_csv(request):
     if request.method == 'POST':
@@ -26,23 +124,7 @@ def previsualizar_csv(request):
         form = CargaCSVForm(request.POST, request.FILES)
         if form.is_valid():
             try:
-                archivo = request.FILES['archivo_csv']
-                df = pd.read_csv(archivo, sep=';', nrows=5)
-                
-                if 'monto_8' in df.columns:
-                    monto_cols_base = [f'monto_{i}' for i in range(8, 20) if f'monto_{i}' in df.columns]
-                    df['suma_base'] = df[monto_cols_base].sum(axis=1)
-                    for i in range(8, 38):
-                        col_monto = f'monto_{i}'
-                        col_factor = f'factor_{i} (calc)'
-                        if col_monto in df.columns:
-                            df[col_factor] = df.apply(
-                                lambda row, m=col_monto: (row[m] / row['suma_base']) if row['suma_base'] > 0 else 0, 
-                                axis=1
-                            ).round(8)
-                    df = df.drop(columns=['suma_base'], errors='ignore')
-                
-                tabla_html = df.to_html(classes=['table', 'table-sm', 'table-bordered'], index=False)
+                tabla_html = _tabla_previsualizacion(request.FILES['archivo_csv'])
                 return JsonResponse({'success': True, 'tabla_html': tabla_html})
             except Exception as e:
                 return JsonResponse({'success': False, 'errors': f'Error al leer el archivo: {e}'})
@@ -51,6 +133,32 @@ def previsualizar_csv(request):
     return JsonResponse({'success': False, 'errors': 'Método no permitido'})
 
 
+@corredor_requerido
+async def aprevisualizar_csv(request):
+    if request.method == 'POST':
+        form = CargaCSVForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                # Leer y calcular es CPU: va a un hilo del pool y no bloquea el event loop. No toca la
+                # base, así que no necesita el hilo síncrono compartido del request
+                tabla_html = await sync_to_async(_tabla_previsualizacion, thread_sensitive=False)(request.FILES['archivo_csv'])
+                return JsonResponse({'success': True, 'tabla_html': tabla_html})
+            except Exception as e:
+                return JsonResponse({'success': False, 'errors': f'Error al leer el archivo: {e}'})
+        else:
+            return JsonResponse({'success': False, 'errors': form.errors.as_json()})
+    return JsonResponse({'success': False, 'errors': 'Método no permitido'})
+
+
+def _respuesta_validacion(archivo, tipo):
+    # Modo "solo validar": revisa el archivo completo y devuelve el reporte sin cargar nada
+    try:
+        reporte = validar_archivo(archivo, tipo)
+    except Exception as e:
+        return JsonResponse({'success': False, 'errors': f'No se pudo leer el archivo: {e}'})
+    return JsonResponse({'success': True, 'validacion': reporte})
+
+
 # --- Vista de: CARGA MASIVA DE FACTORES ---
 @corredor_requerido
 def carga_masiva_factores(request):
@@ -59,57 +167,17 @@ def carga_masiva_factores(request):
         if form.is_valid():
             archivo = request.FILES['archivo_csv']
             corredor = request.user.corredor
+            if request.POST.get('solo_validar'):
+                return _respuesta_validacion(archivo, 'FAC')
             try:
-                df = pd.read_csv(archivo, sep=';') 
-                registros_creados = 0
-                registros_actualizados = 0
-                for index, row in df.iterrows():
-                    calificacion, created = CalificacionTributaria.objects.update_or_create(
-                        corredor=corredor,
-                        instrumento=row['instrumento'],
-                        fecha=row['fecha'],
-                        defaults={
-                            'secuencia': row.get('secuencia', 0),
-                            'numero_dividendo': row.get('numero_dividendo', 0),
-                            'tipo_sociedad': row.get('tipo_sociedad', 'A'),
-                            'valor_historico': Decimal(str(row.get('valor_historico', '0.0')).replace(',', '.')),
-                            'instrumento_no_inscrito': bool(row.get('instrumento_no_inscrito', False)),
-                            'fuente_ingreso': 'FAC',
-                            'factor_8': Decimal(str(row.get('factor_8', '0.0')).replace(',', '.')),
-                            'factor_9': Decimal(str(row.get('factor_9', '0.0')).replace(',', '.')),
-                            'factor_10': Decimal(str(row.get('factor_10', '0.0')).replace(',', '.')),
-                            'factor_11': Decimal(str(row.get('factor_11', '0.0')).replace(',', '.')),
-                            'factor_12': Decimal(str(row.get('factor_12', '0.0')).replace(',', '.')),
-                            'factor_13': Decimal(str(row.get('factor_13', '0.0')).replace(',', '.')),
-                            'factor_14': Decimal(str(row.get('factor_14', '0.0')).replace(',', '.')),
-                            'factor_15': Decimal(str(row.get('factor_15', '0.0')).replace(',', '.')),
-                            'factor_16': Decimal(str(row.get('factor_16', '0.0')).replace(',', '.')),
-                            'factor_17': Decimal(str(row.get('factor_17', '0.0')).replace(',', '.')),
-                            'factor_18': Decimal(str(row.get('factor_18', '0.0')).replace(',', '.')),
-                            'factor_19': Decimal(str(row.get('factor_19', '0.0')).replace(',', '.')),
-                            'factor_20': Decimal(str(row.get('factor_20', '0.0')).replace(',', '.')),
-                            'factor_21': Decimal(str(row.get('factor_21', '0.0')).replace(',', '.')),
-                            'factor_22': Decimal(str(row.get('factor_22', '0.0')).replace(',', '.')),
-                            'factor_23': Decimal(str(row.get('factor_23', '0.0')).replace(',', '.')),
-                            'factor_24': Decimal(str(row.get('factor_24', '0.0')).replace(',', '.')),
-                            'factor_25': Decimal(str(row.get('factor_25', '0.0')).replace(',', '.')),
-                            'factor_26': Decimal(str(row.get('factor_26', '0.0')).replace(',', '.')),
-                            'factor_27': Decimal(str(row.get('factor_27', '0.0')).replace(',', '.')),
-                            'factor_28': Decimal(str(row.get('factor_28', '0.0')).replace(',', '.')),
-                            'factor_29': Decimal(str(row.get('factor_29', '0.0')).replace(',', '.')),
-                            'factor_30': Decimal(str(row.get('factor_30', '0.0')).replace(',', '.')),
-                            'factor_31': Decimal(str(row.get('factor_31', '0.0')).replace(',', '.')),
-                            'factor_32': Decimal(str(row.get('factor_32', '0.0')).replace(',', '.')),
-                            'factor_33': Decimal(str(row.get('factor_33', '0.0')).replace(',', '.')),
-                            'factor_34': Decimal(str(row.get('factor_34', '0.0')).replace(',', '.')),
-                            'factor_35': Decimal(str(row.get('factor_35', '0.0')).replace(',', '.')),
-                            'factor_36': Decimal(str(row.get('factor_36', '0.0')).replace(',', '.')),
-                            'factor_37': Decimal(str(row.get('factor_37', '0.0')).replace(',', '.')),
-                        }
-                    )
-                    if created: registros_creados += 1
-                    else: registros_actualizados += 1
-                return JsonResponse({'success': True, 'message': f'Archivo de factores procesado. Se crearon {registros_creados} y se actualizaron {registros_actualizados} registros.'})
+                # El archivo se procesa en segundo plano (manage.py procesar_cargas)
+                trabajo = encolar_carga(corredor, request.user, 'FAC', archivo)
+                return JsonResponse({
+                    'success': True,
+                    'trabajo_id': trabajo.id,
+                    'url_estado': reverse('estado_carga', args=[trabajo.id]),
+                    'message': f'Archivo de factores recibido. Se está procesando (trabajo #{trabajo.id}).'
+                })
             except Exception as e:
                 return JsonResponse({'success': False, 'errors': f'Ocurrió un error al procesar el archivo: {e}'})
         else:
@@ -125,37 +193,17 @@ def carga_masiva_montos(request):
         if form.is_valid():
             archivo = request.FILES['archivo_csv']
             corredor = request.user.corredor
+            if request.POST.get('solo_validar'):
+                return _respuesta_validacion(archivo, 'MON')
             try:
-                df = pd.read_csv(archivo, sep=';')
-                registros_creados = 0
-                registros_actualizados = 0
-                for index, row in df.iterrows():
-                    suma_base = sum(Decimal(str(row.get(f'monto_{i}', '0.0')).replace(',', '.')) for i in range(8, 20))
-                    factores_calculados = {}
-                    if suma_base > 0:
-                        for i in range(8, 38):
-                            monto_actual = Decimal(str(row.get(f'monto_{i}', '0.0')).replace(',', '.'))
-                            factores_calculados[f'factor_{i}'] = (monto_actual / suma_base)
-                    else:
-                        for i in range(8, 38):
-                            factores_calculados[f'factor_{i}'] = Decimal('0.0')
-                    calificacion, created = CalificacionTributaria.objects.update_or_create(
-                        corredor=corredor,
-                        instrumento=row['instrumento'],
-                        fecha=row['fecha'],
-                        defaults={
-                            'secuencia': row.get('secuencia', 0),
-                            'numero_dividendo': row.get('numero_dividendo', 0),
-                            'tipo_sociedad': row.get('tipo_sociedad', 'A'),
-                            'valor_historico': Decimal(str(row.get('valor_historico', '0.0')).replace(',', '.')),
-                            'instrumento_no_inscrito': bool(row.get('instrumento_no_inscrito', False)),
-                            'fuente_ingreso': 'MON',
-                            **factores_calculados
-                        }
-                    )
-                    if created: registros_creados += 1
-                    else: registros_actualizados += 1
-                return JsonResponse({'success': True, 'message': f'Archivo de montos procesado. Se crearon {registros_creados} y se actualizaron {registros_actualizados} registros.'})
+                # El archivo se procesa en segundo plano (manage.py procesar_cargas)
+                trabajo = encolar_carga(corredor, request.user, 'MON', archivo)
+                return JsonResponse({
+                    'success': True,
+                    'trabajo_id': trabajo.id,
+                    'url_estado': reverse('estado_carga', args=[trabajo.id]),
+                    'message': f'Archivo de montos recibido. Se está procesando (trabajo #{trabajo.id}).'
+                })
             except Exception as e:
                 return JsonResponse({'success': False, 'errors': f'Ocurrió un error al procesar el archivo: {e}'})
         else:
@@ -163,46 +211,63 @@ def carga_masiva_montos(request):
     return JsonResponse({'success': False, 'errors': 'Método no permitido'})
 
 
+# --- Vista de: ESTADO DE UNA CARGA MASIVA (consultada periódicamente por el mantenedor) ---
+@corredor_requerido
+def estado_carga(request, trabajo_id):
+    if request.method == 'GET':
+        trabajo = get_object_or_404(TrabajoCarga, id=trabajo_id, corredor=request.user.corredor)
+        return JsonResponse({'success': True, 'data': estado_trabajo(trabajo)})
+    return JsonResponse({'success': False, 'errors': 'Método no permitido'})
+
+
+# --- Vista de: REANUDAR UNA CARGA CON ERROR (continúa desde el último bloque confirmado) ---
+@corredor_requerido
+def reanudar_carga(request, trabajo_id):
+    if request.method == 'POST':
+        trabajo = get_object_or_404(TrabajoCarga, id=trabajo_id, corredor=request.user.corredor)
+        if reanudar_trabajo(trabajo):
+            return JsonResponse({'success': True, 'trabajo_id': trabajo.id, 'url_estado': reverse('estado_carga', args=[trabajo.id])})
+        return JsonResponse({'success': False, 'errors': 'La carga no tiene error o sigue en proceso.'})
+    return JsonResponse({'success': False, 'errors': 'Método no permitido'})
+
+
+# --- Vista de: LISTADO DE CARGAS MASIVAS DEL CORREDOR (contadores, tiempos y filas marcadas) ---
+@corredor_requerido
+def listado_cargas(request):
+    if request.method == 'GET':
+        return JsonResponse({'success': True, 'data': listar_cargas(request.user.corredor)})
+    return JsonResponse({'success': False, 'errors': 'Método no permitido'})
+
+
+# --- Vista de: REVERTIR UNA CARGA COMPLETA (vuelve las filas de la carga a sus valores anteriores) ---
+@corredor_requerido
+def revertir_carga_corredor(request, trabajo_id):
+    if request.method == 'POST':
+        trabajo = get_object_or_404(TrabajoCarga, id=trabajo_id, corredor=request.user.corredor)
+        try:
+            resultado = revertir_carga(trabajo, request.user)
+        except ValueError as e:
+            return JsonResponse({'success': False, 'errors': str(e)})
+        return JsonResponse({'success': True, 'message': 'Carga revertida.', 'data': resultado})
+    return JsonResponse({'success': False, 'errors': 'Método no permitido'})
+
+
 # --- Vista de: MANTENEDOR PRINCIPAL ---
 @login_required #para proteger la vista, se pide autenticación
 def mantenedor_calificaciones(request):
 
-    try:
-        corredor_actual = request.user.corredor
-        calificaciones = CalificacionTributaria.objects.filter(corredor=corredor_actual).order_by('-fecha')
-    except Corredor.DoesNotExist:
+    # Las filas ya no se renderizan aquí: la grilla las pide por páginas a grilla_calificaciones
+    if not hasattr(request.user, 'corredor'):
         # Si el usuario no es un corredor (ej. es un superadmin sin vínculo)
-        calificaciones = CalificacionTributaria.objects.none() # No se muestra nada
         messages.warning(request, "Tu usuario no está vinculado a ningún corredor. Contacta al administrador.")
 
     filtro_form = FiltroCalificacionesForm(request.GET)
-    if filtro_form.is_valid():
-        tipo_mercado = filtro_form.cleaned_data.get('tipo_mercado')
-        origen = filtro_form.cleaned_data.get('origen')
-        periodo_comercial = filtro_form.cleaned_data.get('periodo_comercial')
-        if tipo_mercado: calificaciones = calificaciones.filter(tipo_mercado=tipo_mercado)
-        if origen: calificaciones = calificaciones.filter(origen=origen)
-        if periodo_comercial: calificaciones = calificaciones.filter(fecha__year=periodo_comercial)
     
     ingreso_form = IngresoBasicoForm()
     montos_form = IngresoMontosForm()
     factores_form = IngresoFactoresForm()
     carga_csv_form = CargaCSVForm()
 
-    nombres_factores = {
-        'factor_8': 'Créd. DPC s/d', 'factor_9': 'Créd. DPC Acum.', 'factor_10': 'Créd. DPC Vol.',
-        'factor_11': 'Créd. s/d Acum.', 'factor_12': 'Rentas Prov.', 'factor_13': 'Otras Rentas',
-        'factor_14': 'Distr. Desprop.', 'factor_15': 'Util. Afectas', 'factor_16': 'Rentas Gen.',
-        'factor_17': 'Rentas Exentas (IGC)', 'factor_18': 'Rentas Exentas (IA)', 'factor_19': 'Ing. No Renta',
-        'factor_20': 'No Sujetos (Sin/d) H. 31.12.2019', 'factor_21': 'No Sujetos (Con/d) H. 31.12.2019',
-        'factor_22': 'No Sujetos (Sin/d) A. 01.01.2020', 'factor_23': 'No Sujetos (Con/d) A. 01.01.2020',
-        'factor_24': 'Sujeto Rest. (Sin/d)', 'factor_25': 'Sujeto Rest. (Con/d)',
-        'factor_26': 'Sujeto Rest. Sin derecho', 'factor_27': 'Sujeto Rest. Con derecho',
-        'factor_28': 'Crédito IPE', 'factor_29': 'Asoc. Rentas (Sin/d)', 'factor_30': 'Asoc. Rentas (Con/d)',
-        'factor_31': 'Asoc. Rentas Exentas (Sin)', 'factor_32': 'Asoc. Rentas Exentas (Con)',
-        'factor_33': 'Crédito por IPE (Asoc.)', 'factor_34': 'Tasa Efectiva', 'factor_35': 'Tasa Efectiva (Rest.)',
-        'factor_36': 'Tasa Efectiva (Acum.)', 'factor_37': 'Tasa Efectiva (Art. 20)',
-    }
 
     context = {
         'form': filtro_form,
@@ -210,12 +275,94 @@ def mantenedor_calificaciones(request):
         'montos_form': montos_form,
         'factores_form': factores_form,
         'carga_csv_form': carga_csv_form,
-        'calificaciones': calificaciones,
-        'nombres_factores': nombres_factores
+        'nombres_factores': NOMBRES_FACTORES,
+        'tamanos_pagina': TAMANOS_PAGINA,
+        'tamano_pagina': TAMANO_PAGINA,
     }
     return render(request, 'calificaciones/mantenedor.html', context)
 
 
+# --- VISTA de: GRILLA PAGINADA (JSON) ---
+def _celda_grilla(calificacion, columna):
+    valor = getattr(calificacion, columna)
+    if columna in ('origen', 'fuente_ingreso'):
+        return getattr(calificacion, f'get_{columna}_display')()
+    if columna == 'fecha_modificacion':
+        return dateformat.format(timezone.localtime(valor), 'd-m-Y H:i')
+    if columna == 'acogido_isfut':
+        return 'Sí' if valor else 'No'
+    if valor is None:
+        return ''
+    if isinstance(valor, Decimal):
+        # Notación fija, igual que texto_factor: str() daría '1E-8' para los factores muy chicos
+        return format(valor, 'f')
+    return str(valor)
+
+
+@corredor_requerido
+def grilla_calificaciones(request):
+    if request.method == 'GET':
+        try:
+            tamano = int(request.GET.get('tamano', TAMANO_PAGINA))
+        except ValueError:
+            tamano = TAMANO_PAGINA
+        if tamano not in TAMANOS_PAGINA:
+            tamano = TAMANO_PAGINA
+        columnas = [c for c in request.GET.get('columnas', '').split(',') if c in COLUMNAS_GRILLA] or COLUMNAS_GRILLA
+
+        corredor = request.user.corredor
+        filtro_form = FiltroCalificacionesForm(request.GET)
+        cursor = request.GET.get('despues')
+
+        def calcular_pagina():
+            # Proyección: solo se leen las columnas pedidas. Con los factores empaquetados, los
+            # factores pedidos salen de una sola columna binaria en vez de hasta 30 columnas NUMBER
+            empaquetados = empaquetado_activo() and any(columna in INDICE_FACTOR for columna in columnas)
+            campos = columnas
+            if empaquetados:
+                campos = [columna for columna in columnas if columna not in INDICE_FACTOR] + ['factores_empaquetados']
+            calificaciones = CalificacionTributaria.objects.filter(corredor=corredor).only('id', 'fecha', 'instrumento', *campos)
+            calificaciones = aplicar_filtros(calificaciones, filtro_form)
+            pagina, siguiente = pagina_keyset(calificaciones, cursor, tamano)
+            vectores = vectores_factores(pagina) if empaquetados else {}
+            filas = []
+            for cal in pagina:
+                fila = {'id': cal.id, 'ejercicio': cal.fecha.year, 'instrumento': cal.instrumento, 'fecha': formats.date_format(cal.fecha)}
+                for columna in columnas:
+                    if empaquetados and columna in INDICE_FACTOR:
+                        fila[columna] = texto_factor(vectores[cal.id][INDICE_FACTOR[columna]])
+                    else:
+                        fila[columna] = _celda_grilla(cal, columna)
+                filas.append(fila)
+            return {'filas': filas, 'siguiente': siguiente, 'columnas': columnas}
+
+        # Cacheada por corredor y filtros; las escrituras suben corredor.version_datos y la invalidan
+        filtros = filtro_form.cleaned_data if filtro_form.is_valid() else {}
+        try:
+            resultado = obtener_o_calcular(corredor, 'grilla', [filtros, cursor, tamano, columnas], calcular_pagina)
+        except ValueError as e:
+            return JsonResponse({'success': False, 'errors': str(e)})
+        return JsonResponse({'success': True, **resultado})
+    return JsonResponse({'success': False, 'errors': 'Método no permitido'})
+
+
+# --- VISTA de SUGERENCIAS DE INSTRUMENTOS (typeahead del filtro) ---
+@corredor_requerido
+def buscar_instrumentos_corredor(request):
+    """
+    Instrumentos del corredor que empiezan con ?q= (sin distinguir mayúsculas), hasta ?limite=.
+    Responde desde el índice en memoria; solo consulta la base si el corredor tuvo escrituras.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'success': False, 'errors': 'Método no permitido'})
+    try:
+        limite = int(request.GET.get('limite', LIMITE_SUGERENCIAS))
+    except ValueError:
+        return JsonResponse({'success': False, 'errors': 'El límite debe ser un número entero.'})
+    instrumentos = buscar_instrumentos(request.user.corredor, request.GET.get('q', ''), limite)
+    return JsonResponse({'success': True, 'instrumentos': instrumentos})
+
+
 # --- VISTA de INGRESAR calificación ---
 @corredor_requerido
 def ingresar_calificacion(request):
@@ -226,7 +373,16 @@ def ingresar_calificacion(request):
             nueva_calificacion = form.save(commit=False)
             nueva_calificacion.corredor = corredor #Se asigna un corredor
             nueva_calificacion.fuente_ingreso = 'MAN' #Carga manual
-            nueva_calificacion.save()
+            try:
+                # La escritura y sus efectos (caché, resumen, historial y auditoría) se confirman juntos
+                with transaction.atomic():
+                    nueva_calificacion.save()
+                    invalidar_corredor(corredor)
+                    ajustar_resumen(nuevos=[valores_calificacion(nueva_calificacion)])
+                    registrar_creacion(nueva_calificacion, 'MAN')
+                    registrar_calificacion(request.user, 'CRE', nueva_calificacion, 'Ingreso manual.')
+            except IntegrityError:
+                return JsonResponse({'success': False, 'errors': MENSAJE_DUPLICADO})
             return JsonResponse({'success': True, 'calificacion_id': nueva_calificacion.id})
         else:
             return JsonResponse({'success': False, 'errors': form.errors.as_json()})
@@ -234,23 +390,21 @@ def ingresar_calificacion(request):
 
 
 # --- VISTA de: CALCULAR MONTOS ---
-@corredor_requerido
-def ingresar_montos(request, calificacion_id):
-    calificacion = get_object_or_404(CalificacionTributaria, id=calificacion_id, corredor=request.user.corredor) # Seguridad
+def _respuesta_montos(request, calificacion_id):
     if request.method == 'POST':
         form = IngresoMontosForm(request.POST)
         if form.is_valid():
             try:
-                montos = form.cleaned_data
-                suma_base = sum(montos.get(f'monto_{i}', Decimal('0.0')) for i in range(8, 20))
-                factores_calculados = {}
-                if suma_base > 0:
-                    for i in range(8, 38):
-                        monto_actual = montos.get(f'monto_{i}', Decimal('0.0'))
-                        factores_calculados[f'factor_{i}'] = (monto_actual / suma_base)
-                else:
-                    for i in range(8, 38):
-                        factores_calculados[f'factor_{i}'] = Decimal('0.0')
+                # Los montos vacíos cuentan como 0
+                montos = {k: (v if v is not None else Decimal('0.0')) for k, v in form.cleaned_data.items()}
+                factores = factores_desde_dataframe(pd.DataFrame([montos]))
+                # El redondeo a 8 decimales puede dejar la suma 8..19 sobre 1: no se podría guardar
+                if factores[0, :COLUMNAS_BASE].sum() > 10 ** ESCALA_FACTOR:
+                    return JsonResponse({'success': False, 'errors': (
+                        'Con estos montos los factores del 8 al 19 redondeados a 8 decimales suman más de 1. '
+                        'Ajuste los montos.'
+                    )})
+                factores_calculados = fila_a_factores(factores[0])
                 return JsonResponse({
                     'success': True,
                     'calificacion_id': calificacion_id,
@@ -263,16 +417,57 @@ def ingresar_montos(request, calificacion_id):
     return JsonResponse({'success': False, 'errors': 'Método no permitido'})
 
 
+@corredor_requerido
+def ingresar_montos(request, calificacion_id):
+    get_object_or_404(CalificacionTributaria, id=calificacion_id, corredor=request.user.corredor) # Seguridad
+    return _respuesta_montos(request, calificacion_id)
+
+
+@corredor_requerido
+async def aingresar_montos(request, calificacion_id):
+    usuario = await request.auser()
+    await aget_object_or_404(CalificacionTributaria, id=calificacion_id, corredor=usuario.corredor) # Seguridad
+    # Una sola fila: el cálculo es breve y se hace en el event loop
+    return _respuesta_montos(request, calificacion_id)
+
+
 # --- VISTA de: ELIMINAR ---
+# La eliminación y sus efectos (caché, resumen, historial y auditoría) van en una transacción: si
+# algo falla, la fila no se elimina. La variante async la ejecuta en un solo paso al hilo síncrono
+def _eliminar_manual(usuario, calificacion):
+    with transaction.atomic():
+        valores = valores_calificacion(calificacion)
+        calificacion_id = calificacion.id
+        calificacion.delete()
+        calificacion.id = calificacion_id
+        invalidar_corredor(usuario.corredor)
+        ajustar_resumen(anteriores=[valores])
+        registrar_eliminacion([(calificacion_id, valores)], 'MAN')
+        registrar_calificacion(usuario, 'ELI', calificacion)
+
+
 @corredor_requerido
 def eliminar_calificacion(request, calificacion_id):
     if request.method == 'POST':
         try:
             # Para mayor seguridad solo poder borrar si el registro pertenece a nuestro corredor
             calificacion = get_object_or_404(CalificacionTributaria, id=calificacion_id, corredor=request.user.corredor)
-            instrumento_nombre = calificacion.instrumento
-            calificacion.delete()
-            return JsonResponse({'success': True, 'message': f'Registro para {instrumento_nombre} eliminado exitosamente.'})
+            _eliminar_manual(request.user, calificacion)
+            return JsonResponse({'success': True, 'message': f'Registro para {calificacion.instrumento} eliminado exitosamente.'})
+        except Exception as e:
+            return JsonResponse({'success': False, 'message': str(e)})
+    return JsonResponse({'success': False, 'message': 'Método no permitido.'})
+
+
+@corredor_requerido
+async def aeliminar_calificacion(request, calificacion_id):
+    if request.method == 'POST':
+        try:
+            usuario = await request.auser()
+            calificacion = await aget_object_or_404(CalificacionTributaria, id=calificacion_id, corredor=usuario.corredor)
+            calificacion.corredor = usuario.corredor
+            await sync_to_async(_eliminar_manual)(usuario, calificacion)
+            return JsonResponse({'success': True, 'message': f'Registro para {calificacion.instrumento} eliminado exitosamente.'})
         except Exception as e:
             return JsonResponse({'success': False, 'message': str(e)})
     return JsonResponse({'success': False, 'message': 'Método no permitido.'})
@@ -284,10 +479,26 @@ def obtener_calificacion_json(request, calificacion_id):
     if request.method == 'GET':
         try:
             # Aquí por seguridad, también se permite mostrar solo si los datos pertencen al corredor del usuario
-            calificacion = get_object_or_404(CalificacionTributaria, id=calificacion_id, corredor=request.user.corredor)
-            data = model_to_dict(calificacion)
-            data['fecha'] = calificacion.fecha.strftime('%Y-%m-%d')
-            return JsonResponse({'success': True, 'data': data})
+            fila = get_object_or_404(
+                CalificacionTributaria.objects.values_list(*SERIALIZADOR_CALIFICACION.columnas),
+                id=calificacion_id, corredor=request.user.corredor,
+            )
+            return JsonResponse({'success': True, 'data': SERIALIZADOR_CALIFICACION.fila(fila)})
+        except Exception as e:
+            return JsonResponse({'success': False, 'message': str(e)})
+    return JsonResponse({'success': False, 'message': 'Método no permitido'})
+
+
+@corredor_requerido
+async def aobtener_calificacion_json(request, calificacion_id):
+    if request.method == 'GET':
+        try:
+            usuario = await request.auser()
+            fila = await aget_object_or_404(
+                CalificacionTributaria.objects.values_list(*SERIALIZADOR_CALIFICACION.columnas),
+                id=calificacion_id, corredor=usuario.corredor,
+            )
+            return JsonResponse({'success': True, 'data': SERIALIZADOR_CALIFICACION.fila(fila)})
         except Exception as e:
             return JsonResponse({'success': False, 'message': str(e)})
     return JsonResponse({'success': False, 'message': 'Método no permitido'})
@@ -299,9 +510,20 @@ def modificar_calificacion(request, calificacion_id):
     # Parte de seguridad
     calificacion = get_object_or_404(CalificacionTributaria, id=calificacion_id, corredor=request.user.corredor)
     if request.method == 'POST':
+        # Valores previos para el historial (el formulario modifica la instancia al validar)
+        antes = valores_calificacion(calificacion)
         form = IngresoBasicoForm(request.POST, instance=calificacion)
         if form.is_valid():
-            form.save()
+            try:
+                # La escritura y sus efectos (caché, resumen, historial y auditoría) se confirman juntos
+                with transaction.atomic():
+                    form.save()
+                    invalidar_corredor(request.user.corredor)
+                    ajustar_resumen([antes], [valores_calificacion(calificacion)])
+                    registrar_modificacion(calificacion, antes, 'MAN')
+                    registrar_calificacion(request.user, 'MOD', calificacion, f'Campos: {", ".join(form.changed_data) or "sin cambios"}.')
+            except IntegrityError:
+                return JsonResponse({'success': False, 'errors': MENSAJE_DUPLICADO})
             return JsonResponse({'success': True, 'calificacion_id': calificacion.id})
         else:
             return JsonResponse({'success': False, 'errors': form.errors.as_json()})
@@ -309,43 +531,253 @@ def modificar_calificacion(request, calificacion_id):
 
 
 # --- VISTA de: GUARDAR FACTORES ---
+# Igual que al eliminar: el guardado y sus efectos se confirman juntos en una transacción
+def _guardar_factores_manual(usuario, calificacion, antes):
+    with transaction.atomic():
+        calificacion.save()
+        invalidar_corredor(usuario.corredor)
+        ajustar_resumen([antes], [valores_calificacion(calificacion)])
+        registrar_modificacion(calificacion, antes, 'MAN')
+        registrar_calificacion(usuario, 'FAC', calificacion)
+
+
+def _factores_formulario(request):
+    """
+    Factores del formulario ya validados (incluida la suma 8..19), o la respuesta de error.
+    """
+    form = IngresoFactoresForm(request.POST)
+    if not form.is_valid():
+        return None, JsonResponse({'success': False, 'errors': form.errors.as_json()})
+    suma_factores_validacion = sum(form.cleaned_data.get(f'factor_{i}', Decimal('0.0')) for i in range(8, 20))
+    if suma_factores_validacion > 1:
+        return None, JsonResponse({'success': False, 'errors': 'Error: La suma de los factores del 8 al 19 no puede ser mayor que 1.'})
+    return {f'factor_{i}': form.cleaned_data[f'factor_{i}'] for i in range(8, 38)}, None
+
+
 @corredor_requerido
 def guardar_factores(request, calificacion_id):
     # Parte de seguridad
     calificacion = get_object_or_404(CalificacionTributaria, id=calificacion_id, corredor=request.user.corredor)
     if request.method == 'POST':
-        form = IngresoFactoresForm(request.POST)
-        if form.is_valid():
-            try:
-                suma_factores_validacion = sum(form.cleaned_data.get(f'factor_{i}', Decimal('0.0')) for i in range(8, 20))
-                if suma_factores_validacion > 1:
-                    return JsonResponse({'success': False, 'errors': 'Error: La suma de los factores del 8 al 19 no puede ser mayor que 1.'})
-                for i in range(8, 38):
-                    setattr(calificacion, f'factor_{i}', form.cleaned_data[f'factor_{i}'])
-                calificacion.save()
-                return JsonResponse({'success': True, 'message': 'Calificación guardada exitosamente.'})
-            except Exception as e:
-                return JsonResponse({'success': False, 'errors': str(e)})
-        else:
-            return JsonResponse({'success': False, 'errors': form.errors.as_json()})
+        try:
+            factores, error = _factores_formulario(request)
+            if error:
+                return error
+            antes = valores_calificacion(calificacion)
+            for campo, valor in factores.items():
+                setattr(calificacion, campo, valor)
+            _guardar_factores_manual(request.user, calificacion, antes)
+            return JsonResponse({'success': True, 'message': 'Calificación guardada exitosamente.'})
+        except Exception as e:
+            return JsonResponse({'success': False, 'errors': str(e)})
     return JsonResponse({'success': False, 'errors': 'Método no permitido'})
 
+
+@corredor_requerido
+async def aguardar_factores(request, calificacion_id):
+    usuario = await request.auser()
+    # Parte de seguridad
+    calificacion = await aget_object_or_404(CalificacionTributaria, id=calificacion_id, corredor=usuario.corredor)
+    calificacion.corredor = usuario.corredor
+    if request.method == 'POST':
+        try:
+            factores, error = _factores_formulario(request)
+            if error:
+                return error
+            antes = valores_calificacion(calificacion)
+            for campo, valor in factores.items():
+                setattr(calificacion, campo, valor)
+            await sync_to_async(_guardar_factores_manual)(usuario, calificacion, antes)
+            return JsonResponse({'success': True, 'message': 'Calificación guardada exitosamente.'})
+        except Exception as e:
+            return JsonResponse({'success': False, 'errors': str(e)})
+    return JsonResponse({'success': False, 'errors': 'Método no permitido'})
+
+# --- VISTAS POR LOTE: varias calificaciones por request (una consulta y una transacción por lote) ---
+def _lista_json(request, clave):
+    """
+    Lista `clave` del cuerpo JSON del request; lanza ValueError si el cuerpo no la trae.
+    """
+    try:
+        valores = json.loads(request.body)[clave]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f'Se esperaba un JSON con la lista "{clave}".')
+    if not isinstance(valores, list):
+        raise ValueError(f'Se esperaba un JSON con la lista "{clave}".')
+    return valores
+
+
+def _items_json(request):
+    items = _lista_json(request, 'calificaciones')
+    if not all(isinstance(item, dict) for item in items):
+        raise ValueError('Cada calificación debe ser un objeto con su "id".')
+    return items
+
+
+def _respuesta_lote(resultados):
+    # success indica que el lote se procesó; cada resultado trae el suyo
+    return JsonResponse({
+        'success': True,
+        'resultados': resultados,
+        'correctas': sum(resultado['success'] for resultado in resultados),
+    })
+
+
+@corredor_requerido
+def obtener_calificaciones_lote(request):
+    """
+    GET ?ids=1,2,3: los datos de cada calificación, como obtener/<id>.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'success': False, 'errors': 'Método no permitido'})
+    try:
+        ids = lotes.ids_lote(valor for valor in request.GET.get('ids', '').split(',') if valor.strip())
+    except ValueError as e:
+        return JsonResponse({'success': False, 'errors': str(e)})
+    return _respuesta_lote(lotes.obtener_lote(request.user.corredor, ids))
+
+
+@corredor_requerido
+def modificar_calificaciones_lote(request):
+    """
+    POST {"calificaciones": [{"id": ..., campos de modificar/<id>}, ...]}.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'errors': 'Método no permitido'})
+    try:
+        resultados = lotes.modificar_lote(request.user.corredor, request.user, _items_json(request))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'errors': str(e)})
+    return _respuesta_lote(resultados)
+
+
+@corredor_requerido
+def guardar_factores_lote(request):
+    """
+    POST {"calificaciones": [{"id": ..., "factor_8": ..., ..., "factor_37": ...}, ...]}.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'errors': 'Método no permitido'})
+    try:
+        resultados = lotes.factores_lote(request.user.corredor, request.user, _items_json(request))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'errors': str(e)})
+    return _respuesta_lote(resultados)
+
+
+@corredor_requerido
+def eliminar_calificaciones_lote(request):
+    """
+    POST {"ids": [...]}.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'errors': 'Método no permitido'})
+    try:
+        ids = lotes.ids_lote(_lista_json(request, 'ids'))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'errors': str(e)})
+    return _respuesta_lote(lotes.eliminar_lote(request.user.corredor, request.user, ids))
+
+
+# --- VISTA de: HISTORIAL DE CAMBIOS Y RECONSTRUCCIÓN A UNA FECHA ---
+@corredor_requerido
+def historial_calificacion(request, calificacion_id):
+    """
+    Valores de la calificación vigentes en ?fecha= (AAAA-MM-DD, hasta el final del día, o fecha y
+    hora ISO; por defecto ahora) y sus últimos cambios por campo.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'success': False, 'message': 'Método no permitido'})
+    texto = request.GET.get('fecha', '').strip()
+    try:
+        if not texto:
+            momento = timezone.now()
+        elif len(texto) == 10:
+            dia = date.fromisoformat(texto)
+            momento = timezone.make_aware(datetime.combine(dia, time.max))
+        else:
+            momento = leer_marca(texto)
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Fecha inválida (use AAAA-MM-DD o fecha y hora ISO).'})
+
+    estado = calificacion_en_fecha(calificacion_id, momento)
+    # Solo se muestra si en esa fecha la calificación pertenecía al corredor del usuario
+    if estado is None or estado['corredor_id'] != request.user.corredor.pk:
+        return JsonResponse({'success': False, 'message': 'La calificación no existía en la fecha indicada.'})
+    data = {k: str(v) if isinstance(v, (Decimal, date)) else v for k, v in estado.items()}
+    return JsonResponse({
+        'success': True,
+        'fecha': momento.isoformat(),
+        'data': data,
+        'cambios': cambios_calificacion(calificacion_id),
+    })
+
+
+# --- VISTA de: ANALÍTICA (totales por tipo de mercado y año desde la tabla de resúmenes) ---
+@corredor_requerido
+def analitica_calificaciones(request):
+    """
+    Cantidad de calificaciones, total de valor_historico y mezcla promedio de factor_8..factor_19
+    del corredor. Filtros ?tipo_mercado= y ?periodo_comercial=; ?agrupar= con 'tipo_mercado',
+    'periodo_comercial', ambos separados por coma (por defecto) o vacío para un solo total.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'success': False, 'errors': 'Método no permitido'})
+    filtro_form = FiltroCalificacionesForm(request.GET)
+    if not filtro_form.is_valid():
+        return JsonResponse({'success': False, 'errors': filtro_form.errors.as_json()})
+    agrupar = [campo.strip() for campo in request.GET.get('agrupar', ','.join(CLAVE_RESUMEN)).split(',') if campo.strip()]
+    if set(agrupar) - set(CLAVE_RESUMEN):
+        return JsonResponse({'success': False, 'errors': f'agrupar admite: {", ".join(CLAVE_RESUMEN)}.'})
+    resumenes = consultar_resumen(
+        request.user.corredor,
+        tipo_mercado=filtro_form.cleaned_data.get('tipo_mercado'),
+        periodo_comercial=filtro_form.cleaned_data.get('periodo_comercial'),
+        agrupar=agrupar,
+    )
+    return JsonResponse({'success': True, 'agrupar': agrupar, 'resumenes': resumenes})
+
+
 # --- VISTA NUEVA: REGISTRO DE AUDITORÍA (Ley 19.628) ---
 @corredor_requerido
 def registro_auditoria(request):
     """
-    Muestra los logs de auditoría (LogEntry) para trazabilidad.
-    Filtra los últimos 500 logs de acciones.
+    Muestra el registro de auditoría del corredor para trazabilidad, paginado por keyset
+    (?despues=<cursor>) y filtrable por rango de fechas y acción.
     """
-    # Filtra los logs de acciones (Añadido=1, Modificado=2, Eliminado=3)
-    logs = LogEntry.objects.select_related('user', 'content_type').order_by('-action_time')[:500]
-
+    filtro_form = FiltroAuditoriaForm(request.GET)
+    registros = filtrar_registros(RegistroAuditoria.objects.filter(corredor=request.user.corredor), filtro_form)
+    try:
+        logs, siguiente = pagina_auditoria(registros, request.GET.get('despues'))
+    except ValueError as e:
+        messages.error(request, str(e))
+        logs, siguiente = pagina_auditoria(registros)
+
+    # Los enlaces de página conservan los filtros
+    parametros = request.GET.copy()
+    parametros.pop('despues', None)
     context = {
-        'logs': logs
+        'logs': logs,
+        'form': filtro_form,
+        'siguiente': siguiente,
+        'es_primera_pagina': not request.GET.get('despues'),
+        'filtros': parametros.urlencode(),
     }
     return render(request, 'calificaciones/registro_auditoria.html', context)
 
 
+@corredor_requerido
+def exportar_auditoria(request):
+    # CSV en streaming con los mismos filtros de la vista
+    registros = filtrar_registros(
+        RegistroAuditoria.objects.filter(corredor=request.user.corredor), FiltroAuditoriaForm(request.GET)
+    )
+    filas = registros.order_by(*ORDEN_AUDITORIA).values_list(*CAMPOS_AUDITORIA).iterator(chunk_size=TAMANO_LECTURA)
+    response = StreamingHttpResponse(generar_csv(filas, CAMPOS_AUDITORIA), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="Auditoria_{request.user.corredor.codigo_corredor}.csv"'
+    return response
+
+
 # --- VISTA NUEVA: GENERACIÓN DE REPORTES (RF009/HU08) ---
 @corredor_requerido
 def generar_reporte(request, formato):
@@ -354,34 +786,64 @@ def generar_reporte(request, formato):
     # 1. Aplicar la lógica de filtrado del Mantenedor
     calificaciones = CalificacionTributaria.objects.filter(corredor=corredor_actual).order_by('-fecha')
     filtro_form = FiltroCalificacionesForm(request.GET)
-
-    if filtro_form.is_valid():
-        tipo_mercado = filtro_form.cleaned_data.get('tipo_mercado')
-        origen = filtro_form.cleaned_data.get('origen')
-        periodo_comercial = filtro_form.cleaned_data.get('periodo_comercial')
-        
-        if tipo_mercado: calificaciones = calificaciones.filter(tipo_mercado=tipo_mercado)
-        if origen: calificaciones = calificaciones.filter(origen=origen)
-        if periodo_comercial: calificaciones = calificaciones.filter(fecha__year=periodo_comercial)
+    calificaciones = aplicar_filtros(calificaciones, filtro_form)
 
     # 2. Generar Archivo y Respuesta
     if formato == 'pdf':
-        response = HttpResponse(content_type='application/pdf')
-        # Este header es clave para forzar la descarga del archivo
-        response['Content-Disposition'] = f'attachment; filename="Reporte_Tributario_{corredor_actual.codigo_corredor}.pdf"'
-        
-        # --- Lógica de generación PDF (SIMULACIÓN) ---
-        response.write("Simulacion de contenido PDF para el reporte. Incluye los datos filtrados. (RF009)")
-        # ---------------------------------------------
-        return response
+        filtros = filtro_form.cleaned_data if filtro_form.is_valid() else {}
+        archivo = reporte_pdf(
+            corredor_actual, calificaciones, filtros,
+            titulo=f'Reporte Tributario {corredor_actual.nombre} ({corredor_actual.codigo_corredor})',
+            encabezados=encabezados_reporte(CAMPOS_REPORTE_PDF),
+            campos=CAMPOS_REPORTE_PDF,
+            fijas=len(CAMPOS_REPORTE_PDF) - len(COLUMNAS_FACTOR),
+            por_linea=10,
+        )
+        return FileResponse(
+            archivo, as_attachment=True, content_type='application/pdf',
+            filename=f'Reporte_Tributario_{corredor_actual.codigo_corredor}.pdf',
+        )
 
     elif formato == 'excel':
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        # Streaming: se recorre el queryset por bloques y el XLSX se envía a medida que se escribe
+        filas = calificaciones.values_list(*CAMPOS_REPORTE).iterator(chunk_size=TAMANO_LECTURA)
+        response = StreamingHttpResponse(
+            generar_xlsx(encabezados_reporte(), filas, nombre_hoja=f'Calificaciones {corredor_actual.codigo_corredor}'),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
         response['Content-Disposition'] = f'attachment; filename="Reporte_Tributario_{corredor_actual.codigo_corredor}.xlsx"'
-        
-        # --- Lógica de generación Excel (SIMULACIÓN) ---
-        response.write("Simulacion de contenido Excel para el reporte. Incluye los datos filtrados. (RF009)")
-        # ---------------------------------------------
         return response
 
-    return redirect('mantenedor') # Vuelve al mantenedor si el formato es inválido
\ No newline at end of file
+    return redirect('mantenedor') # Vuelve al mantenedor si el formato es inválido
+
+
+# --- EXPORTACIÓN MASIVA PARA SISTEMAS EXTERNOS (CSV / JSON Lines / Parquet / Arrow) ---
+@corredor_requerido
+def exportar_calificaciones(request, formato):
+    """
+    Exporta en streaming todas las calificaciones filtradas del corredor. Con ?desde=<ISO 8601>
+    solo van las modificadas después de esa fecha; la cabecera X-Exportacion-Hasta trae la
+    marca a usar como `desde` en la siguiente sincronización (va atrasada, ver marca_exportacion).
+    La exportación incremental no informa las calificaciones eliminadas: para reflejarlas hay
+    que pedir una exportación completa (sin ?desde=).
+    """
+    if formato not in formatos_disponibles():
+        return JsonResponse({'success': False, 'errors': f'Formato no disponible. Use: {", ".join(formatos_disponibles())}.'})
+    corredor_actual = request.user.corredor
+    try:
+        desde = leer_marca(request.GET['desde']) if request.GET.get('desde') else None
+    except ValueError as e:
+        return JsonResponse({'success': False, 'errors': str(e)})
+
+    hasta = marca_exportacion([corredor_actual])
+    calificaciones = aplicar_filtros(
+        CalificacionTributaria.objects.filter(corredor=corredor_actual), FiltroCalificacionesForm(request.GET)
+    )
+    content_type, extension = FORMATOS_EXPORTACION[formato]
+    response = StreamingHttpResponse(
+        generar_exportacion(consulta_exportacion(calificaciones, desde, hasta), formato),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="Calificaciones_{corredor_actual.codigo_corredor}.{extension}"'
+    response['X-Exportacion-Hasta'] = hasta.isoformat()
+    return response
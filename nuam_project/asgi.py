@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nuam_project.settings')
+# Conexiones sin persistencia por hilo (ver SERVIDOR_ASGI en settings). Para producción:
+#   uvicorn nuam_project.asgi:application --workers N
+os.environ.setdefault('SERVIDOR_ASGI', 'True')
 
 application = get_asgi_application()
@@ -0,0 +1,17 @@
+# nuam_project/oracle/base.py
+# Backend Oracle de Django con tamaño de caché de sentencias configurable
+from django.db.backends.oracle.base import DatabaseWrapper as OracleDatabaseWrapper
+
+# Valor que fija Django en cada conexión
+STMTCACHESIZE_DJANGO = 20
+
+
+class DatabaseWrapper(OracleDatabaseWrapper):
+    """
+    Igual al backend oficial, pero respeta OPTIONS['stmtcachesize'] (Django lo fija en 20 al
+    iniciar cada conexión). Las sentencias repetidas de las vistas AJAX (obtener, eliminar,
+    guardar factores) se reutilizan ya parseadas en la sesión en vez de volver a prepararse.
+    """
+    def init_connection_state(self):
+        super().init_connection_state()
+        self.connection.stmtcachesize = self.settings_dict['OPTIONS'].get('stmtcachesize', STMTCACHESIZE_DJANGO)
@@ -70,20 +70,46 @@ WSGI_APPLICATION = 'nuam_project.wsgi.application'
 # Database
 # ** CAMBIO: Conexión local a SQLite3 para DEMO **
 
+# Conexiones a Oracle: pool de sesiones de python-oracledb. Cada request toma una sesión ya
+# abierta del pool y la devuelve al terminar, en vez de pagar el handshake completo de Oracle.
+# Con ORACLE_POOL=False se usan conexiones persistentes por proceso (CONN_MAX_AGE).
+ORACLE_POOL = env.bool('ORACLE_POOL', default=True)
+
+# Bajo ASGI (asgi.py lo activa) el ORM de cada request corre en un hilo propio: una conexión
+# persistente quedaría abierta por hilo sin volver a usarse, así que ahí solo se reutiliza vía pool.
+# Las sesiones simultáneas quedan acotadas por ORACLE_POOL_MAX. También decide qué variante de las
+# vistas AJAX del mantenedor enruta calificaciones/urls.py (async bajo ASGI, síncrona bajo WSGI).
+SERVIDOR_ASGI = env.bool('SERVIDOR_ASGI', default=False)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.oracle',
+        'ENGINE': 'nuam_project.oracle', # django.db.backends.oracle con caché de sentencias configurable
         'NAME': 'XE', # Usar el service name del contenedor Docker
         'USER': env('USER'),
         'PASSWORD': env('PASSWORD'),
         'HOST': env('HOST'), 
         'PORT': '1521',
+        # El pool no admite conexiones persistentes de Django: su reutilización la maneja el pool
+        'CONN_MAX_AGE': 0 if ORACLE_POOL or SERVIDOR_ASGI else env.int('DB_CONN_MAX_AGE', default=300),
+        'CONN_HEALTH_CHECKS': True,
         'OPTIONS': {
             'service_name': 'XE',
+            'stmtcachesize': env.int('ORACLE_STMT_CACHE', default=100),
         },
     }
 }
 
+if ORACLE_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min': env.int('ORACLE_POOL_MIN', default=2),
+        'max': env.int('ORACLE_POOL_MAX', default=10),
+        'increment': env.int('ORACLE_POOL_INCREMENT', default=1),
+        # Chequeo de salud: las sesiones inactivas por más de estos segundos se verifican antes de entregarse
+        'ping_interval': env.int('ORACLE_POOL_PING', default=60),
+        # Segundos tras los cuales se cierran las sesiones inactivas sobre el mínimo
+        'timeout': env.int('ORACLE_POOL_TIMEOUT', default=300),
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -121,6 +147,49 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Archivos subidos (las cargas masivas quedan aquí mientras las procesa el worker)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Reportes PDF ya generados (fuera de MEDIA_ROOT para que no se publiquen)
+REPORTES_CACHE_DIR = BASE_DIR / 'cache' / 'reportes'
+
+# Copia empaquetada de los 30 factores (una columna binaria de int32 escalados por 10**8) para
+# lecturas masivas directo a NumPy. Al activarlo, `manage.py empaquetar_factores` llena las filas existentes.
+FACTORES_EMPAQUETADOS = env.bool('FACTORES_EMPAQUETADOS', default=False)
+
+# Procesos que preparan (leen, validan y calculan) los bloques de las cargas en cola; la escritura
+# sigue siendo de un solo proceso y en orden. 1 = todo en el proceso del worker.
+CARGA_PROCESOS = env.int('CARGA_PROCESOS', default=1)
+# Segundos sin latido (se renueva al confirmar cada bloque) tras los que un trabajo 'En Proceso'
+# se considera abandonado y se puede reanudar. Debe superar lo que tarda el bloque más lento.
+CARGA_LEASE_SEGUNDOS = env.int('CARGA_LEASE_SEGUNDOS', default=900)
+# Atraso (segundos) de la marca de las exportaciones incrementales respecto de la hora actual: las
+# escrituras fechan fecha_modificacion antes de confirmar, así que la marca se queda este margen atrás
+# para no saltarse filas que se confirman después de exportar. Debe superar la transacción manual
+# más larga (las cargas en cola se cubren aparte, ver exportacion.marca_exportacion).
+EXPORTACION_MARGEN_SEGUNDOS = env.int('EXPORTACION_MARGEN_SEGUNDOS', default=120)
+
+# Caché de la grilla por corredor. CACHE_CALIFICACIONES: 'locmem' (por proceso), 'file' (compartida
+# entre procesos del servidor) o la ruta de cualquier backend de caché de Django.
+# Se invalida por corredor con Corredor.version_datos, así que el TIMEOUT solo limpia entradas viejas.
+CACHE_CALIFICACIONES = env('CACHE_CALIFICACIONES', default='locmem')
+BACKENDS_CACHE = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'calificaciones': {
+        'BACKEND': BACKENDS_CACHE.get(CACHE_CALIFICACIONES, CACHE_CALIFICACIONES),
+        'LOCATION': str(BASE_DIR / 'cache' / 'calificaciones') if CACHE_CALIFICACIONES == 'file' else 'calificaciones',
+        'TIMEOUT': env.int('CACHE_CALIFICACIONES_TIMEOUT', default=3600),
+        'OPTIONS': {'MAX_ENTRIES': env.int('CACHE_CALIFICACIONES_MAX', default=5000)},
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 